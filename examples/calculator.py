@@ -23,9 +23,9 @@ mult_op   = Symbols({'*': operator.mul,
 
 dec       = lexeme[+Char('0123456789')][int]
 
-arith     = Rule()
-mult      = Rule()
-value     = Rule()
+arith     = Rule(memoize=True)
+mult      = Rule(memoize=True)
+value     = Rule(memoize=True)
 exp       = Rule(AttrType.OBJECT)
 calc = exp
 
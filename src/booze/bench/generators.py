@@ -0,0 +1,176 @@
+# Copyright 2015 Rafe Kaplan
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Deterministic inputs for the grammars of the suite.
+
+Every generator takes the size in characters of the input wanted and a seed, and returns the same text for the same
+arguments on every platform and Python version.  Texts are built of small records until they reach the size, so they
+are at least that long and exceed it by less than one record.  Nesting is kept shallow so that the interpreter parses
+inputs of any size without reaching the recursion limit.
+"""
+
+import random
+import re
+import string
+
+_NAMES = ('alpha', 'beta', 'gamma', 'delta', 'epsilon', 'zeta', 'eta', 'theta', 'iota', 'kappa', 'lambda', 'mu')
+
+_SIZE = re.compile(r'(\d+)\s*([kmg]?)b?$', re.IGNORECASE)
+
+_UNITS = {'': 1, 'k': 1 << 10, 'm': 1 << 20, 'g': 1 << 30}
+
+
+def parse_size(size):
+    """Number of characters in a size such as 1024, '64K' or '100MB'.
+
+    Raises:
+        ValueError: size is not a number of bytes, kilobytes, megabytes or gigabytes.
+    """
+    if isinstance(size, int):
+        return size
+    match = _SIZE.match(size.strip())
+    if not match:
+        raise ValueError('Invalid size {!r}'.format(size))
+    return int(match.group(1)) * _UNITS[match.group(2).lower()]
+
+
+def format_size(size):
+    """Shortest of 1K, 1M... naming size, or the number of characters when it is not a whole unit."""
+    for unit in ('G', 'M', 'K'):
+        scale = _UNITS[unit.lower()]
+        if size >= scale and size % scale == 0:
+            return '{}{}'.format(size // scale, unit)
+    return str(size)
+
+
+def _fill(size, seed, record):
+    """Join records produced by record(random) until the text is size characters long."""
+    rand = random.Random(seed)
+    parts = []
+    length = 0
+    while length < size:
+        part = record(rand)
+        parts.append(part)
+        length += len(part)
+    return ''.join(parts)
+
+
+def _word(rand, alphabet=string.ascii_lowercase, minimum=1, maximum=10):
+    return ''.join(rand.choice(alphabet) for _ in range(rand.randint(minimum, maximum)))
+
+
+def _term(rand, depth):
+    if depth and rand.random() < 0.2:
+        # Only positive values are nested, so divisors are never zero.
+        return '({})'.format(' {} '.format(rand.choice('+*')).join(
+            _term(rand, depth - 1) for _ in range(rand.randint(2, 3))))
+    return str(rand.randint(1, 999))
+
+
+def _calculator_line(rand):
+    terms = [_term(rand, 2) for _ in range(rand.randint(1, 8))]
+    line = terms[0]
+    operators = '+-*/'
+    for term in terms[1:]:
+        operator = rand.choice(operators)
+        if operator == '/':
+            # Multiplication and division group to the right, so a second division could divide by a quotient of 0.
+            operators = '+-*'
+        line += ' {} {}'.format(operator, term)
+    return line + '\n'
+
+
+def calculator(size, seed=0):
+    """Lines of arithmetic for grammars.calculator()."""
+    return _fill(size, seed, _calculator_line)
+
+
+def _element(rand, depth, indent):
+    name = rand.choice(_NAMES)
+    if not depth or rand.random() < 0.3:
+        return '{}<{}/>\n'.format(indent, name)
+    children = ''.join(_element(rand, depth - 1, indent + '  ') for _ in range(rand.randint(1, 4)))
+    return '{0}<{1}>\n{2}{0}</{1}>\n'.format(indent, name, children)
+
+
+def simplexml(size, seed=0):
+    """Single document element for grammars.simplexml()."""
+    body = _fill(size - len('<document>\n</document>\n'), seed, lambda rand: _element(rand, 3, '  '))
+    return '<document>\n{}</document>\n'.format(body)
+
+
+def _json_string(rand):
+    text = _word(rand, string.ascii_letters + string.digits + ' ', 0, 16)
+    if rand.random() < 0.1:
+        text += rand.choice(('\\n', '\\"', '\\\\', '\\u00e9', '\\t'))
+    return '"{}"'.format(text)
+
+
+def _json_value(rand, depth):
+    choice = rand.random()
+    if depth and choice < 0.15:
+        return '[{}]'.format(', '.join(_json_value(rand, depth - 1) for _ in range(rand.randint(0, 4))))
+    if depth and choice < 0.3:
+        return _json_object(rand, depth - 1)
+    if choice < 0.55:
+        return _json_string(rand)
+    if choice < 0.75:
+        return str(rand.randint(-100000, 100000))
+    if choice < 0.9:
+        return '{}.{}e{}'.format(rand.randint(-999, 999), rand.randint(0, 999), rand.randint(-5, 5))
+    return rand.choice(('true', 'false', 'null'))
+
+
+def _json_object(rand, depth):
+    members = ('"{}": {}'.format(_word(rand), _json_value(rand, depth)) for _ in range(rand.randint(0, 5)))
+    return '{{{}}}'.format(', '.join(members))
+
+
+def json(size, seed=0):
+    """Array of objects, one per line, for grammars.json()."""
+    records = _fill(size - len('[\n]\n'), seed, lambda rand: '  {},\n'.format(_json_object(rand, 3)))
+    return '[\n{}\n]\n'.format(records[:-2])
+
+
+def _csv_field(rand):
+    choice = rand.random()
+    if choice < 0.4:
+        return str(rand.randint(0, 1000000))
+    if choice < 0.8:
+        return _word(rand, string.ascii_letters + ' ', 0, 12)
+    text = _word(rand, string.ascii_letters + ' ,\n', 0, 12)
+    if rand.random() < 0.5:
+        text += '""'
+    return '"{}"'.format(text)
+
+
+def csv(size, seed=0):
+    """Rows of eight fields for grammars.csv()."""
+    return _fill(size, seed, lambda rand: ','.join(_csv_field(rand) for _ in range(8)) + '\r\n')
+
+
+def _ini_section(rand):
+    lines = ['[{}.{}]'.format(rand.choice(_NAMES), rand.randint(0, 1 << 30))]
+    for index in range(rand.randint(1, 12)):
+        if rand.random() < 0.1:
+            lines.append('{} {}'.format(rand.choice(';#'), _word(rand, string.ascii_letters + ' ', 0, 40)))
+        lines.append('{}_{} = {}'.format(_word(rand, maximum=12), index,
+                                         _word(rand, string.ascii_letters + string.digits + ' /:', 1, 40).strip()
+                                         or 'x'))
+    return '\n'.join(lines) + '\n\n'
+
+
+def ini(size, seed=0):
+    """Sections of entries for grammars.ini()."""
+    return _fill(size, seed, _ini_section)
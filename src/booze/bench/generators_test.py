@@ -0,0 +1,54 @@
+# Copyright 2015 Rafe Kaplan
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+from booze.bench import generators
+
+
+class GeneratorsTestCase(unittest.TestCase):
+
+    generators = (generators.calculator, generators.simplexml, generators.json, generators.csv, generators.ini)
+
+    def test_deterministic(self):
+        for generator in self.generators:
+            self.assertEqual(generator(4096), generator(4096), generator.__name__)
+            self.assertEqual(generator(4096, 7), generator(4096, 7), generator.__name__)
+            self.assertNotEqual(generator(4096), generator(4096, 7), generator.__name__)
+
+    def test_size(self):
+        for generator in self.generators:
+            for size in (1 << 10, 64 << 10):
+                text = generator(size)
+                self.assertGreaterEqual(len(text), size, generator.__name__)
+                # Inputs end with the record reaching the size.
+                self.assertLess(len(text), size + 4096, generator.__name__)
+
+    def test_parse_size(self):
+        self.assertEqual(1000, generators.parse_size(1000))
+        self.assertEqual(1000, generators.parse_size('1000'))
+        self.assertEqual(1024, generators.parse_size('1K'))
+        self.assertEqual(64 << 10, generators.parse_size('64kb'))
+        self.assertEqual(100 << 20, generators.parse_size('100M'))
+        with self.assertRaises(ValueError):
+            generators.parse_size('1T')
+
+    def test_format_size(self):
+        self.assertEqual('1K', generators.format_size(1024))
+        self.assertEqual('100M', generators.format_size(100 << 20))
+        self.assertEqual('1000', generators.format_size(1000))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,187 @@
+# Copyright 2015 Rafe Kaplan
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Canonical grammars benchmarked by the suite.
+
+Every function builds a new grammar whose root matches a whole document, so grammars may be built once per benchmark
+and analysis done by one benchmark does not leak into another.
+"""
+
+import operator
+
+from booze import whiskey
+from booze.gin import aux
+from booze.gin import chars
+from booze.gin import local_vars
+from booze.gin import parser
+from booze.gin import rule
+
+_ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+
+def _unescaped(c):
+    return c >= ' ' and c not in '"\\'
+
+
+def _unquoted_field(c):
+    return c not in ',"\r\n'
+
+
+def _quoted_field(c):
+    return c != '"'
+
+
+def _line(c):
+    return c not in '\r\n'
+
+
+def _number(text):
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+
+def _code_point(digits):
+    return chr(int(digits, 16))
+
+
+def _null():
+    return None
+
+
+def _join(*parts):
+    return ''.join(parts)
+
+
+def _pair(key, value):
+    return key, value
+
+
+def _elements(first=parser.UNUSED, rest=()):
+    return [] if first is parser.UNUSED else [first] + list(rest)
+
+
+def _members(first=parser.UNUSED, rest=()):
+    return dict(_elements(first, rest))
+
+
+def _section(name, entries=()):
+    return name, dict(entries)
+
+
+def _sections(*sections):
+    return dict(sections)
+
+
+@whiskey.func
+def _xml_doc(name, children=()):
+    return (name, children) if children else (name,)
+
+
+def calculator():
+    """Lines of integer arithmetic, evaluated.  Parse with ' ' as skipper.
+
+    Attribute is a tuple of the value of every line.
+    """
+    arith_op = parser.Symbols({'+': operator.add, '-': operator.sub})
+    mult_op = parser.Symbols({'*': operator.mul, '/': operator.floordiv})
+    dec = parser.lexeme[+parser.Char('0123456789')][int]
+    arith = rule.Rule(memoize=True, name='arith')
+    mult = rule.Rule(memoize=True, name='mult')
+    value = rule.Rule(memoize=True, name='value')
+    exp = rule.Rule(parser.AttrType.OBJECT, name='exp')
+    p = whiskey.p
+    mult %= (value << mult_op << mult)[p[1](p[0], p[2])] | value
+    arith %= (mult << arith_op << arith)[p[1](p[0], p[2])] | mult
+    value %= dec | '(' << exp << ')'
+    exp %= arith
+    return +(exp << '\n') << aux.eoi
+
+
+def simplexml():
+    """Nested elements without attributes or text.  Parse with ' \\n' as skipper.
+
+    Attribute is (name, children) for an element with children and (name,) for one without.
+    """
+    start_tag = rule.Rule(parser.AttrType.STRING, name='start_tag')
+    end_tag = rule.Rule(parser.AttrType.UNUSED, name='end_tag')
+    empty_tag = rule.Rule(parser.AttrType.STRING, name='empty_tag')
+    xml = rule.Rule(name='xml')
+    document = rule.Rule(parser.AttrType.OBJECT, name='document')
+    p = whiskey.p
+    tag_name = parser.lexeme[+chars.alpha]
+    start_tag %= '<' << tag_name << '>'
+    end_tag %= parser.omit['</' << parser.String(p[0]) << '>']
+    empty_tag %= '<' << tag_name << '/>'
+    xml %= ((start_tag[local_vars.l.name[p[0]]] << -+xml << end_tag(local_vars.l.name))[_xml_doc(p[0], p[1])]
+            | empty_tag[_xml_doc(p[0])])
+    document %= xml << aux.eoi
+    return document
+
+
+def json():
+    """JSON text.  Parse with ' \\t\\r\\n' as skipper.
+
+    Attribute is the value json.loads() returns for the same text.
+    """
+    value = rule.Rule(parser.AttrType.OBJECT, name='value')
+    string = rule.Rule(name='string')
+    number = rule.Rule(name='number')
+    array = rule.Rule(parser.AttrType.OBJECT, name='array')
+    obj = rule.Rule(parser.AttrType.OBJECT, name='object')
+    digits = +chars.digit
+    escape = parser.lit('\\') << (parser.Char(''.join(_ESCAPES))[_ESCAPES.get]
+                                  | parser.lit('u') << parser.as_string[parser.Repeat(4, 4)[chars.xdigit]][_code_point])
+    string %= parser.object_lexeme['"' << (-+(chars.PredicateChar(_unescaped) | escape))[_join] << '"']
+    number %= parser.lexeme[-parser.Char('-') << digits << -(parser.String('.') << digits)
+                            << -(parser.Char('eE') << -parser.Char('+-') << digits)][_number]
+    array %= ('[' << -(value << parser.Repeat()[',' << value]) << ']')[_elements]
+    obj %= ('{' << -((string << ':' << value)[_pair] << parser.Repeat()[(',' << string << ':' << value)[_pair]])
+            << '}')[_members]
+    value %= (string | number | obj | array | parser.lit('true') << aux.Attr(True)
+              | parser.lit('false') << aux.Attr(False) | parser.lit('null')[_null])
+    return value << aux.eoi
+
+
+def csv():
+    """Comma separated values with double quoted fields.  Parse without a skipper.
+
+    Attribute is a tuple of rows, each a tuple of fields, as csv.reader() produces them.
+    """
+    field = rule.Rule(name='field')
+    row = rule.Rule(name='row')
+    quoted = '"' << -+(chars.PredicateChar(_quoted_field) | parser.lit('""') << aux.Attr('"')) << '"'
+    field %= parser.as_string[quoted | -+chars.PredicateChar(_unquoted_field)]
+    row %= (field << parser.Repeat()[',' << field])[_elements][tuple]
+    return parser.Repeat()[row << (parser.lit('\r\n') | '\n')] << aux.eoi
+
+
+def ini():
+    """Configuration file of sections of key = value entries.  Parse with ' \\t' as skipper.
+
+    Lines starting with ; or # are comments.  Comments may also follow section headers, but not entries, as the
+    value of an entry is the rest of its line.
+
+    Attribute is a dict mapping each section name to a dict of its entries.
+    """
+    comment = parser.omit[parser.Char(';#') << -+chars.PredicateChar(_line)]
+    blank = parser.Repeat()[-comment << parser.lit('\n')]
+    newline = parser.lit('\n') << blank
+    name = parser.lexeme[+parser.Char('abcdefghijklmnopqrstuvwxyz0123456789_.-')]
+    entry = rule.Rule(name='entry')
+    section = rule.Rule(name='section')
+    entry %= (name << '=' << parser.lexeme[-+chars.PredicateChar(_line)] << newline)[_pair]
+    section %= ('[' << name << ']' << -comment << newline << parser.Repeat()[entry])[_section]
+    return (blank << parser.Repeat()[section] << aux.eoi)[_sections]
@@ -0,0 +1,88 @@
+# Copyright 2015 Rafe Kaplan
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import configparser
+import csv
+import io
+import json
+import unittest
+
+from booze.bench import generators
+from booze.bench import grammars
+from booze.gin import analysis
+
+
+class GrammarsTestCase(unittest.TestCase):
+
+    def test_calculator(self):
+        self.assertEqual((True, (7, 18, 1)), grammars.calculator().parse('1 + 2 * 3\n(4+5) * 2\n10 / 3 - 2\n', ' '))
+        self.assertEqual((False, None), grammars.calculator().parse('1 +\n', ' '))
+
+    def test_simplexml(self):
+        self.assertEqual((True, ('a', (('b',), ('c', (('d',),))))),
+                         grammars.simplexml().parse('<a>\n <b/>\n <c><d/></c>\n</a>\n', ' \n'))
+        self.assertEqual((False, None), grammars.simplexml().parse('<a></b>', ' \n'))
+
+    def test_json(self):
+        text = '{"a": [1, -2.5e3, true, false, null, "x\\n\\u00e9\\""], "b": {}, "c": [[]]}'
+        self.assertEqual((True, json.loads(text)), grammars.json().parse(text, ' \t\r\n'))
+        self.assertEqual((False, None), grammars.json().parse('[1, 2', ' \t\r\n'))
+
+    def test_csv(self):
+        text = 'a,b,\r\n"x,""y""\r\nz",,1\r\n'
+        expected = tuple(tuple(row) for row in csv.reader(io.StringIO(text, newline='')))
+        self.assertEqual((True, expected), grammars.csv().parse(text))
+        self.assertEqual((True, (('a', 'b'), ('c',))), grammars.csv().parse('a,b\nc\n'))
+
+    def test_ini(self):
+        text = '; leading\n\n[main] ; header\nkey = some value\n# comment\nempty =\n\n[other]\n'
+        self.assertEqual((True, {'main': {'key': 'some value', 'empty': ''}, 'other': {}}),
+                         grammars.ini().parse(text, ' \t'))
+        self.assertEqual((False, None), grammars.ini().parse('key = value\n', ' \t'))
+
+    def test_generated_json(self):
+        text = generators.json(16 << 10)
+        self.assertEqual((True, json.loads(text)), grammars.json().parse(text, ' \t\r\n'))
+
+    def test_generated_csv(self):
+        text = generators.csv(16 << 10)
+        expected = tuple(tuple(row) for row in csv.reader(io.StringIO(text, newline='')))
+        self.assertEqual((True, expected), grammars.csv().parse(text))
+
+    def test_generated_ini(self):
+        text = generators.ini(16 << 10)
+        config = configparser.ConfigParser(interpolation=None)
+        config.read_string(text)
+        expected = {section: dict(config[section]) for section in config.sections()}
+        self.assertEqual((True, expected), grammars.ini().parse(text, ' \t'))
+
+    def test_no_hazards(self):
+        for grammar in (grammars.calculator, grammars.simplexml, grammars.json, grammars.csv, grammars.ini):
+            self.assertEqual([], analysis.analyze(grammar()), grammar.__name__)
+
+    def test_engines(self):
+        for grammar, generator, skipper in ((grammars.calculator, generators.calculator, ' '),
+                                            (grammars.simplexml, generators.simplexml, ' \n'),
+                                            (grammars.json, generators.json, ' \t\r\n'),
+                                            (grammars.csv, generators.csv, None),
+                                            (grammars.ini, generators.ini, ' \t')):
+            text = generator(4 << 10)
+            expected = grammar().parse(text, skipper)
+            self.assertTrue(expected[0], grammar.__name__)
+            self.assertEqual(expected, grammar().compile().parse(text, skipper), grammar.__name__)
+            self.assertEqual(expected, grammar().lower().parse(text, skipper), grammar.__name__)
+
+
+if __name__ == '__main__':
+    unittest.main()
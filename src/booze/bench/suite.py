@@ -0,0 +1,449 @@
+# Copyright 2015 Rafe Kaplan
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Measurement of grammars on generated inputs, and comparison with a stored baseline.
+
+Run the suite with:
+
+    python -m booze.bench --sizes 1K,1M,100M --save baseline.json
+    python -m booze.bench --sizes 1K,1M,100M --baseline baseline.json
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+from booze.bench import generators
+from booze.bench import grammars
+from booze.gin import parser
+
+ENGINES = ('interpreter', 'compiled', 'vm')
+
+DEFAULT_SIZES = ('1K', '64K', '1M')
+
+
+class Workload:
+    """Grammar benchmarked on generated inputs.
+
+    Args:
+        name: Name of the workload in reports.
+        grammar: Function building the grammar.
+        generator: Function of (size, seed) generating input for the grammar.
+        skipper: Skipper to parse with.
+    """
+
+    def __init__(self, name, grammar, generator, skipper=None):
+        self.__name = name
+        self.__grammar = grammar
+        self.__generator = generator
+        self.__skipper = skipper
+
+    @property
+    def name(self):
+        return self.__name
+
+    @property
+    def grammar(self):
+        return self.__grammar
+
+    @property
+    def generator(self):
+        return self.__generator
+
+    @property
+    def skipper(self):
+        return self.__skipper
+
+    def generate(self, size, seed=0):
+        return self.__generator(generators.parse_size(size), seed)
+
+    def __repr__(self):
+        return '<Workload {}>'.format(self.__name)
+
+
+WORKLOADS = {workload.name: workload for workload in (
+    Workload('calculator', grammars.calculator, generators.calculator, ' '),
+    Workload('simplexml', grammars.simplexml, generators.simplexml, ' \n'),
+    Workload('json', grammars.json, generators.json, ' \t\r\n'),
+    Workload('csv', grammars.csv, generators.csv),
+    Workload('ini', grammars.ini, generators.ini, ' \t'),
+)}
+
+
+class Measurement:
+    """Cost of parsing one generated input with one engine.
+
+    Args:
+        workload: Name of the workload.
+        engine: Name of the engine, one of ENGINES.
+        size: Size of input requested, such as '1M'.
+        characters: Number of characters of the input generated.
+        seconds: Fastest time taken to parse the input.
+        nodes: Number of parser invocations of the interpreter parsing the input.
+        peak_memory: Most bytes allocated at once while parsing, as traced by tracemalloc.
+    """
+
+    def __init__(self, workload, engine, size, characters, seconds, nodes, peak_memory):
+        self.__workload = workload
+        self.__engine = engine
+        self.__size = size
+        self.__characters = characters
+        self.__seconds = seconds
+        self.__nodes = nodes
+        self.__peak_memory = peak_memory
+
+    @property
+    def workload(self):
+        return self.__workload
+
+    @property
+    def engine(self):
+        return self.__engine
+
+    @property
+    def size(self):
+        return self.__size
+
+    @property
+    def characters(self):
+        return self.__characters
+
+    @property
+    def seconds(self):
+        return self.__seconds
+
+    @property
+    def nodes(self):
+        return self.__nodes
+
+    @property
+    def peak_memory(self):
+        return self.__peak_memory
+
+    @property
+    def key(self):
+        """Name of the measurement in baselines: workload/size/engine."""
+        return '{}/{}/{}'.format(self.__workload, self.__size, self.__engine)
+
+    @property
+    def throughput(self):
+        """Characters parsed per second."""
+        return self.__characters / self.__seconds if self.__seconds else float('inf')
+
+    @property
+    def node_overhead(self):
+        """Seconds per parser invocation."""
+        return self.__seconds / self.__nodes if self.__nodes else 0.0
+
+    def to_dict(self):
+        return {
+            'workload': self.__workload,
+            'engine': self.__engine,
+            'size': self.__size,
+            'characters': self.__characters,
+            'seconds': self.__seconds,
+            'nodes': self.__nodes,
+            'peak_memory': self.__peak_memory,
+            'throughput': self.throughput,
+            'node_overhead': self.node_overhead,
+        }
+
+    @classmethod
+    def from_dict(cls, values):
+        return cls(values['workload'], values['engine'], values['size'], values['characters'], values['seconds'],
+                   values['nodes'], values['peak_memory'])
+
+    def __repr__(self):
+        return '<Measurement {} {:.0f} chars/s>'.format(self.key, self.throughput)
+
+
+class Regression:
+    """Metric of a measurement that is worse than its baseline by more than the tolerance.
+
+    Args:
+        key: Key of the measurement.
+        metric: Name of the metric: throughput, nodes or peak_memory.
+        baseline: Value of the metric in the baseline.
+        actual: Value of the metric measured.
+    """
+
+    def __init__(self, key, metric, baseline, actual):
+        self.__key = key
+        self.__metric = metric
+        self.__baseline = baseline
+        self.__actual = actual
+
+    @property
+    def key(self):
+        return self.__key
+
+    @property
+    def metric(self):
+        return self.__metric
+
+    @property
+    def baseline(self):
+        return self.__baseline
+
+    @property
+    def actual(self):
+        return self.__actual
+
+    @property
+    def change(self):
+        """Relative change from the baseline, positive when the metric grew."""
+        return self.__actual / self.__baseline - 1 if self.__baseline else float('inf')
+
+    def __str__(self):
+        return '{} {}: {:.6g} -> {:.6g} ({:+.1%})'.format(self.__key, self.__metric, self.__baseline, self.__actual,
+                                                          self.change)
+
+    def __repr__(self):
+        return '<Regression {}>'.format(self)
+
+
+class _CountingState(parser.ParserState):
+    """Parser state counting transactions, each opened by one parser invocation of the interpreter."""
+
+    __slots__ = ('transactions',)
+
+    def __init__(self, state_input, skipper=None):
+        super(_CountingState, self).__init__(state_input, skipper)
+        self.transactions = 0
+
+    def begin(self):
+        self.transactions += 1
+        super(_CountingState, self).begin()
+
+
+def engine(grammar, name):
+    """Object parsing with grammar through the engine of name, one of ENGINES.
+
+    Raises:
+        ValueError: No engine of that name.
+    """
+    if name == 'interpreter':
+        return grammar
+    elif name == 'compiled':
+        return grammar.compile()
+    elif name == 'vm':
+        return grammar.lower()
+    raise ValueError('Unknown engine {!r}'.format(name))
+
+
+def count_nodes(workload, text):
+    """Number of parser invocations of the interpreter parsing text."""
+    state = _CountingState(text, workload.skipper)
+    workload.grammar().parse(state)
+    return state.transactions
+
+
+def _peak_memory(runner, text, skipper):
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        runner.parse(text, skipper)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+    return peak - baseline
+
+
+def measure(workload, size, text, engine_name='interpreter', repeat=3, nodes=None, timer=time.perf_counter):
+    """Measure parsing text with an engine.
+
+    The grammar is built and prepared for the engine before timing, then parses once to warm up.  Time is the
+    fastest of repeat parses, and peak memory is traced by a separate parse, as tracing slows parsing down.
+
+    Args:
+        workload: Workload of text.
+        size: Size text was generated for.
+        text: Input generated by the workload.
+        engine_name: Name of the engine, one of ENGINES.
+        repeat: Number of timed parses.
+        nodes: Result of count_nodes() for text, counted when None.
+        timer: Function returning the current time in seconds.
+
+    Raises:
+        ValueError: The grammar did not parse text.
+    """
+    runner = engine(workload.grammar(), engine_name)
+    skipper = workload.skipper
+    successful, _ = runner.parse(text, skipper)
+    if not successful:
+        raise ValueError('{} did not parse its {} input'.format(workload.name, size))
+    seconds = None
+    for _ in range(repeat):
+        start = timer()
+        runner.parse(text, skipper)
+        elapsed = timer() - start
+        if seconds is None or elapsed < seconds:
+            seconds = elapsed
+    if nodes is None:
+        nodes = count_nodes(workload, text)
+    return Measurement(workload.name, engine_name, generators.format_size(generators.parse_size(size)), len(text),
+                       seconds, nodes, _peak_memory(runner, text, skipper))
+
+
+def run(workloads=None, sizes=DEFAULT_SIZES, engines=ENGINES, repeat=3, seed=0, progress=None):
+    """Measure every workload at every size with every engine.
+
+    Args:
+        workloads: Names of workloads, every workload of WORKLOADS when None.
+        sizes: Sizes of inputs, such as '1K' or '100M'.
+        engines: Names of engines.
+        repeat: Number of timed parses of each measurement.
+        seed: Seed of input generators.
+        progress: Function called with every Measurement as soon as it is made.
+
+    Returns:
+        List of Measurement.
+    """
+    measurements = []
+    for name in workloads or WORKLOADS:
+        workload = WORKLOADS[name]
+        for size in sizes:
+            text = workload.generate(size, seed)
+            nodes = count_nodes(workload, text)
+            for engine_name in engines:
+                measurement = measure(workload, size, text, engine_name, repeat, nodes)
+                measurements.append(measurement)
+                if progress:
+                    progress(measurement)
+    return measurements
+
+
+def save_baseline(path, measurements):
+    """Write measurements to a baseline JSON file."""
+    with open(path, 'w') as baseline_file:
+        json.dump({
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'measurements': {m.key: m.to_dict() for m in measurements},
+        }, baseline_file, indent=2, sort_keys=True)
+        baseline_file.write('\n')
+
+
+def load_baseline(path):
+    """Read a baseline JSON file written by save_baseline().
+
+    Returns:
+        Dict mapping the key of every measurement to its Measurement.
+    """
+    with open(path) as baseline_file:
+        values = json.load(baseline_file)
+    return {key: Measurement.from_dict(m) for key, m in values['measurements'].items()}
+
+
+def compare(measurements, baseline, tolerance=0.1):
+    """Regressions of measurements from a baseline.
+
+    Throughput is a regression when it falls by more than tolerance, and nodes and peak memory when they grow by more
+    than tolerance.  Node counts do not depend on the machine, so growth shows the grammar or the interpreter doing
+    more work rather than noise.  Measurements missing from the baseline are not compared.
+
+    Args:
+        measurements: Iterable of Measurement.
+        baseline: Dict of key to Measurement, as load_baseline() returns.
+        tolerance: Relative change allowed.
+
+    Returns:
+        List of Regression.
+    """
+    regressions = []
+    for measurement in measurements:
+        expected = baseline.get(measurement.key)
+        if expected is None:
+            continue
+        if measurement.throughput < expected.throughput * (1 - tolerance):
+            regressions.append(Regression(measurement.key, 'throughput', expected.throughput, measurement.throughput))
+        for metric in ('nodes', 'peak_memory'):
+            before = getattr(expected, metric)
+            after = getattr(measurement, metric)
+            if after > before * (1 + tolerance):
+                regressions.append(Regression(measurement.key, metric, before, after))
+    return regressions
+
+
+def format_measurement(measurement):
+    """Line of the table of format_measurements() for one measurement."""
+    return '{:<24} {:>8} {:>12} {:>14.0f} {:>12} {:>12.1f} {:>12.1f}'.format(
+        measurement.workload, measurement.size, measurement.engine, measurement.throughput, measurement.nodes,
+        measurement.node_overhead * 1e9, measurement.peak_memory / 1024)
+
+
+def format_measurements(measurements):
+    """Table of measurements, one per line."""
+    lines = ['{:<24} {:>8} {:>12} {:>14} {:>12} {:>12} {:>12}'.format(
+        'workload', 'size', 'engine', 'chars/s', 'nodes', 'ns/node', 'peak KiB')]
+    for measurement in measurements:
+        lines.append(format_measurement(measurement))
+    return '\n'.join(lines)
+
+
+def main(argv=None, out=None):
+    """Run the suite from the command line.
+
+    Returns:
+        Exit status: 1 when a baseline was given and measurements regressed from it, otherwise 0.
+    """
+    out = out or sys.stdout
+    arguments = argparse.ArgumentParser(prog='python -m booze.bench', description=__doc__.splitlines()[0])
+    arguments.add_argument('--workloads', default=','.join(WORKLOADS),
+                           help='comma separated workloads, of {}'.format(', '.join(WORKLOADS)))
+    arguments.add_argument('--sizes', default=','.join(DEFAULT_SIZES),
+                           help='comma separated input sizes, from 1K to 100M')
+    arguments.add_argument('--engines', default=','.join(ENGINES),
+                           help='comma separated engines, of {}'.format(', '.join(ENGINES)))
+    arguments.add_argument('--repeat', type=int, default=3, help='timed parses of each measurement')
+    arguments.add_argument('--seed', type=int, default=0, help='seed of input generators')
+    arguments.add_argument('--baseline', help='baseline JSON file to compare with')
+    arguments.add_argument('--tolerance', type=float, default=0.1, help='relative change allowed from the baseline')
+    arguments.add_argument('--save', help='file to write measurements to as a baseline')
+    options = arguments.parse_args(argv)
+
+    workloads = options.workloads.split(',')
+    for name in workloads:
+        if name not in WORKLOADS:
+            arguments.error('unknown workload {!r}'.format(name))
+    engines = options.engines.split(',')
+    for name in engines:
+        if name not in ENGINES:
+            arguments.error('unknown engine {!r}'.format(name))
+    sizes = options.sizes.split(',')
+    for size in sizes:
+        try:
+            generators.parse_size(size)
+        except ValueError as error:
+            arguments.error(str(error))
+
+    print(format_measurements([]), file=out)
+    measurements = run(workloads, sizes, engines, options.repeat, options.seed,
+                       lambda m: print(format_measurement(m), file=out, flush=True))
+    if options.save:
+        save_baseline(options.save, measurements)
+    if options.baseline:
+        regressions = compare(measurements, load_baseline(options.baseline), options.tolerance)
+        for regression in regressions:
+            print('REGRESSION', regression, file=out)
+        if regressions:
+            return 1
+    return 0
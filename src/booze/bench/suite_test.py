@@ -0,0 +1,116 @@
+# Copyright 2015 Rafe Kaplan
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+import itertools
+import os
+import shutil
+import tempfile
+import unittest
+
+from booze.bench import suite
+
+
+class MeasureTestCase(unittest.TestCase):
+
+    def test_measure(self):
+        workload = suite.WORKLOADS['json']
+        text = workload.generate('1K')
+        # Every call of the timer advances one second.
+        measurement = suite.measure(workload, '1K', text, 'vm', repeat=2, timer=itertools.count().__next__)
+        self.assertEqual('json/1K/vm', measurement.key)
+        self.assertEqual(len(text), measurement.characters)
+        self.assertEqual(1.0, measurement.seconds)
+        self.assertEqual(len(text), measurement.throughput)
+        self.assertEqual(suite.count_nodes(workload, text), measurement.nodes)
+        self.assertEqual(1.0 / measurement.nodes, measurement.node_overhead)
+        self.assertGreater(measurement.peak_memory, 0)
+
+    def test_nodes(self):
+        workload = suite.WORKLOADS['csv']
+        self.assertLess(suite.count_nodes(workload, workload.generate('1K')),
+                        suite.count_nodes(workload, workload.generate('4K')))
+
+    def test_not_parsed(self):
+        with self.assertRaises(ValueError):
+            suite.measure(suite.WORKLOADS['json'], '1K', '[1,', 'interpreter')
+
+    def test_unknown_engine(self):
+        with self.assertRaises(ValueError):
+            suite.engine(suite.WORKLOADS['json'].grammar(), 'unknown')
+
+    def test_run(self):
+        measurements = []
+        result = suite.run(['ini', 'csv'], ['1K'], repeat=1, progress=measurements.append)
+        self.assertEqual(measurements, result)
+        self.assertEqual(['ini/1K/interpreter', 'ini/1K/compiled', 'ini/1K/vm',
+                          'csv/1K/interpreter', 'csv/1K/compiled', 'csv/1K/vm'], [m.key for m in result])
+        self.assertEqual(1, len({m.nodes for m in result if m.workload == 'ini'}))
+
+
+class BaselineTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'baseline.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_save_load(self):
+        measurement = suite.Measurement('json', 'vm', '1K', 1030, 0.01, 2000, 4096)
+        suite.save_baseline(self.path, [measurement])
+        baseline = suite.load_baseline(self.path)
+        self.assertEqual(['json/1K/vm'], list(baseline))
+        self.assertEqual(measurement.to_dict(), baseline['json/1K/vm'].to_dict())
+
+    def test_compare(self):
+        baseline = {'json/1K/vm': suite.Measurement('json', 'vm', '1K', 1000, 1.0, 2000, 4000)}
+        same = suite.Measurement('json', 'vm', '1K', 1000, 1.05, 2100, 4200)
+        self.assertEqual([], suite.compare([same], baseline))
+
+        worse = suite.Measurement('json', 'vm', '1K', 1000, 2.0, 3000, 8000)
+        regressions = suite.compare([worse], baseline)
+        self.assertEqual(['throughput', 'nodes', 'peak_memory'], [r.metric for r in regressions])
+        self.assertEqual(-0.5, regressions[0].change)
+        self.assertEqual(0.5, regressions[1].change)
+        self.assertIn('json/1K/vm nodes', str(regressions[1]))
+        self.assertEqual([], suite.compare([worse], baseline, tolerance=1.0))
+
+        other = suite.Measurement('json', 'vm', '1M', 1000, 2.0, 3000, 8000)
+        self.assertEqual([], suite.compare([other], baseline))
+
+    def test_main(self):
+        out = io.StringIO()
+        arguments = ['--workloads', 'ini', '--sizes', '1K', '--engines', 'compiled', '--repeat', '1']
+        self.assertEqual(0, suite.main(arguments + ['--save', self.path], out))
+        self.assertIn('ini/1K/compiled', suite.load_baseline(self.path))
+        self.assertEqual(2, len(out.getvalue().splitlines()))
+
+        baseline = suite.load_baseline(self.path)['ini/1K/compiled']
+        slower = suite.Measurement('ini', 'compiled', '1K', baseline.characters, baseline.seconds, baseline.nodes // 2,
+                                   baseline.peak_memory)
+        suite.save_baseline(self.path, [slower])
+        out = io.StringIO()
+        self.assertEqual(1, suite.main(arguments + ['--baseline', self.path], out))
+        self.assertIn('REGRESSION ini/1K/compiled nodes', out.getvalue())
+
+    def test_main_errors(self):
+        for arguments in (['--workloads', 'unknown'], ['--engines', 'unknown'], ['--sizes', '1T']):
+            with self.assertRaises(SystemExit):
+                suite.main(arguments, io.StringIO())
+
+
+if __name__ == '__main__':
+    unittest.main()
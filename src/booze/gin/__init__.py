@@ -12,8 +12,11 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from booze.gin.analysis import Hazard, HazardKind, analyze
 from booze.gin.aux import *
 from booze.gin.chars import *
+from booze.gin.inputs import *
 from booze.gin.local_vars import *
 from booze.gin.parser import *
+from booze.gin.regex import *
 from booze.gin.rule import *
@@ -0,0 +1,600 @@
+# Copyright 2015 Rafe Kaplan
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import enum
+import itertools
+import weakref
+
+from . import aux
+from . import chars
+from . import parser
+from . import regex
+from . import rule
+from .. import whiskey
+
+
+class CharSet:
+    """Set of characters that may start a match.
+
+    Args:
+        chars: Explicit characters in the set.
+        non_ascii: Whether the set also contains every character outside of ASCII.
+        any_char: Whether the set contains every character.
+    """
+
+    def __init__(self, chars=(), non_ascii=False, any_char=False):
+        self.__chars = frozenset(chars)
+        self.__non_ascii = non_ascii or any_char
+        self.__any_char = any_char
+
+    @property
+    def chars(self):
+        return self.__chars
+
+    @property
+    def non_ascii(self):
+        return self.__non_ascii
+
+    @property
+    def any_char(self):
+        return self.__any_char
+
+    def __contains__(self, c):
+        return self.__any_char or c in self.__chars or (self.__non_ascii and c > '\x7f')
+
+    def __or__(self, other):
+        return CharSet(self.__chars | other.chars, self.__non_ascii or other.non_ascii,
+                       self.__any_char or other.any_char)
+
+    def __eq__(self, other):
+        if not isinstance(other, CharSet):
+            return NotImplemented
+        return (self.__chars, self.__non_ascii, self.__any_char) == (other.chars, other.non_ascii, other.any_char)
+
+    def __hash__(self):
+        return hash((self.__chars, self.__non_ascii, self.__any_char))
+
+    def __repr__(self):
+        if self.__any_char:
+            return 'CharSet(any_char=True)'
+        return 'CharSet({!r}, non_ascii={})'.format(''.join(sorted(self.__chars)), self.__non_ascii)
+
+
+EMPTY = CharSet()
+ANY = CharSet(any_char=True)
+
+
+def reachable(root):
+    """All parsers reachable from root through their children, root first."""
+    nodes = []
+    seen = set()
+    pending = [root]
+    while pending:
+        node = pending.pop()
+        if node in seen:
+            continue
+        seen.add(node)
+        nodes.append(node)
+        pending.extend(reversed(node.children))
+    return nodes
+
+
+class Analysis:
+    """Nullable and FIRST sets of every parser reachable from a root parser.
+
+    Both are computed as a least fixed point, so recursive rules are handled.  Results are conservative: parsers the
+    analysis does not understand are considered nullable and may start with any character.
+
+    Args:
+        root: Parser to analyze.
+        assume_nullable: Whether parsers the analysis does not understand are considered nullable.  When False, only
+            parsers certain to succeed without consuming input are nullable.
+    """
+
+    def __init__(self, root, assume_nullable=True):
+        self.__assume_nullable = assume_nullable
+        self.__nodes = reachable(root)
+        self.__nullable = {node: False for node in self.__nodes}
+        self.__first = {node: EMPTY for node in self.__nodes}
+        changed = True
+        while changed:
+            changed = False
+            for node in self.__nodes:
+                node_nullable, node_first = self.__transfer(node)
+                if node_nullable != self.__nullable[node] or node_first != self.__first[node]:
+                    self.__nullable[node] = node_nullable
+                    self.__first[node] = node_first
+                    changed = True
+
+    @property
+    def nodes(self):
+        return tuple(self.__nodes)
+
+    def nullable(self, node):
+        """Whether node may succeed without consuming input."""
+        return self.__nullable[node]
+
+    def first(self, node):
+        """CharSet of characters node may consume first."""
+        return self.__first[node]
+
+    def __seq(self, parsers):
+        first = EMPTY
+        for p in parsers:
+            first = first | self.__first[p]
+            if not self.__nullable[p]:
+                return False, first
+        return True, first
+
+    def __transfer(self, node):
+        node_type = type(node)
+        if node_type is parser.Char:
+            if node.chars is None or isinstance(node.chars, whiskey.Action):
+                return False, ANY
+            return False, CharSet(node.chars)
+        elif node_type is parser.String:
+            if isinstance(node.string, whiskey.Action):
+                return self.__assume_nullable, ANY
+            return node.string == '', CharSet(node.string[:1])
+        elif node_type is regex.Regex:
+            return self.__assume_nullable or node.regex.match('') is not None, ANY
+        elif node_type is chars.PredicateChar:
+            return False, CharSet(node.ascii_chars, non_ascii=True)
+        elif node_type is parser.Symbols:
+            strings = [string for string, _ in node.symbols]
+            return '' in strings, CharSet(string[0] for string in strings if string)
+        elif node is aux.eps or node is aux.eoi or node is aux.cut or node_type is aux.Attr:
+            return True, EMPTY
+        elif node_type is parser.Seq:
+            return self.__seq(node.parsers)
+        elif node_type is parser.Alt:
+            first = EMPTY
+            for p in node.parsers:
+                first = first | self.__first[p]
+            return any(self.__nullable[p] for p in node.parsers), first
+        elif node_type is parser.Repeat.__parser_type__:
+            return node.minimum == 0 or self.__nullable[node.parser], self.__first[node.parser]
+        elif node_type in (parser.Unary, parser.SemanticAction, regex.RegularLexeme, rule.RuleCall):
+            return self.__nullable[node.parser], self.__first[node.parser]
+        elif node_type is parser.FuncDirectiveParser:
+            if node.func in (parser.omit.func, parser.as_string.func, parser.object_lexeme.func):
+                return self.__nullable[node.parser], self.__first[node.parser]
+            elif node.func is parser.predicate.func:
+                return True, self.__first[node.parser]
+            elif node.func is parser.not_predicate.func:
+                return True, EMPTY
+        elif node_type is rule.Rule and node.children:
+            return self.__nullable[node.parser], self.__first[node.parser]
+        return self.__assume_nullable, ANY
+
+
+class DispatchTable:
+    """Branches of an Alt that may match, by next character.
+
+    Args:
+        alt: Alt parser.
+        alt_analysis: Analysis including alt.
+    """
+
+    def __init__(self, alt, alt_analysis):
+        self.__parsers = alt.parsers
+        branches = [(p, alt_analysis.nullable(p), alt_analysis.first(p)) for p in alt.parsers]
+        self.__count = len(branches)
+        keys = {''}.union(chr(i) for i in range(0x80))
+        for _, _, first in branches:
+            keys |= first.chars
+
+        def viable(c):
+            return tuple(p for p, nullable, first in branches if nullable or (c != '' and c in first))
+
+        self.__table = {c: viable(c) for c in keys}
+        self.__other = tuple(p for p, nullable, first in branches if nullable or first.non_ascii)
+
+    def get(self, c, skipper=None):
+        """Branches to try when c, or '' at end of input, is the next character.
+
+        Args:
+            c: Next character.
+            skipper: Skipper run by each branch before matching.  All branches are tried when it may skip c.
+        """
+        if skipper is not None and c in skipper_first(skipper):
+            return self.__parsers
+        return self.__table.get(c, self.__other)
+
+    @property
+    def table(self):
+        return self.__table
+
+    @property
+    def other(self):
+        """Branches to try for characters outside of ASCII not in table."""
+        return self.__other
+
+    @property
+    def selective(self):
+        """Whether any character rules out a branch."""
+        return any(len(branches) < self.__count for branches in self.__table.values()) or len(
+            self.__other) < self.__count
+
+
+def dispatch_tables(root):
+    """Build dispatch tables for every Alt reachable from root.
+
+    Returns:
+        Dictionary mapping each Alt to its DispatchTable, or to None when every branch may match every character.
+    """
+    root_analysis = Analysis(root)
+    tables = {}
+    for node in root_analysis.nodes:
+        if type(node) is parser.Alt:
+            table = DispatchTable(node, root_analysis)
+            tables[node] = table if table.selective else None
+    return tables
+
+
+_skipper_firsts = weakref.WeakKeyDictionary()
+
+
+def skipper_first(skipper):
+    """CharSet of characters skipper may consume first, cached per skipper."""
+    try:
+        return _skipper_firsts[skipper]
+    except KeyError:
+        first = _skipper_firsts[skipper] = Analysis(skipper).first(skipper)
+        return first
+
+
+class HazardKind(enum.Enum):
+
+    LEFT_RECURSION = 1
+    NULLABLE_REPEAT = 2
+    SHADOWED_ALTERNATIVE = 3
+    EXPONENTIAL_BACKTRACKING = 4
+
+
+class Hazard:
+    """Construct of a grammar that parses forever, can never match or takes exponential time.
+
+    Args:
+        kind: HazardKind of the hazard.
+        node: Parser the hazard was found in.
+        rule: Innermost rule containing node, or None when no rule does.
+        message: Description of the hazard.
+    """
+
+    def __init__(self, kind, node, rule, message):
+        self.__kind = kind
+        self.__node = node
+        self.__rule = rule
+        self.__message = message
+
+    @property
+    def kind(self):
+        return self.__kind
+
+    @property
+    def node(self):
+        return self.__node
+
+    @property
+    def rule(self):
+        return self.__rule
+
+    @property
+    def message(self):
+        return self.__message
+
+    def __str__(self):
+        from . import instrument
+        return '{} in {}: {}'.format(self.__kind.name, instrument.rule_name(self.__rule), self.__message)
+
+    def __repr__(self):
+        return '<Hazard {}>'.format(self)
+
+
+_MAX_LITERALS = 256
+
+
+def _inner(node):
+    """Parser matching exactly what node matches, when node only wraps it, or None."""
+    node_type = type(node)
+    if node_type in (parser.Unary, parser.SemanticAction, regex.RegularLexeme, rule.RuleCall):
+        return node.parser
+    elif node_type is parser.FuncDirectiveParser and node.func in (parser.omit.func, parser.as_string.func,
+                                                                   parser.object_lexeme.func):
+        return node.parser
+    elif node_type is rule.Rule and node.children:
+        return node.parser
+    return None
+
+
+def _literals(node, visiting=frozenset()):
+    """Frozenset of strings node matches, succeeding whenever input starts with one of them, or None."""
+    if node in visiting:
+        return None
+    node_type = type(node)
+    if node_type is parser.String:
+        return frozenset((node.string,)) if isinstance(node.string, str) and node.string else None
+    elif node_type is parser.Char:
+        return node.chars if isinstance(node.chars, frozenset) else None
+    elif node_type is parser.Symbols:
+        strings = frozenset(string for string, _ in node.symbols)
+        return None if '' in strings else strings
+    elif node_type is parser.Alt or node_type is parser.Seq:
+        visiting = visiting | {node}
+        parts = [_literals(p, visiting) for p in node.parsers]
+        if not parts or None in parts:
+            return None
+        if node_type is parser.Alt:
+            return frozenset().union(*parts)
+        size = 1
+        for part in parts:
+            size *= len(part)
+        if size > _MAX_LITERALS:
+            return None
+        return frozenset(''.join(strings) for strings in itertools.product(*parts))
+    inner = _inner(node)
+    return None if inner is None else _literals(inner, visiting | {node})
+
+
+def _prefixes(node, node_analysis, visiting=frozenset()):
+    """Frozenset of strings every match of node starts with one of, or None."""
+    if node in visiting:
+        return None
+    node_type = type(node)
+    if node_type is parser.Symbols:
+        return _literals(node)
+    elif node_type is parser.Alt:
+        parts = [_prefixes(p, node_analysis, visiting | {node}) for p in node.parsers]
+        return None if None in parts else frozenset().union(*parts)
+    elif node_type is parser.Seq:
+        if not node.parsers or node_analysis.nullable(node.parsers[0]):
+            return None
+        return _prefixes(node.parsers[0], node_analysis, visiting | {node})
+    elif node_type is parser.Repeat.__parser_type__:
+        return _prefixes(node.parser, node_analysis, visiting | {node}) if node.minimum >= 1 else None
+    inner = _inner(node)
+    if inner is not None:
+        return _prefixes(inner, node_analysis, visiting | {node})
+    return _literals(node)
+
+
+def _infallible(node, visiting=frozenset()):
+    """Whether node succeeds on any input.  Rules are assumed to fail while they are being decided."""
+    if node in visiting:
+        return False
+    node_type = type(node)
+    visiting = visiting | {node}
+    if node is aux.eps or node is aux.cut or node_type is aux.Attr:
+        return True
+    elif node_type is parser.String:
+        return node.string == ''
+    elif node_type is parser.Symbols:
+        return any(string == '' for string, _ in node.symbols)
+    elif node_type is parser.Seq:
+        return all(_infallible(p, visiting) for p in node.parsers)
+    elif node_type is parser.Alt:
+        return any(_infallible(p, visiting) for p in node.parsers)
+    elif node_type is parser.Repeat.__parser_type__:
+        return node.minimum == 0 or _infallible(node.parser, visiting)
+    elif node_type is parser.FuncDirectiveParser and node.func is parser.predicate.func:
+        return _infallible(node.parser, visiting)
+    inner = _inner(node)
+    return inner is not None and _infallible(inner, visiting)
+
+
+def _sequence(node):
+    """Parsers node runs one after another from the position it starts at, looking through wrappers and sequences but
+    not rules."""
+    while type(node) is not rule.Rule and _inner(node) is not None:
+        node = _inner(node)
+    if type(node) is parser.Seq:
+        return [p for child in node.parsers for p in _sequence(child)]
+    return [node]
+
+
+def _key(node):
+    """Key equal for parsers matching the same literal input, and otherwise node itself."""
+    node_type = type(node)
+    if node_type is parser.String and isinstance(node.string, str):
+        return node_type, node.string
+    elif node_type is parser.Char and isinstance(node.chars, frozenset):
+        return node_type, node.chars
+    elif node_type is parser.Symbols:
+        return node_type, frozenset(string for string, _ in node.symbols)
+    return node
+
+
+def _describe(node):
+    if type(node) is rule.Rule:
+        from . import instrument
+        return instrument.rule_name(node)
+    key = _key(node)
+    if type(node) is parser.String and key is not node:
+        return repr(node.string)
+    elif key is not node and len(key[1]) == 1:
+        return repr(next(iter(key[1])))
+    return type(node).__name__
+
+
+def _reaches(start, target):
+    """Whether target is reachable from start without passing through a memoized rule."""
+    seen = set()
+    pending = [start]
+    while pending:
+        node = pending.pop()
+        if node in seen:
+            continue
+        seen.add(node)
+        if type(node) is rule.Rule and node.memoize:
+            continue
+        for child in node.children:
+            if child is target:
+                return True
+            pending.append(child)
+    return False
+
+
+def _owners(nodes):
+    """Dictionary mapping each parser to the innermost rule containing it."""
+    owners = {}
+    for node in nodes:
+        if type(node) is rule.Rule and node.children:
+            owners[node] = node
+            pending = [node.parser]
+            while pending:
+                child = pending.pop()
+                if child in owners or type(child) is rule.Rule:
+                    continue
+                owners[child] = node
+                pending.extend(child.children)
+    return owners
+
+
+def _left_recursion(nodes, strict):
+    """Rules reaching themselves without consuming input, each with the cycle of rules it recurses through."""
+
+    def left_children(node):
+        if type(node) is not parser.Seq:
+            return node.children
+        children = []
+        for p in node.parsers:
+            children.append(p)
+            if not strict.nullable(p):
+                break
+        return children
+
+    for node in nodes:
+        if type(node) is not rule.Rule or not node.children:
+            continue
+        parents = {node.parser: None}
+        pending = [node.parser]
+        while pending:
+            current = pending.pop()
+            if current is node:
+                cycle = [node]
+                current = parents[current]
+                while current is not None:
+                    if type(current) is rule.Rule:
+                        cycle.append(current)
+                    current = parents[current]
+                cycle.append(node)
+                yield node, cycle[::-1]
+                break
+            for child in left_children(current):
+                if child not in parents:
+                    parents[child] = current
+                    pending.append(child)
+
+
+def analyze(root):
+    """Find constructs in the grammar of root that make parsing hang, fail or take exponential time.
+
+    Reports, in this order:
+
+        Left-recursive rules, which recurse forever.
+        Unbounded repeats of parsers that may succeed without consuming input, which loop forever.
+        Branches of an Alt that can never match because an earlier branch always matches first, such as 'ab' after
+            'a', or any branch after one that always succeeds.
+        Branches of an Alt starting with the same parsers, up to one that reaches the Alt again without memoization,
+            so that nested input is parsed again by every branch at every level.  Literals are the same parser when
+            they match the same strings.
+
+    Nullability is decided over every rule by the same fixed point as Analysis, counting only parsers certain to
+    succeed without consuming input, so every hazard reported is real.  Parsers the analysis does not understand may
+    hide hazards.
+
+    Args:
+        root: Parser to analyze.
+
+    Returns:
+        List of Hazard.
+    """
+    from . import instrument
+    strict = Analysis(root, assume_nullable=False)
+    conservative = Analysis(root)
+    nodes = strict.nodes
+    owners = _owners(nodes)
+    hazards = []
+
+    for node, cycle in _left_recursion(nodes, strict):
+        hazards.append(Hazard(HazardKind.LEFT_RECURSION, node, node,
+                              'recurses through {} before consuming input'.format(
+                                  ' -> '.join(instrument.rule_name(r) for r in cycle))))
+
+    for node in nodes:
+        if type(node) is parser.Repeat.__parser_type__ and node.maximum is None and strict.nullable(node.parser):
+            hazards.append(Hazard(HazardKind.NULLABLE_REPEAT, node, owners.get(node),
+                                  'repeats a parser that may succeed without consuming input'))
+
+    for node in nodes:
+        if type(node) is not parser.Alt:
+            continue
+        branches = node.parsers
+        shadowed = set()
+        for i, earlier in enumerate(branches[:-1]):
+            if _infallible(earlier):
+                for j in range(i + 1, len(branches)):
+                    if j not in shadowed:
+                        shadowed.add(j)
+                        hazards.append(Hazard(HazardKind.SHADOWED_ALTERNATIVE, branches[j], owners.get(node),
+                                              'branch {} is never tried, as branch {} always succeeds'.format(
+                                                  j + 1, i + 1)))
+                break
+            literals = _literals(earlier)
+            if not literals:
+                continue
+            for j in range(i + 1, len(branches)):
+                prefixes = _prefixes(branches[j], conservative)
+                if j in shadowed or not prefixes:
+                    continue
+                matched = sorted(prefix for prefix in prefixes if any(prefix.startswith(l) for l in literals))
+                if len(matched) == len(prefixes):
+                    shadowed.add(j)
+                    hazards.append(Hazard(HazardKind.SHADOWED_ALTERNATIVE, branches[j], owners.get(node),
+                                          'branch {} never matches, as branch {} matches a prefix of {} first'.format(
+                                              j + 1, i + 1, ', '.join(map(repr, matched)))))
+                elif matched:
+                    hazards.append(Hazard(HazardKind.SHADOWED_ALTERNATIVE, branches[j], owners.get(node),
+                                          'branch {} never matches {}, as branch {} matches a prefix first'.format(
+                                              j + 1, ', '.join(map(repr, matched)), i + 1)))
+
+    for node in nodes:
+        if type(node) is not parser.Alt:
+            continue
+        sequences = [_sequence(branch) for branch in node.parsers]
+        found = []
+        pending = [(range(len(sequences)), 0)]
+        while pending:
+            indices, depth = pending.pop()
+            groups = {}
+            for i in indices:
+                if depth < len(sequences[i]):
+                    groups.setdefault(_key(sequences[i][depth]), []).append(i)
+            for group in groups.values():
+                if len(group) < 2:
+                    continue
+                element = sequences[group[0]][depth]
+                if (type(element) is not rule.Rule or not element.memoize) and (element is node or
+                                                                               _reaches(element, node)):
+                    found.append((group, depth))
+                else:
+                    pending.append((group, depth + 1))
+        for indices, depth in sorted(found):
+            hazards.append(Hazard(HazardKind.EXPONENTIAL_BACKTRACKING, node, owners.get(node),
+                                  'branches {} all start with {}, which reaches this alternative again, so each '
+                                  'level of nesting parses its input again; memoize the rule'.format(
+                                      ', '.join(str(i + 1) for i in indices),
+                                      ' << '.join(_describe(p) for p in sequences[indices[0]][:depth + 1]))))
+    return hazards
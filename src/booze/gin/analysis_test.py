@@ -0,0 +1,292 @@
+# Copyright 2015 Rafe Kaplan
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pickle
+import unittest
+
+from booze import whiskey
+from booze.gin import analysis
+from booze.gin import aux
+from booze.gin import chars
+from booze.gin import parser
+from booze.gin import regex
+from booze.gin import rule
+
+
+class CharSetTest(unittest.TestCase):
+
+    def test_contains(self):
+        s = analysis.CharSet('ab')
+        self.assertIn('a', s)
+        self.assertNotIn('c', s)
+        self.assertNotIn('é', s)
+        self.assertNotIn('', s)
+
+    def test_non_ascii(self):
+        s = analysis.CharSet('a', non_ascii=True)
+        self.assertIn('é', s)
+        self.assertNotIn('b', s)
+
+    def test_any(self):
+        self.assertIn('b', analysis.ANY)
+        self.assertIn('é', analysis.ANY)
+        self.assertTrue(analysis.ANY.non_ascii)
+
+    def test_union(self):
+        self.assertEqual(analysis.CharSet('abc', non_ascii=True),
+                         analysis.CharSet('ab') | analysis.CharSet('c', non_ascii=True))
+
+
+class AnalysisTest(unittest.TestCase):
+
+    def assertAnalysis(self, nullable, first, p):
+        a = analysis.Analysis(p)
+        self.assertEqual(nullable, a.nullable(p))
+        self.assertEqual(first, a.first(p))
+
+    def test_primitives(self):
+        self.assertAnalysis(False, analysis.CharSet('ab'), parser.Char('ab'))
+        self.assertAnalysis(False, analysis.ANY, parser.Char())
+        self.assertAnalysis(False, analysis.ANY, parser.Char(whiskey.p[0]))
+        self.assertAnalysis(False, analysis.CharSet('a'), parser.String('abc'))
+        self.assertAnalysis(True, analysis.EMPTY, parser.String(''))
+        self.assertAnalysis(True, analysis.ANY, parser.String(whiskey.p[0]))
+        self.assertAnalysis(False, analysis.CharSet(chars.digit.ascii_chars, non_ascii=True), chars.digit)
+        self.assertAnalysis(False, analysis.CharSet('+-'), parser.Symbols({'+': 1, '-': 2}))
+        self.assertAnalysis(True, analysis.CharSet('+'), parser.Symbols({'+': 1, '': 2}))
+        for p in (aux.eps, aux.eoi, aux.cut, aux.Attr(1)):
+            self.assertAnalysis(True, analysis.EMPTY, p)
+
+    def test_composites(self):
+        a = parser.Char('a')
+        b = parser.Char('b')
+        self.assertAnalysis(False, analysis.CharSet('a'), a << b)
+        self.assertAnalysis(False, analysis.CharSet('ab'), -a << b)
+        self.assertAnalysis(True, analysis.CharSet('ab'), -a << -b)
+        self.assertAnalysis(False, analysis.CharSet('ab'), a | b)
+        self.assertAnalysis(True, analysis.CharSet('ab'), a | -b)
+        self.assertAnalysis(False, analysis.CharSet('a'), +a)
+        self.assertAnalysis(True, analysis.CharSet('a'), parser.Repeat(0, 3)[a])
+
+    def test_directives(self):
+        a = parser.Char('a')
+        self.assertAnalysis(False, analysis.CharSet('a'), parser.lexeme[a << a])
+        self.assertAnalysis(False, analysis.CharSet('a'), parser.omit[a])
+        self.assertAnalysis(False, analysis.CharSet('a'), a[lambda v: v])
+        self.assertAnalysis(True, analysis.CharSet('a'), parser.predicate[a])
+        self.assertAnalysis(True, analysis.EMPTY, parser.not_[a])
+
+    def test_unknown(self):
+        self.assertAnalysis(True, analysis.ANY, parser.Parser())
+        self.assertAnalysis(True, analysis.ANY, rule.Rule())
+
+    def test_not_assume_nullable(self):
+        for p in (parser.Parser(), rule.Rule(), parser.String(whiskey.p[0]), regex.Regex('a+')):
+            a = analysis.Analysis(p, assume_nullable=False)
+            self.assertFalse(a.nullable(p))
+            self.assertEqual(analysis.ANY, a.first(p))
+        a = analysis.Analysis(regex.Regex('a*'), assume_nullable=False)
+        self.assertTrue(a.nullable(a.nodes[0]))
+        self.assertAnalysis(True, analysis.ANY, regex.Regex('a+'))
+
+    def test_recursive_rules(self):
+        r = rule.Rule()
+        s = rule.Rule()
+        r %= (parser.Char('(') << s << parser.Char(')')) | s
+        s %= -r << parser.Char('x')
+        a = analysis.Analysis(r)
+        self.assertFalse(a.nullable(r))
+        self.assertEqual(analysis.CharSet('(x'), a.first(r))
+        self.assertEqual(analysis.CharSet('(x'), a.first(s))
+
+    def test_rule_call(self):
+        r = rule.Rule()
+        r %= parser.Char('a')
+        self.assertAnalysis(False, analysis.CharSet('a'), r(1))
+
+
+class DispatchTableTest(unittest.TestCase):
+
+    def test_get(self):
+        a = parser.Char('a')
+        b = parser.String('bc')
+        e = -parser.Char('e')
+        alt = a | b | e | chars.alpha
+        table = alt.dispatch_table
+        self.assertEqual((a, e, chars.alpha), table.get('a'))
+        self.assertEqual((b, e, chars.alpha), table.get('b'))
+        self.assertEqual((e,), table.get('1'))
+        self.assertEqual((e, chars.alpha), table.get('é'))
+        self.assertEqual((e,), table.get(''))
+
+    def test_skipper(self):
+        a = parser.Char('a')
+        b = parser.Char('b')
+        table = (a | b).dispatch_table
+        self.assertEqual((a,), table.get('a', parser.Char(' ')))
+        self.assertEqual((a, b), table.get(' ', parser.Char(' ')))
+
+    def test_not_selective(self):
+        self.assertIsNone((-parser.Char('a') | aux.eps).dispatch_table)
+        self.assertIsNone((parser.Parser() | aux.eps).dispatch_table)
+
+    def test_shared(self):
+        inner = parser.Char('a') | parser.Char('b')
+        outer = (parser.Char('x') << inner) | parser.Char('y')
+        self.assertIsNotNone(outer.dispatch_table)
+        self.assertEqual((inner.parsers[1],), inner.dispatch_table.get('b'))
+
+    def test_parse(self):
+        c = rule.Rule(memoize=True)
+        c %= parser.Char('c')
+        alt = (parser.Char('b') << parser.Char('a')) | (parser.Char('a') << parser.Char('b')) | c
+        self.assertEqual((True, ('a', 'b')), alt.parse('ab'))
+        self.assertEqual((True, ('b', 'a')), alt.parse(' ba', ' '))
+        for text, skipper, tried in (('x', None, 0), ('c', None, 1), (' x', ' ', 0)):
+            state = parser.ParserState(text, skipper)
+            alt.parse(state)
+            self.assertEqual(tried, len(state.memo), text)
+
+    def test_rule_reassigned(self):
+        r = rule.Rule()
+        r %= 'a'
+        alt = r | 'b'
+        self.assertEqual((True, parser.UNUSED), alt.parse('a'))
+        r %= 'c'
+        self.assertEqual((True, parser.UNUSED), alt.parse('c'))
+        self.assertEqual((False, None), alt.parse('a'))
+
+    def test_pickled_table(self):
+        alt = parser.Char('a') | parser.Char('b')
+        self.assertIsNotNone(alt.dispatch_table)
+        pickled = pickle.dumps(alt)
+        r = rule.Rule()
+        r %= 'x'
+        copy = pickle.loads(pickled)
+        _, table = vars(copy)['_Alt__dispatch_table']
+        self.assertIs(table, copy.dispatch_table)
+        self.assertEqual((True, 'b'), copy.parse('b'))
+
+    def test_parse_unskipped(self):
+        p = +(parser.Char('a') | parser.Char('b'))
+        self.assertEqual((True, ('a', 'b')), p.parse('a b', ' '))
+
+
+class AnalyzeTest(unittest.TestCase):
+
+    def assertHazards(self, expected, p):
+        self.assertEqual(expected, [(h.kind, h.message) for h in analysis.analyze(p)])
+
+    def test_safe(self):
+        digits = rule.Rule(name='digits')
+        digits %= +chars.digit
+        items = digits << -+(',' << digits) << aux.eoi
+        self.assertEqual([], analysis.analyze(items))
+        self.assertEqual([], analysis.analyze(+parser.Parser()))
+        self.assertEqual([], analysis.analyze(parser.Char('a') | aux.eps))
+
+    def test_left_recursion(self):
+        exp = rule.Rule(name='exp')
+        term = rule.Rule(name='term')
+        exp %= (term << '+' << parser.Char('1')) | parser.Char('1')
+        term %= -parser.Char(' ') << exp
+        hazards = analysis.analyze(exp)
+        self.assertEqual([analysis.HazardKind.LEFT_RECURSION] * 2, [h.kind for h in hazards])
+        self.assertEqual([exp, term], [h.rule for h in hazards])
+        self.assertEqual('recurses through exp -> term -> exp before consuming input', hazards[0].message)
+        self.assertEqual('LEFT_RECURSION in exp: recurses through exp -> term -> exp before consuming input',
+                         str(hazards[0]))
+
+    def test_right_recursion(self):
+        exp = rule.Rule(parser.AttrType.OBJECT, name='exp')
+        exp %= (parser.Char('1') << '+' << exp) | parser.Char('1')
+        self.assertEqual([], analysis.analyze(exp))
+
+    def test_nullable_repeat(self):
+        r = rule.Rule(name='r')
+        r %= +(-parser.Char('x'))
+        hazards = analysis.analyze(r)
+        self.assertHazards([(analysis.HazardKind.NULLABLE_REPEAT,
+                             'repeats a parser that may succeed without consuming input')], r)
+        self.assertIs(r, hazards[0].rule)
+        self.assertEqual(1, len(analysis.analyze(+aux.eps)))
+        self.assertEqual(1, len(analysis.analyze(-+parser.predicate[parser.Char('x')])))
+        self.assertEqual([], analysis.analyze(parser.Repeat(0, 3)[aux.eps]))
+
+    def test_shadowed_prefix(self):
+        self.assertHazards([(analysis.HazardKind.SHADOWED_ALTERNATIVE,
+                             "branch 2 never matches, as branch 1 matches a prefix of 'ab' first")],
+                           parser.String('a') | parser.String('ab'))
+        self.assertHazards([(analysis.HazardKind.SHADOWED_ALTERNATIVE,
+                             "branch 2 never matches, as branch 1 matches a prefix of '<<', '<=' first")],
+                           parser.Symbols({'<': 1, '>': 2}) | (parser.Symbols({'<=': 3, '<<': 4}) << chars.digit))
+        self.assertEqual([], analysis.analyze(parser.String('ab') | parser.String('a')))
+        self.assertEqual([], analysis.analyze(parser.Symbols({'a': 1, 'ab': 2})))
+
+    def test_shadowed_symbols(self):
+        self.assertHazards([(analysis.HazardKind.SHADOWED_ALTERNATIVE,
+                             "branch 2 never matches '+=', as branch 1 matches a prefix first")],
+                           parser.lit('+') | parser.Symbols({'+=': 1, '-=': 2}))
+
+    def test_shadowed_by_infallible(self):
+        self.assertHazards([(analysis.HazardKind.SHADOWED_ALTERNATIVE,
+                             'branch 2 is never tried, as branch 1 always succeeds'),
+                            (analysis.HazardKind.SHADOWED_ALTERNATIVE,
+                             'branch 3 is never tried, as branch 1 always succeeds')],
+                           -parser.Char('a') | parser.Char('b') | parser.Char('c'))
+
+    def test_exponential(self):
+        value = rule.Rule(name='value')
+        mult = rule.Rule(name='mult')
+        mult %= (value << '*' << mult) | value
+        value %= chars.digit | '(' << mult << ')'
+        hazards = analysis.analyze(mult)
+        self.assertEqual([analysis.HazardKind.EXPONENTIAL_BACKTRACKING], [h.kind for h in hazards])
+        self.assertIs(mult, hazards[0].rule)
+        self.assertIn('branches 1, 2 all start with value', hazards[0].message)
+
+        memoized = rule.Rule(memoize=True, name='value')
+        mult %= (memoized << '*' << mult) | memoized
+        memoized %= chars.digit | '(' << mult << ')'
+        self.assertEqual([], analysis.analyze(mult))
+
+    def test_exponential_literal_prefix(self):
+        exp = rule.Rule(name='exp')
+        exp %= ('(' << exp << ')' << '+') | ('(' << exp << ')') | chars.digit
+        self.assertHazards([(analysis.HazardKind.EXPONENTIAL_BACKTRACKING,
+                             "branches 1, 2 all start with '(' << exp, which reaches this alternative again, so each "
+                             "level of nesting parses its input again; memoize the rule")], exp)
+
+        inner = rule.Rule(name='inner')
+        inner %= parser.Char('a') | exp
+        exp %= (parser.String('[') << parser.Char('x') << inner) | (parser.lit('[') << parser.Char('x') << inner << ';')
+        hazards = analysis.analyze(exp)
+        self.assertEqual([analysis.HazardKind.EXPONENTIAL_BACKTRACKING], [h.kind for h in hazards])
+        self.assertIn("all start with '[' << 'x' << inner", hazards[0].message)
+
+    def test_shared_prefix_not_recursive(self):
+        word = rule.Rule(name='word')
+        word %= +chars.alpha
+        self.assertEqual([], analysis.analyze((word << ';') | (word << ',')))
+        exp = rule.Rule(name='exp')
+        exp %= ('(' << exp << ')') | ('[' << exp << ']') | chars.digit
+        self.assertEqual([], analysis.analyze(exp))
+
+    def test_package(self):
+        import booze.gin
+        self.assertIs(analysis.analyze, booze.gin.analyze)
+        self.assertEqual(1, len((+aux.eps).analyze()))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -55,7 +55,7 @@ class eoi(parser.Parser):
         return parser.AttrType.UNUSED
 
     def _parse(self, state):
-        if state.read(1) == '':
+        if state.read_char() == '':
             state.commit()
 
 
@@ -69,3 +69,14 @@ class eps(parser.Parser):
     def _parse(self, state):
         state.succeed()
 
+
+@util.singleton
+class cut(parser.Parser):
+
+    @property
+    def attr_type(self):
+        return parser.AttrType.UNUSED
+
+    def _parse(self, state):
+        state.cut()
+        state.commit()
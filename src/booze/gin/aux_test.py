@@ -83,5 +83,56 @@ class EpsTest(unittest.TestCase):
         self.assertEqual(parser.AttrType.UNUSED, aux.eps.attr_type)
 
 
+class CutTest(unittest.TestCase):
+
+    def test_parse(self):
+        s = io.StringIO('ab')
+        p = parser.Char('a') << aux.cut << parser.Char('b')
+        self.assertEqual((True, ('a', 'b')), p.parse(s))
+        self.assertEqual(2, s.tell())
+
+    def test_alt_not_tried(self):
+        calls = []
+        p = (parser.Char('a') << aux.cut << parser.Char('b')) | parser.String('ac')[calls.append]
+        with self.assertRaisesRegex(parser.ExpectationFailure, 'Expectation failed at position 1') as context:
+            p.parse('ac')
+        self.assertEqual(1, context.exception.pos)
+        self.assertEqual([], calls)
+
+    def test_alt_before_cut(self):
+        p = (parser.Char('a') << aux.cut << parser.Char('b')) | parser.String('xc')
+        self.assertEqual((True, 'xc'), p.parse('xc'))
+
+    def test_repeat(self):
+        p = +(parser.Char('a') << aux.cut << parser.Char('b'))
+        s = io.StringIO('ababx')
+        self.assertEqual((True, (('a', 'b'), ('a', 'b'))), p.parse(s))
+        self.assertEqual(4, s.tell())
+        with self.assertRaises(parser.ExpectationFailure):
+            p.parse('abax')
+
+    def test_enclosing_failure(self):
+        p = (parser.Char('a') << aux.cut) << parser.Char('b')
+        with self.assertRaises(parser.ExpectationFailure):
+            p.parse('ac')
+
+    def test_releases_memo(self):
+        s = parser.ParserState('ab')
+        s.memo.put('key', None)
+        (parser.Char('a') << aux.cut).parse(s)
+        self.assertEqual(0, len(s.memo))
+
+    def test_state_usable_after_cut(self):
+        s = parser.ParserState('abab')
+        p = parser.Char('a') << aux.cut << parser.Char('b')
+        self.assertEqual((True, ('a', 'b')), p.parse(s))
+        self.assertEqual((False, None), parser.Char('x').parse(s))
+        self.assertEqual(2, s.tell())
+        self.assertEqual((True, ('a', 'b')), p.parse(s))
+
+    def test_attr_type(self):
+        self.assertEqual(parser.AttrType.UNUSED, aux.cut.attr_type)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,314 @@
+# Copyright 2015 Rafe Kaplan
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import enum
+import hashlib
+import inspect
+import os
+import pickle
+import re
+import sys
+import tempfile
+import types
+
+from . import analysis
+from . import parser
+
+# Attributes computed from the rest of a parser, left out of fingerprints.
+_DERIVED_ATTRIBUTES = frozenset(['_Alt__dispatch_table'])
+
+_LITERAL_TYPES = (type(None), bool, int, float, complex, str, bytes)
+
+_FUNCTION_TYPES = (types.FunctionType, types.BuiltinFunctionType, types.MethodDescriptorType,
+                   types.WrapperDescriptorType, types.ClassMethodDescriptorType, type)
+
+# Digest of the running Python and booze sources, computed on first use.
+_environment = None
+
+
+class _Token:
+    """Text written to a fingerprint as-is once the values before it are written."""
+
+    def __init__(self, text):
+        self.text = text
+
+
+def _without_caches(state):
+    return {k: v for k, v in state.items() if not k.startswith('_cached_') and k not in _DERIVED_ATTRIBUTES}
+
+
+def _state(value):
+    """Attributes of an object describing it, without caches."""
+    getstate = getattr(value, '__getstate__', None)
+    state = getstate() if getstate is not None else getattr(value, '__dict__', None)
+    return _without_caches(state) if isinstance(state, dict) else {}
+
+
+def _reduce(value):
+    """Callable, arguments and state pickle would recreate an object with, or its global name."""
+    try:
+        reduced = value.__reduce_ex__(pickle.HIGHEST_PROTOCOL)
+    except Exception:
+        return None, (), _state(value)
+    if isinstance(reduced, str):
+        return reduced
+    function, args, state = (tuple(reduced) + (None, None))[:3]
+    return function, args, _without_caches(state) if isinstance(state, dict) else state
+
+
+def _code_digest(code):
+    digest = hashlib.sha256(code.co_code)
+    digest.update(repr(code.co_names).encode('utf-8'))
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            digest.update(_code_digest(const).encode('utf-8'))
+        else:
+            digest.update(repr(const).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _name(value):
+    return '{}:{}'.format(getattr(value, '__module__', None), getattr(value, '__qualname__', type(value).__qualname__))
+
+
+class _Encoder:
+    """Deterministic text encoding of values reachable from a parser graph.
+
+    Parsers of the graph are written by their number, so the encoding does not depend on object identity.  Other
+    objects are written by type and attributes, functions by name and code, and objects already written by a back
+    reference, so cycles terminate.  Sets and dictionaries are written in sorted order.
+
+    Args:
+        numbers: Number of each parser of the graph.
+    """
+
+    def __init__(self, numbers):
+        self.__numbers = numbers
+        self.__seen = {}
+        # Objects written so far, kept alive so their ids are not reused while encoding.
+        self.__written = []
+
+    def encode(self, value):
+        tokens = []
+        pending = [value]
+        while pending:
+            value = pending.pop()
+            if type(value) is _Token:
+                tokens.append(value.text)
+                continue
+            number = self.__numbers.get(value) if isinstance(value, parser.Parser) else None
+            if number is not None:
+                tokens.append('#{}'.format(number))
+            elif type(value) in _LITERAL_TYPES:
+                tokens.append(repr(value))
+            elif isinstance(value, enum.Enum):
+                tokens.append('{}.{}'.format(_name(type(value)), value.name))
+            elif isinstance(value, (tuple, list)):
+                tokens.append('{}['.format(type(value).__name__))
+                pending.append(_Token(']'))
+                pending.extend(reversed(value))
+            elif isinstance(value, (set, frozenset)):
+                tokens.append('{}[{}]'.format(type(value).__name__, ','.join(sorted(self.encode(v) for v in value))))
+            elif isinstance(value, dict):
+                items = sorted('{}:{}'.format(self.encode(k), self.encode(v)) for k, v in value.items())
+                tokens.append('dict[{}]'.format(','.join(items)))
+            elif isinstance(value, re.Pattern):
+                tokens.append('re[{!r},{}]'.format(value.pattern, value.flags))
+            elif id(value) in self.__seen:
+                tokens.append('@{}'.format(self.__seen[id(value)]))
+            else:
+                self.__seen[id(value)] = len(self.__written)
+                self.__written.append(value)
+                if isinstance(value, _FUNCTION_TYPES):
+                    tokens.append(self.__function(value))
+                elif isinstance(value, types.MethodType):
+                    tokens.append('method[')
+                    pending += [_Token(']'), value.__func__, value.__self__]
+                else:
+                    tokens.append('{}{{'.format(_name(type(value))))
+                    pending += [_Token('}'), _reduce(value)]
+        return ' '.join(tokens)
+
+    def __function(self, func):
+        code = getattr(func, '__code__', None)
+        if code is None:
+            return _name(func)
+        closure = tuple(cell.cell_contents for cell in func.__closure__ or () if cell.cell_contents is not func)
+        return '{}[{},{},{}]'.format(_name(func), _code_digest(code), self.encode(func.__defaults__),
+                                     self.encode(closure))
+
+
+def fingerprint(root):
+    """Structural fingerprint of a parser graph.
+
+    Two graphs have the same fingerprint when they are made of the same types of parsers, connected the same way and
+    configured with equal values.  Functions used by semantic actions and predicates are compared by module, name and
+    code.  Cached analysis results are not part of the fingerprint, so it is the same before and after parsing.
+
+    Args:
+        root: Parser at the root of the graph.
+
+    Returns:
+        Hexadecimal SHA-256 digest.
+    """
+    nodes = analysis.reachable(root)
+    numbers = {node: number for number, node in enumerate(nodes)}
+    encoder = _Encoder(numbers)
+    digest = hashlib.sha256()
+    for number, node in enumerate(nodes):
+        state = _state(node)
+        description = ' '.join('{}={}'.format(k, encoder.encode(state[k])) for k in sorted(state))
+        digest.update('#{} {} {}\n'.format(number, _name(type(node)), description).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def environment():
+    """Digest of the Python version and booze sources.
+
+    Pickled grammars are only loaded by the same Python and booze they were stored with.
+    """
+    global _environment
+    if _environment is None:
+        digest = hashlib.sha256(sys.version.encode('utf-8'))
+        package = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        for directory, subdirectories, files in os.walk(package):
+            subdirectories.sort()
+            for name in sorted(files):
+                if name.endswith('.py'):
+                    path = os.path.join(directory, name)
+                    digest.update(os.path.relpath(path, package).encode('utf-8'))
+                    with open(path, 'rb') as source:
+                        digest.update(source.read())
+        _environment = digest.hexdigest()
+    return _environment
+
+
+def prepare(root):
+    """Compute and cache the analysis results of every parser reachable from root.
+
+    Attribute types and Alt dispatch tables are computed on first use.  Computing them before pickling stores them
+    with the grammar.
+    """
+    for node in analysis.reachable(root):
+        try:
+            node.attr_type
+        except NotImplementedError:
+            pass
+        if isinstance(node, parser.Alt):
+            node.dispatch_table
+
+
+class GrammarCache:
+    """Directory of pickled, analyzed parser graphs.
+
+    Building a large grammar and analyzing it happens on first parse in every process.  A cache lets later processes
+    load the analyzed graph instead.  Grammars are stored under their fingerprint, or any other key, and may only be
+    loaded by the same Python version and booze sources they were stored with.
+
+    Example:
+
+        cache = GrammarCache(os.path.expanduser('~/.cache/my_grammars'))
+        document = cache.get(build_document_grammar)
+
+    Compiled parsers hold generated functions that can not be pickled.  Cache the parser graph and compile the loaded
+    parser instead.
+
+    Args:
+        directory: Directory holding cached grammars.  Created when first storing a grammar.
+    """
+
+    def __init__(self, directory):
+        self.__directory = directory
+
+    @property
+    def directory(self):
+        return self.__directory
+
+    def path(self, key):
+        """Path of the file holding the grammar stored under key."""
+        return os.path.join(self.__directory, '{}.grammar'.format(key))
+
+    def store(self, root, key=None):
+        """Analyze and store a grammar.
+
+        The file is replaced atomically, so processes storing the same grammar concurrently do not interfere.
+
+        Args:
+            root: Parser at the root of the grammar.
+            key: Key to store the grammar under.  Defaults to its fingerprint.
+
+        Returns:
+            Key the grammar is stored under.
+        """
+        if key is None:
+            key = fingerprint(root)
+        prepare(root)
+        data = pickle.dumps((environment(), root), pickle.HIGHEST_PROTOCOL)
+        os.makedirs(self.__directory, exist_ok=True)
+        descriptor, temp_path = tempfile.mkstemp(dir=self.__directory, suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'wb') as temp_file:
+                temp_file.write(data)
+            os.replace(temp_path, self.path(key))
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        return key
+
+    def load(self, key):
+        """Load the grammar stored under key.
+
+        Returns:
+            Root parser of the grammar, or None when no usable grammar is stored under key.
+        """
+        try:
+            with open(self.path(key), 'rb') as grammar_file:
+                stored_environment, root = pickle.load(grammar_file)
+        except Exception:
+            # Missing, truncated or from an incompatible booze.
+            return None
+        if stored_environment != environment():
+            return None
+        return root
+
+    def get(self, builder, key=None):
+        """Load the grammar built by a function, building and storing it when not yet cached.
+
+        The grammar is cached under a key derived from the source file of the module defining builder, so changing
+        that file builds the grammar again.  Grammars depending on other files should pass a key that changes with
+        them.
+
+        Args:
+            builder: Function without arguments returning the root parser of the grammar.
+            key: Additional string distinguishing grammars built by the same function.
+
+        Returns:
+            Root parser of the grammar.
+        """
+        digest = hashlib.sha256(_name(builder).encode('utf-8'))
+        digest.update(repr(key).encode('utf-8'))
+        try:
+            source_path = inspect.getsourcefile(builder)
+        except TypeError:
+            source_path = None
+        if source_path is not None:
+            with open(source_path, 'rb') as source:
+                digest.update(source.read())
+        builder_key = digest.hexdigest()
+
+        root = self.load(builder_key)
+        if root is None:
+            root = builder()
+            self.store(root, builder_key)
+        return root
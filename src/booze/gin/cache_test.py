@@ -0,0 +1,149 @@
+# Copyright 2015 Rafe Kaplan
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import functools
+import os
+import shutil
+import tempfile
+import unittest
+
+from booze import whiskey
+from booze.bench import grammars
+from booze.gin import cache
+from booze.gin import parser
+from booze.gin import rule
+
+build_count = 0
+
+
+def counted_calculator():
+    global build_count
+    build_count += 1
+    return grammars.calculator()
+
+
+def words():
+    word = rule.Rule()
+    word %= +parser.Char('abc')
+    return word << parser.Repeat()[' ' << word]
+
+
+class FingerprintTestCase(unittest.TestCase):
+
+    def test_same_structure(self):
+        self.assertEqual(cache.fingerprint(grammars.calculator()), cache.fingerprint(grammars.calculator()))
+
+    def test_different_structure(self):
+        self.assertNotEqual(cache.fingerprint(parser.Char('a') << 'b'), cache.fingerprint(parser.Char('a') | 'b'))
+        self.assertNotEqual(cache.fingerprint(parser.Char('a')), cache.fingerprint(parser.Char('b')))
+        self.assertNotEqual(cache.fingerprint(parser.Repeat(1)[parser.Char('a')]),
+                            cache.fingerprint(parser.Repeat(2)[parser.Char('a')]))
+
+    def test_functions(self):
+        self.assertEqual(cache.fingerprint(parser.Char('a')[str.upper]), cache.fingerprint(parser.Char('a')[str.upper]))
+        self.assertNotEqual(cache.fingerprint(parser.Char('a')[str.upper]),
+                            cache.fingerprint(parser.Char('a')[str.lower]))
+        self.assertNotEqual(cache.fingerprint(parser.Char('a')[lambda v: v + 'a']),
+                            cache.fingerprint(parser.Char('a')[lambda v: v + 'b']))
+
+    def test_actions(self):
+        p = whiskey.p
+        self.assertEqual(cache.fingerprint(parser.Char('a')[p[0] + 1]), cache.fingerprint(parser.Char('a')[p[0] + 1]))
+        self.assertNotEqual(cache.fingerprint(parser.Char('a')[p[0] + 1]),
+                            cache.fingerprint(parser.Char('a')[p[0] + 2]))
+
+    def test_partial(self):
+        self.assertEqual(cache.fingerprint(parser.Char('a')[functools.partial(str.replace, 'a', 'b')]),
+                         cache.fingerprint(parser.Char('a')[functools.partial(str.replace, 'a', 'b')]))
+        self.assertNotEqual(cache.fingerprint(parser.Char('a')[functools.partial(str.replace, 'a', 'b')]),
+                            cache.fingerprint(parser.Char('a')[functools.partial(str.replace, 'a', 'c')]))
+
+    def test_shared_parsers(self):
+        a = parser.Char('a')
+        self.assertNotEqual(cache.fingerprint(a << a), cache.fingerprint(parser.Char('a') << parser.Char('a')))
+
+    def test_recursive(self):
+        self.assertEqual(cache.fingerprint(words()), cache.fingerprint(words()))
+
+    def test_analysis_not_included(self):
+        grammar = grammars.calculator()
+        before = cache.fingerprint(grammar)
+        grammar.parse('1+(2*3)\n')
+        cache.prepare(grammar)
+        self.assertEqual(before, cache.fingerprint(grammar))
+
+
+class GrammarCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = cache.GrammarCache(os.path.join(self.directory, 'grammars'))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_store_load(self):
+        key = self.cache.store(grammars.calculator())
+        self.assertEqual(cache.fingerprint(grammars.calculator()), key)
+        self.assertTrue(os.path.exists(self.cache.path(key)))
+
+        grammar = self.cache.load(key)
+        self.assertEqual(key, cache.fingerprint(grammar))
+        self.assertEqual((True, (7,)), grammar.parse('1+(2*3)\n'))
+        self.assertEqual([], [name for name in os.listdir(self.cache.directory) if name.endswith('.tmp')])
+
+    def test_store_analysis(self):
+        key = self.cache.store(words())
+        grammar = self.cache.load(key)
+        self.assertIn('_cached_attr_type', vars(grammar))
+
+    def test_store_key(self):
+        self.assertEqual('words', self.cache.store(words(), 'words'))
+        self.assertEqual(words().parse('ab c'), self.cache.load('words').parse('ab c'))
+
+    def test_load_missing(self):
+        self.assertIsNone(self.cache.load('missing'))
+
+    def test_load_corrupt(self):
+        key = self.cache.store(words())
+        with open(self.cache.path(key), 'wb') as grammar_file:
+            grammar_file.write(b'corrupt')
+        self.assertIsNone(self.cache.load(key))
+
+    def test_load_other_environment(self):
+        key = self.cache.store(words())
+        environment = cache._environment
+        cache._environment = 'other'
+        try:
+            self.assertIsNone(self.cache.load(key))
+        finally:
+            cache._environment = environment
+
+    def test_get(self):
+        global build_count
+        build_count = 0
+        grammar = self.cache.get(counted_calculator)
+        self.assertEqual(1, build_count)
+        self.assertEqual((True, (7,)), grammar.parse('1+(2*3)\n'))
+
+        grammar = self.cache.get(counted_calculator)
+        self.assertEqual(1, build_count)
+        self.assertEqual((True, (7,)), grammar.parse('1+(2*3)\n'))
+
+        self.cache.get(counted_calculator, 'other')
+        self.assertEqual(2, build_count)
+
+
+if __name__ == '__main__':
+    unittest.main()
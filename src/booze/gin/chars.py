@@ -17,11 +17,19 @@ import string
 from . import parser
 
 
+_ASCII = tuple(chr(i) for i in range(0x80))
+
+
 class PredicateChar(parser.Parser):
-    """Character parser that determines character inclusion using predicate."""
+    """Character parser that determines character inclusion using predicate.
+
+    The predicate is evaluated for every ASCII character at construction, so while parsing it is only called for
+    characters outside of ASCII.  It is never called at the end of input.
+    """
 
     def __init__(self, func):
         self.__func = func
+        self.__ascii_chars = frozenset(c for c in _ASCII if func(c))
 
     @property
     def attr_type(self):
@@ -31,9 +39,14 @@ class PredicateChar(parser.Parser):
     def predicate(self):
         return self.__func
 
+    @property
+    def ascii_chars(self):
+        """Set of ASCII characters accepted by predicate."""
+        return self.__ascii_chars
+
     def _parse(self, state):
-        c = state.read(1)
-        if self.__func(c):
+        c = state.read_char()
+        if c in self.__ascii_chars or (c > '\x7f' and self.__func(c)):
             state.commit(c)
 
 
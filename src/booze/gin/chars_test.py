@@ -41,6 +41,26 @@ class PredicateCharTestCase(unittest.TestCase):
     def test_predicate(self):
         self.assertEqual(self.predicate, self.parser.predicate)
 
+    def test_ascii_chars(self):
+        self.assertEqual(frozenset(chr(i) for i in range(1, 0x80, 2)), self.parser.ascii_chars)
+
+    def test_non_ascii(self):
+        calls = []
+
+        def predicate(c):
+            calls.append(c)
+            return c == '\u00e9'
+
+        p = chars.PredicateChar(predicate)
+        del calls[:]
+        self.assertEqual((True, '\u00e9'), p.parse('\u00e9'))
+        self.assertEqual((False, None), p.parse('a'))
+        self.assertEqual(['\u00e9'], calls)
+
+    def test_end_of_input(self):
+        p = chars.PredicateChar(lambda c: True)
+        self.assertEqual((False, None), p.parse(''))
+
 
 class CharClassTestCase(unittest.TestCase):
 
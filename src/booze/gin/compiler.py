@@ -0,0 +1,596 @@
+# Copyright 2015 Rafe Kaplan
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import re
+
+from . import analysis
+from . import aux
+from . import chars
+from . import memo
+from . import parser
+from . import regex
+from . import rule
+from .. import whiskey
+
+
+class CompiledParser:
+    """Parser graph compiled into generated Python functions.
+
+    Every rule and composite parser becomes a generated function that keeps the input position in a local variable
+    and inlines character, string, regular expression and other primitive matches.  Generated functions return
+    (end, value) on success, where end is None when the match is not committed, or None on failure.  Parsers the
+    compiler does not recognize are run through the interpreter, and inputs that are not held in memory as a string
+    are parsed by the original parser.
+
+    Args:
+        parser: Parser to compile.
+    """
+
+    def __init__(self, parser):
+        self.__parser = parser
+        self.__scanners = {}
+        generator = _Generator(parser)
+        self.__source = generator.source
+        namespace = generator.namespace
+        namespace['skip'] = self.__skip
+        exec(compile(self.__source, '<compiled {}>'.format(type(parser).__name__), 'exec'), namespace)
+        self.__entry = namespace[generator.entry]
+
+    @property
+    def parser(self):
+        return self.__parser
+
+    @property
+    def source(self):
+        """Generated Python source."""
+        return self.__source
+
+    def __skip(self, state, text, pos, skipper):
+        try:
+            scanner = self.__scanners[skipper]
+        except KeyError:
+            scanner = self.__scanners[skipper] = _scanner(skipper)
+        return scanner(state, text, pos)
+
+    def _match(self, state, text, pos):
+        return self.__entry(state, text, pos)
+
+    def parse(self, parser_input, skipper=None):
+        if skipper is not None and isinstance(parser_input, parser.ParserState):
+            raise TypeError('May not provide ParserState and new skipper')
+        if not isinstance(parser_input, parser.ParserState):
+            parser_input = parser.ParserState(parser_input, skipper)
+        getvalue = getattr(parser_input.input, 'getvalue', None)
+        text = getvalue() if getvalue else None
+        if not isinstance(text, str):
+            return self.__parser.parse(parser_input)
+
+        pos = parser_input.tell()
+        result = self.__entry(parser_input, text, pos)
+        if result is None:
+            parser_input.seek(pos)
+            return False, None
+        if result[0] is not None:
+            parser_input.seek(result[0])
+        else:
+            parser_input.seek(pos)
+        return True, result[1]
+
+
+def _scanner(skipper):
+    skip_regex = skipper.skip_regex
+    if skip_regex is not None:
+        match = skip_regex.match
+
+        def scan_regex(state, text, pos):
+            return match(text, pos).end()
+        return scan_regex
+
+    compiled = CompiledParser(skipper)
+
+    def scan(state, text, pos):
+        state.skipper = None
+        try:
+            while True:
+                result = compiled._match(state, text, pos)
+                if result is None:
+                    return pos
+                if result[0] is not None:
+                    pos = result[0]
+        finally:
+            state.skipper = skipper
+    return scan
+
+
+def _fixed_point(nodes, initial, propagate):
+    """Grow the set of nodes having a property until it is stable.
+
+    Args:
+        nodes: All nodes of the graph.
+        initial: Nodes known to have the property.
+        propagate: Function of node and current set returning True if the node has the property.
+    """
+    result = set(initial)
+    changed = True
+    while changed:
+        changed = False
+        for node in nodes:
+            if node not in result and propagate(node, result):
+                result.add(node)
+                changed = True
+    return result
+
+
+class _Generator:
+
+    __PASSTHROUGH = ('omit', 'as_string', 'object_lexeme')
+
+    def __init__(self, root):
+        self.namespace = {
+            'UNUSED': parser.UNUSED,
+            'ExpectationFailure': parser.ExpectationFailure,
+            'MemoEntry': memo.MemoEntry,
+            'as_string': parser._as_string,
+        }
+        self.__names = {}
+        self.__constants = {}
+        self.__pending = []
+        self.__lines = []
+        self.__directives = {
+            parser.omit.func: 'omit',
+            parser.as_string.func: 'as_string',
+            parser.object_lexeme.func: 'object_lexeme',
+            parser.predicate.func: 'predicate',
+            parser.not_predicate.func: 'not_predicate',
+        }
+
+        nodes = analysis.reachable(root)
+        fallbacks = [node for node in nodes if self.__kind(node) == 'fallback']
+        self.__cutting = _fixed_point(
+            nodes, fallbacks + [node for node in nodes if node is aux.cut],
+            lambda node, found: any(c in found for c in node.children))
+        self.__uncommitted = _fixed_point(
+            nodes, fallbacks + [node for node in nodes if self.__kind(node) in ('eps', 'predicate', 'not_predicate')],
+            lambda node, found: self.__kind(node) in ('unary', 'rule', 'rule_call', 'action') + self.__PASSTHROUGH
+                                and node.children[0] in found)
+
+        self.entry = 'parse_entry'
+        self.__function(root)
+        self.__lines += [
+            'def parse_entry(state, text, pos):',
+            '    skipper = state.skipper',
+            '    q = skip(state, text, pos, skipper) if skipper is not None else pos',
+            '    r = {}(state, text, q)'.format(self.__function(root)),
+            '    if r is not None and r[0] is None:',
+            '        return pos, r[1]',
+            '    return r',
+            '',
+        ]
+        while self.__pending:
+            self.__generate(self.__pending.pop())
+        self.source = '\n'.join(self.__lines)
+
+    def __constant(self, value):
+        key = id(value)
+        try:
+            return self.__constants[key][0]
+        except KeyError:
+            name = 'k{}'.format(len(self.__constants))
+            self.__constants[key] = (name, value)
+            self.namespace[name] = value
+            return name
+
+    def __function(self, node):
+        try:
+            return self.__names[node]
+        except KeyError:
+            name = self.__names[node] = 'p{}_{}'.format(len(self.__names), self.__kind(node))
+            self.__pending.append(node)
+            return name
+
+    def __kind(self, node):
+        node_type = type(node)
+        if node is aux.eps:
+            return 'eps'
+        elif node is aux.eoi:
+            return 'eoi'
+        elif node is aux.cut:
+            return 'cut'
+        elif node_type is parser.Char:
+            return 'char_action' if isinstance(node.chars, whiskey.Action) else 'char'
+        elif node_type is parser.String:
+            return 'string_action' if isinstance(node.string, whiskey.Action) else 'string'
+        elif node_type is chars.PredicateChar:
+            return 'predicate_char'
+        elif node_type is aux.Attr:
+            return 'attr'
+        elif node_type in (regex.Regex, regex.RegularLexeme):
+            return 'regex'
+        elif node_type is parser.Symbols:
+            return 'symbols'
+        elif node_type is parser.Seq:
+            return 'seq' if all(self.__attr_type(p) is not None for p in node.parsers) else 'fallback'
+        elif node_type is parser.Alt:
+            return 'alt'
+        elif node_type is parser.Repeat.__parser_type__:
+            return 'repeat' if self.__attr_type(node) is not None else 'fallback'
+        elif node_type is parser.SemanticAction:
+            return 'action'
+        elif node_type is parser.Unary:
+            return 'unary'
+        elif node_type is parser.FuncDirectiveParser:
+            return self.__directives.get(node.func, 'fallback')
+        elif node_type is rule.Rule:
+            return 'rule' if node.children else 'fallback'
+        elif node_type is rule.RuleCall:
+            return 'rule_call'
+        else:
+            return 'fallback'
+
+    @staticmethod
+    def __attr_type(node):
+        try:
+            return node.attr_type
+        except NotImplementedError:
+            return None
+
+    def __inline(self, node):
+        """Describe primitive match as expressions.
+
+        Returns:
+            Tuple (condition, value, end) of expression templates over the match position {p}, or None if the node
+            can not be inlined.  Condition is None if the match always succeeds and end is None if the match is not
+            committed.
+        """
+        kind = self.__kind(node)
+        if kind == 'char':
+            if node.chars is None:
+                return '{p} < n', 'text[{p}]', '{p} + 1'
+            return '{{p}} < n and text[{{p}}] in {}'.format(self.__constant(node.chars)), 'text[{p}]', '{p} + 1'
+        elif kind == 'string':
+            return ('text.startswith({}, {{p}})'.format(self.__constant(node.string)), self.__constant(node.string),
+                    '{{p}} + {}'.format(len(node.string)))
+        elif kind == 'predicate_char':
+            condition = "{{p}} < n and (text[{{p}}] in {} or (text[{{p}}] > '\\x7f' and {}(text[{{p}}])))"
+            return (condition.format(self.__constant(node.ascii_chars), self.__constant(node.predicate)), 'text[{p}]',
+                    '{p} + 1')
+        elif kind == 'eps':
+            return None, 'UNUSED', None
+        elif kind == 'eoi':
+            return '{p} >= n', 'UNUSED', '{p}'
+        elif kind == 'attr':
+            return None, self.__constant(node.value), '{p}'
+        elif kind == 'regex':
+            return '(m := {}(text, {{p}})) is not None'.format(self.__constant(node.regex.match)), 'm.group()', 'm.end()'
+        elif kind == 'omit':
+            inline = self.__inline(node.parser)
+            if inline:
+                return inline[0], 'UNUSED', inline[2]
+        return None
+
+    def __attempt(self, lines, child, var, on_fail, skip):
+        """Emit match of child leaving its value in var and its committed end position in pos.
+
+        Args:
+            lines: List of lines to append to.
+            child: Parser to match.
+            var: Name of variable to receive value.
+            on_fail: Lines executed when match fails.
+            skip: Whether to run skipper before matching, as Parser.parse() does.
+        """
+        if skip:
+            lines.append('q = skip(state, text, pos, skipper) if skipper is not None else pos')
+            at = 'q'
+        else:
+            at = 'pos'
+        inline = self.__inline(child)
+        if inline:
+            condition, value, end = inline
+            if condition:
+                lines.append('if not ({}):'.format(condition.format(p=at)))
+                lines.extend('    ' + line for line in on_fail)
+            lines.append('{} = {}'.format(var, value.format(p=at)))
+            if end is not None:
+                lines.append('pos = {}'.format(end.format(p=at)))
+        else:
+            lines.append('r = {}(state, text, {})'.format(self.__function(child), at))
+            lines.append('if r is None:')
+            lines.extend('    ' + line for line in on_fail)
+            if child in self.__uncommitted:
+                lines.append('if r[0] is not None:')
+                lines.append('    pos = r[0]')
+                lines.append('{} = r[1]'.format(var))
+            else:
+                lines.append('pos, {} = r'.format(var))
+
+    def __delegate(self, lines, child, transform):
+        """Emit match of child in the same transaction, returning its result with value transformed."""
+        inline = self.__inline(child)
+        if inline:
+            condition, value, end = inline
+            if condition:
+                lines.append('if not ({}):'.format(condition.format(p='pos')))
+                lines.append('    return None')
+            lines.append('return {}, {}'.format(end.format(p='pos') if end else 'None',
+                                                transform.format(v=value.format(p='pos'))))
+        else:
+            if transform == '{v}':
+                lines.append('return {}(state, text, pos)'.format(self.__function(child)))
+            else:
+                lines.append('r = {}(state, text, pos)'.format(self.__function(child)))
+                lines.append('if r is None:')
+                lines.append('    return None')
+                lines.append('return r[0], {}'.format(transform.format(v='r[1]')))
+
+    def __fail(self, node, pos='pos', cuts='cuts'):
+        if node in self.__cutting:
+            return ['if state.cuts != {}:'.format(cuts), '    raise ExpectationFailure({})'.format(pos), 'return None']
+        else:
+            return ['return None']
+
+    def __prologue(self, node, body):
+        prologue = ['n = len(text)'] if any(re.search(r'\bn\b', line) for line in body) else []
+        if any('cuts' in line for line in body):
+            prologue.append('cuts = state.cuts')
+        return prologue
+
+    def __generate(self, node):
+        kind = self.__kind(node)
+        body = getattr(self, '_Generator__generate_' + kind)(node)
+        if kind == 'rule':
+            signature = 'state, text, pos, args=(), kwargs={}'
+        else:
+            signature = 'state, text, pos'
+        prologue = self.__prologue(node, body)
+        self.__lines.append('def {}({}):'.format(self.__names[node], signature))
+        self.__lines.extend('    ' + line for line in prologue + body)
+        self.__lines.append('')
+
+    def __generate_primitive(self, node):
+        condition, value, end = self.__inline(node)
+        result = 'return {}, {}'.format(end.format(p='pos') if end else 'None', value.format(p='pos'))
+        if condition:
+            return ['if {}:'.format(condition.format(p='pos')), '    ' + result, 'return None']
+        return [result]
+
+    __generate_char = __generate_primitive
+    __generate_string = __generate_primitive
+    __generate_predicate_char = __generate_primitive
+    __generate_eps = __generate_primitive
+    __generate_eoi = __generate_primitive
+    __generate_attr = __generate_primitive
+    __generate_regex = __generate_primitive
+
+    def __generate_char_action(self, node):
+        return [
+            'if pos < n:',
+            '    c = text[pos]',
+            '    local_chars = {}._table(state.invoke({}))'.format(self.__constant(node), self.__constant(node.chars)),
+            '    if local_chars is None or c in local_chars:',
+            '        return pos + 1, c',
+            'return None',
+        ]
+
+    def __generate_string_action(self, node):
+        return [
+            'value = state.invoke({})'.format(self.__constant(node.string)),
+            'if text.startswith(value, pos):',
+            '    return pos + len(value), value',
+            'return None',
+        ]
+
+    def __generate_cut(self, node):
+        return ['state.cut()', 'return pos, UNUSED']
+
+    def __generate_symbols(self, node):
+        return [
+            'q = skip(state, text, pos, state.skipper) if state.skipper is not None else pos',
+            'return {}._longest(text, q)'.format(self.__constant(node)),
+        ]
+
+    def __generate_seq(self, node):
+        lines = ['skipper = state.skipper']
+        values = []
+        for index, child in enumerate(node.parsers):
+            if child.attr_type is parser.AttrType.UNUSED:
+                var = '_'
+            else:
+                var = 'v{}'.format(index)
+                values.append(var)
+            self.__attempt(lines, child, var, self.__fail(node), True)
+        if not values:
+            lines.append('return pos, UNUSED')
+        elif len(values) == 1:
+            lines.append('return pos, {}'.format(values[0]))
+        else:
+            lines.append('return pos, ({},)'.format(', '.join(values)))
+        return lines
+
+    def __generate_alt(self, node):
+        lines = ['skipper = state.skipper',
+                 'q = skip(state, text, pos, skipper) if skipper is not None else pos']
+        guarded = self.__dispatch(lines, node)
+        for index, child in enumerate(node.parsers):
+            inline = self.__inline(child)
+            if index in guarded:
+                lines.append('if {} in viable:'.format(index))
+                lines.append('    r = {}(state, text, q)'.format(self.__function(child)))
+                lines.append('    if r is not None:')
+                if child in self.__uncommitted:
+                    lines.append('        return r if r[0] is not None else (pos, r[1])')
+                else:
+                    lines.append('        return r')
+            elif inline:
+                condition, value, end = inline
+                result = 'return {}, {}'.format(end.format(p='q') if end else 'pos', value.format(p='q'))
+                if condition:
+                    lines.extend(['if {}:'.format(condition.format(p='q')), '    ' + result])
+                else:
+                    lines.append(result)
+                    break
+            else:
+                lines.append('r = {}(state, text, q)'.format(self.__function(child)))
+                lines.append('if r is not None:')
+                if child in self.__uncommitted:
+                    lines.append('    return r if r[0] is not None else (pos, r[1])')
+                else:
+                    lines.append('    return r')
+        else:
+            lines.extend(self.__fail(node))
+        return lines
+
+    def __dispatch(self, lines, node):
+        """Emit lookup of branches viable for the character at q.
+
+        Returns:
+            Indexes of branches that are only called when viable.
+        """
+        table = node.dispatch_table
+        if table is None:
+            return set()
+        indexes = {}
+        for c, branches in table.table.items():
+            indexes[c] = frozenset(i for i, child in enumerate(node.parsers) if child in branches)
+        other = frozenset(i for i, child in enumerate(node.parsers) if child in table.other)
+        lookups = list(indexes.values()) + [other]
+        guarded = set(i for i, child in enumerate(node.parsers)
+                      if not self.__inline(child) and not all(i in viable for viable in lookups))
+        if guarded:
+            lines.append("viable = {}.get(text[q] if q < n else '', {})".format(self.__constant(indexes),
+                                                                               self.__constant(other)))
+        return guarded
+
+    def __generate_repeat(self, node):
+        lines = ['values = []']
+        cutting = node in self.__cutting
+        on_fail = []
+        if cutting:
+            on_fail = ['if state.cuts != iteration_cuts:', '    raise ExpectationFailure(pos)']
+        if node.maximum is None:
+            lines.append('while True:')
+        else:
+            lines.append('while len(values) < {}:'.format(node.maximum))
+        body = []
+        if cutting:
+            body.append('iteration_cuts = state.cuts')
+        self.__attempt(body, node.parser, 'v', on_fail + ['break'], False)
+        body.append('values.append(v)')
+        lines.extend('    ' + line for line in body)
+        if node.minimum:
+            lines.append('if len(values) < {}:'.format(node.minimum))
+            lines.extend('    ' + line for line in self.__fail(node))
+        if node.is_optional:
+            lines.append('return pos, values[0] if values else UNUSED')
+        elif node.attr_type is parser.AttrType.UNUSED:
+            lines.append('return pos, UNUSED')
+        else:
+            lines.append('return pos, tuple(values)')
+        return lines
+
+    def __generate_unary(self, node):
+        lines = []
+        self.__delegate(lines, node.parser, '{v}')
+        return lines
+
+    def __generate_action(self, node):
+        lines = []
+        self.__delegate(lines, node.parser, '{}._apply(state, {{v}})'.format(self.__constant(node)))
+        return lines
+
+    def __generate_omit(self, node):
+        lines = []
+        self.__delegate(lines, node.parser, 'UNUSED')
+        return lines
+
+    def __generate_as_string(self, node):
+        lines = []
+        self.__delegate(lines, node.parser, 'as_string({v})')
+        return lines
+
+    def __generate_object_lexeme(self, node):
+        lines = ['skipper = state.skipper', 'state.skipper = None', 'try:']
+        body = []
+        self.__delegate(body, node.parser, '{v}')
+        lines.extend('    ' + line for line in body)
+        lines.extend(['finally:', '    state.skipper = skipper'])
+        return lines
+
+    def __generate_predicate(self, node):
+        lines = []
+        self.__attempt(lines, node.parser, '_', ['return None'], False)
+        if node in self.__cutting:
+            lines.extend(['if state.cuts != cuts:', '    raise ExpectationFailure(pos)'])
+        lines.append('return None, UNUSED')
+        return lines
+
+    def __generate_not_predicate(self, node):
+        lines = ['start = pos']
+        self.__attempt(lines, node.parser, '_', self.__fail(node, 'start')[:-1] + ['return None, UNUSED'], False)
+        lines.extend(self.__fail(node))
+        return lines
+
+    def __generate_rule(self, node):
+        lines = ['with state.open_scope(*args, **kwargs):']
+        body = []
+        self.__delegate(body, node.parser, '{v}')
+        lines.extend('    ' + line for line in body)
+        if not node.memoize:
+            return lines
+
+        body_name = self.__names[node] + '_body'
+        self.__lines.append('def {}(state, text, pos, args, kwargs):'.format(body_name))
+        self.__lines.extend('    ' + line for line in self.__prologue(node, lines) + lines)
+        self.__lines.append('')
+        return [
+            'key = ({}, pos, args, tuple(sorted(kwargs.items())), state.skipper)'.format(self.__constant(node)),
+            'try:',
+            '    entry = state.memo.get(key)',
+            'except TypeError:',
+            '    return {}(state, text, pos, args, kwargs)'.format(body_name),
+            'if entry is not None:',
+            '    if not entry.successful:',
+            '        return None',
+            '    return (entry.end if entry.committed else None), entry.value',
+            'result = {}(state, text, pos, args, kwargs)'.format(body_name),
+            'if result is None:',
+            '    state.memo.put(key, MemoEntry(False, False, None, pos))',
+            'elif result[0] is None:',
+            '    state.memo.put(key, MemoEntry(True, False, result[1], pos))',
+            'else:',
+            '    state.memo.put(key, MemoEntry(True, True, result[1], result[0]))',
+            'return result',
+        ]
+
+    def __generate_rule_call(self, node):
+        args = ''.join('state.invoke({}), '.format(self.__constant(a)) for a in node.args)
+        kwargs = ', '.join('{}: state.invoke({})'.format(repr(k), self.__constant(v)) for k, v in node.kwargs.items())
+        return ['return {}(state, text, pos, ({}), {{{}}})'.format(self.__function(node.parser), args, kwargs)]
+
+    def __generate_fallback(self, node):
+        return [
+            'state.seek(pos)',
+            'state.begin()',
+            'try:',
+            '    {}._parse(state)'.format(self.__constant(node)),
+            '    successful = state.successful',
+            '    value = state.value',
+            '    committed = state.committed',
+            'except BaseException:',
+            '    state.abort()',
+            '    raise',
+            'state.end()',
+            'if not successful:',
+            '    return None',
+            'return (state.tell() if committed else None), value',
+        ]
@@ -0,0 +1,189 @@
+# Copyright 2015 Rafe Kaplan
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import contextlib
+import io
+import operator
+import unittest
+
+from booze import whiskey
+from booze.gin import aux
+from booze.gin import chars
+from booze.gin import compiler
+from booze.gin import local_vars
+from booze.gin import parser
+from booze.gin import rule
+
+
+class CompiledParserTest(unittest.TestCase):
+
+    def assertSameParse(self, p, text, skipper=None):
+        expected_stream = io.StringIO(text)
+        expected = p.parse(expected_stream, skipper)
+        actual_stream = io.StringIO(text)
+        actual = p.compile().parse(actual_stream, skipper)
+        self.assertEqual(expected, actual, text)
+        self.assertEqual(expected_stream.tell(), actual_stream.tell(), text)
+
+    def test_compile(self):
+        p = parser.Char('a')
+        compiled = p.compile()
+        self.assertIsInstance(compiled, compiler.CompiledParser)
+        self.assertIs(p, compiled.parser)
+        self.assertIn('def ', compiled.source)
+
+    def test_primitives(self):
+        for p in (parser.Char('ab'), parser.Char(), parser.String('ab'), chars.alpha, aux.eps, aux.eoi,
+                  aux.Attr(10), parser.lit('ab'), parser.Symbols({'a': 1, 'ab': 2}), parser.Symbols({'': 1, 'b': 2})):
+            for text in ('', 'a', 'ab', 'abc', 'ba', '1'):
+                self.assertSameParse(p, text)
+
+    def test_predicate_char_at_end(self):
+        p = chars.PredicateChar(lambda c: c in ('', 'a'))
+        self.assertSameParse(p, '')
+        self.assertSameParse(p, 'a')
+
+    def test_actions(self):
+        p = parser.Char(whiskey.func(lambda: 'ab')()) << parser.String(whiskey.func(lambda: 'cd')())
+        for text in ('acd', 'bcd', 'ccd', 'ac'):
+            self.assertSameParse(p, text)
+
+    def test_seq_alt_repeat(self):
+        p = ((parser.Char('a') << parser.lit('-') << parser.Char('b'))
+             | +parser.Char('c')
+             | -parser.String('d'))
+        for text in ('a-b', 'a-c', 'ccc', 'dd', 'x', ''):
+            self.assertSameParse(p, text)
+            self.assertSameParse(p, text, ' ')
+            self.assertSameParse(p, ' ' + text.replace('-', ' - '), ' ')
+
+    def test_dispatch(self):
+        r = rule.Rule(parser.AttrType.OBJECT)
+        r %= (parser.Char('a') << r) | (parser.lit('(') << r << parser.lit(')')) | parser.String('x') | aux.eps
+        self.assertIn('viable', r.compile().source)
+        for text in ('ax', 'a(ax)', '(', 'b', '', ' a ( x ) '):
+            self.assertSameParse(r, text)
+            self.assertSameParse(r, text, ' ')
+
+    def test_bounded_repeat(self):
+        p = parser.Repeat(2, 3)[parser.Char('a')]
+        for text in ('a', 'aa', 'aaa', 'aaaa'):
+            self.assertSameParse(p, text)
+
+    def test_lexeme(self):
+        p = parser.lexeme[+chars.alpha] << parser.lexeme[+chars.digit]
+        for text in ('ab12', ' ab  12 ', 'a b 1', '12'):
+            self.assertSameParse(p, text, ' ')
+
+    def test_predicates(self):
+        p = parser.Char('a') << parser.predicate[parser.Char('b')]
+        q = parser.Char('a') << parser.not_[parser.Char('b')]
+        for text in ('a', 'ab', 'ac', 'a b'):
+            self.assertSameParse(p, text)
+            self.assertSameParse(p, text, ' ')
+            self.assertSameParse(q, text)
+            self.assertSameParse(q, text, ' ')
+
+    def test_calculator(self):
+        arith_op = parser.Symbols({'+': operator.add, '-': operator.sub})
+        mult_op = parser.Symbols({'*': operator.mul, '/': operator.floordiv})
+        dec = parser.lexeme[+parser.Char('0123456789')][lambda s: int(s)]
+        arith = rule.Rule(memoize=True)
+        mult = rule.Rule(memoize=True)
+        value = rule.Rule()
+        exp = rule.Rule(parser.AttrType.OBJECT)
+        mult %= (value << mult_op << mult)[lambda a, op, b: op(a, b)] | value
+        arith %= (mult << arith_op << arith)[lambda a, op, b: op(a, b)] | mult
+        value %= dec | '(' << exp << ')'
+        exp %= arith
+        for text in ('1', '1 + 1', ' 2 * 5 + 20 ', '2 * (5 + 20)', '2 * 3 * 4 + 10 * 20 * 30', '2 +', 'x'):
+            self.assertSameParse(exp, text, ' ')
+
+    def test_rule_call(self):
+        start_tag = rule.Rule(parser.AttrType.STRING)
+        end_tag = rule.Rule(parser.AttrType.UNUSED)
+        xml = rule.Rule()
+        start_tag %= '<' << parser.lexeme[+chars.alpha] << '>'
+        end_tag %= parser.omit['</' << parser.String(whiskey.p[0]) << '>']
+        xml %= (start_tag[local_vars.l.name[whiskey.p[0]]] << -+xml << end_tag(local_vars.l.name))[lambda *v: v]
+        for text in ('<a></a>', '<a><b></b></a>', ' <a> <b> </b> </a>', '<a></b>'):
+            self.assertSameParse(xml, text, ' ')
+
+    def test_memoized_state(self):
+        r = rule.Rule(memoize=True)
+        r %= parser.Char('a')
+        s = parser.ParserState('a')
+        self.assertEqual((True, 'a'), r.compile().parse(s))
+        self.assertEqual(1, len(s.memo))
+        s.seek(0)
+        self.assertEqual((True, 'a'), r.parse(s))
+
+    def test_cut(self):
+        p = (parser.Char('a') << aux.cut << parser.Char('b')) | parser.String('ac')
+        compiled = p.compile()
+        self.assertEqual((True, ('a', 'b')), compiled.parse('ab'))
+        self.assertEqual((True, 'xc'), ((parser.Char('a') << aux.cut << parser.Char('b'))
+                                        | parser.String('xc')).compile().parse('xc'))
+        with self.assertRaises(parser.ExpectationFailure) as context:
+            compiled.parse('ac')
+        self.assertEqual(1, context.exception.pos)
+
+    def test_cut_repeat(self):
+        p = +(parser.Char('a') << aux.cut << parser.Char('b'))
+        self.assertSameParse(p, 'ababx')
+        with self.assertRaises(parser.ExpectationFailure):
+            p.compile().parse('abax')
+
+    def test_fallback(self):
+        calls = []
+
+        @parser.func_directive()
+        @contextlib.contextmanager
+        def record(state):
+            calls.append(state.tell())
+            yield
+
+        p = parser.Char('a') << record[parser.Char('b')]
+        self.assertSameParse(p, 'ab')
+        self.assertSameParse(p, 'a b', ' ')
+        self.assertEqual([1, 1, 2, 2], calls)
+
+    def test_skipper_parser(self):
+        comment = parser.lit('#') << -+parser.Char('abc ')
+        p = +parser.Char('x')
+        for text in ('xx', 'x #ab x', '#a x#bx'):
+            self.assertSameParse(p, text, comment | ' ')
+
+    def test_state_position(self):
+        s = parser.ParserState('aab')
+        compiled = (+parser.Char('a')).compile()
+        self.assertEqual((True, ('a', 'a')), compiled.parse(s))
+        self.assertEqual(2, s.tell())
+        self.assertEqual((False, None), compiled.parse(s))
+        self.assertEqual(2, s.tell())
+
+    def test_state_and_skipper(self):
+        with self.assertRaises(TypeError):
+            parser.Char('a').compile().parse(parser.ParserState('a'), ' ')
+
+    def test_stream_input(self):
+        class Pipe(io.StringIO):
+            def seekable(self):
+                return False
+
+        self.assertEqual((True, ('a', 'b')), (parser.Char('a') << parser.Char('b')).compile().parse(Pipe('ab')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,454 @@
+# Copyright 2015 Rafe Kaplan
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import bisect
+import codecs
+import mmap
+
+# Characters a regular expression is first matched against by inputs that are not held in memory.  A match reaching the
+# end of the window is retried on a larger one, so only expressions that fail on more than this many characters of
+# lookahead may fail where matching the whole input would succeed.
+_REGEX_WINDOW = 4096
+
+
+class Input:
+    """Base class for parser inputs.
+
+    Inputs provide the file-like read(), tell() and seek() methods along with the primitive matching operations used
+    by the character and string parsers.  Positions are opaque values returned by tell() and only ever passed back to
+    seek().
+    """
+
+    def read(self, size=-1):
+        raise NotImplementedError
+
+    def tell(self):
+        raise NotImplementedError
+
+    def seek(self, pos):
+        raise NotImplementedError
+
+    def read_char(self):
+        """Read a single character.
+
+        Returns:
+            Next character of input or '' at end of input.
+        """
+        return self.read(1)
+
+    def match(self, string):
+        """Consume string if it is next in input.
+
+        Args:
+            string: String to match.
+
+        Returns:
+            True if string matched and was consumed, else False and the position is unchanged.
+        """
+        pos = self.tell()
+        if self.read(len(string)) == string:
+            return True
+        self.seek(pos)
+        return False
+
+    def match_regex(self, regex):
+        """Consume the match of a compiled regular expression at the current position.
+
+        The default implementation matches against the remainder of the input, which suits inputs held in memory.
+        Other inputs match against a window of input that grows while the match reaches its end.
+
+        Args:
+            regex: Compiled regular expression.
+
+        Returns:
+            Matched string, or None if regex did not match and the position is unchanged.
+        """
+        pos = self.tell()
+        match = regex.match(self.read())
+        self.seek(pos)
+        if match is None:
+            return None
+        value = match.group()
+        self.read(len(value))
+        return value
+
+    def release(self, pos):
+        """Notify input that no position before pos will be sought again.
+
+        Inputs that buffer data may discard everything before pos.
+
+        Args:
+            pos: Earliest position that may still be sought.
+        """
+
+
+class StringInput(Input):
+    """In-memory input where the position is an index into the source string."""
+
+    def __init__(self, string, pos=0):
+        self.__string = string
+        self.__pos = pos
+
+    def getvalue(self):
+        return self.__string
+
+    def read(self, size=-1):
+        pos = self.__pos
+        if size is None or size < 0:
+            value = self.__string[pos:]
+        else:
+            value = self.__string[pos:pos + size]
+        self.__pos = pos + len(value)
+        return value
+
+    def read_char(self):
+        pos = self.__pos
+        try:
+            c = self.__string[pos]
+        except IndexError:
+            return ''
+        self.__pos = pos + 1
+        return c
+
+    def match(self, string):
+        if self.__string.startswith(string, self.__pos):
+            self.__pos += len(string)
+            return True
+        return False
+
+    def match_regex(self, regex):
+        match = regex.match(self.__string, self.__pos)
+        if match is None:
+            return None
+        self.__pos = match.end()
+        return match.group()
+
+    def tell(self):
+        return self.__pos
+
+    def seek(self, pos):
+        self.__pos = pos
+
+
+class StreamInput(Input):
+    """Input delegating to a seekable file-like object such as io.StringIO."""
+
+    def __init__(self, stream):
+        self.__stream = stream
+
+    @property
+    def stream(self):
+        return self.__stream
+
+    def read(self, size=-1):
+        return self.__stream.read(size)
+
+    def read_char(self):
+        return self.__stream.read(1)
+
+    def match_regex(self, regex):
+        stream = self.__stream
+        pos = stream.tell()
+        window = stream.read(_REGEX_WINDOW)
+        while True:
+            match = regex.match(window)
+            if match is None or match.end() < len(window):
+                break
+            more = stream.read(len(window))
+            if not more:
+                break
+            window += more
+        stream.seek(pos)
+        if match is None:
+            return None
+        value = match.group()
+        stream.read(len(value))
+        return value
+
+    def tell(self):
+        return self.__stream.tell()
+
+    def seek(self, pos):
+        self.__stream.seek(pos)
+
+
+class MmapInput(Input):
+    """Input reading a file through a read-only memory map.
+
+    Positions are byte offsets into the file, so rewinding only resets an offset and the file is never copied into a
+    Python string.  The file must be encoded in UTF-8 or a single byte encoding.
+
+    Args:
+        path: Path of file to map.
+        encoding: Encoding of the file.
+        start: Byte offset input starts at.
+        end: Byte offset input ends at, or None to read to the end of the file.  Positions remain offsets into the
+            whole file, so a part of a file parses to the same positions as the whole file.
+    """
+
+    def __init__(self, path, encoding='utf-8', start=0, end=None):
+        codec = codecs.lookup(encoding)
+        self.__utf8 = codec.name == 'utf-8'
+        if not self.__utf8 and len('a'.encode(codec.name)) != 1:
+            raise ValueError('Unsupported multi-byte encoding {}'.format(encoding))
+        self.__encoding = codec.name
+        self.__chars = tuple(bytes((b,)).decode(codec.name, 'replace') for b in range(0x80 if self.__utf8 else 0x100))
+        self.__encoded = {}
+        with open(path, 'rb') as f:
+            try:
+                self.__data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Empty files can not be mapped.
+                self.__data = b''
+        size = len(self.__data)
+        self.__size = size if end is None else min(end, size)
+        self.__start = start
+        self.__pos = start
+
+    @property
+    def encoding(self):
+        return self.__encoding
+
+    @property
+    def start(self):
+        return self.__start
+
+    @property
+    def end(self):
+        return self.__size
+
+    def close(self):
+        if isinstance(self.__data, mmap.mmap):
+            self.__data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __char_end(self, pos):
+        lead = self.__data[pos]
+        if lead < 0x80 or not self.__utf8:
+            return pos + 1
+        elif lead < 0xe0:
+            return pos + 2
+        elif lead < 0xf0:
+            return pos + 3
+        else:
+            return pos + 4
+
+    def read(self, size=-1):
+        pos = self.__pos
+        if size is None or size < 0:
+            end = self.__size
+        elif self.__utf8:
+            end = pos
+            while size > 0 and end < self.__size:
+                end = self.__char_end(end)
+                size -= 1
+        else:
+            end = pos + size
+        end = min(end, self.__size)
+        self.__pos = end
+        return self.__data[pos:end].decode(self.__encoding)
+
+    def read_char(self):
+        pos = self.__pos
+        if pos >= self.__size:
+            return ''
+        lead = self.__data[pos]
+        if lead < 0x80 or not self.__utf8:
+            self.__pos = pos + 1
+            return self.__chars[lead]
+        end = self.__char_end(pos)
+        self.__pos = end
+        return self.__data[pos:end].decode('utf-8')
+
+    def match(self, string):
+        encoded = self.__encoded.get(string)
+        if encoded is None:
+            if len(self.__encoded) >= 1024:
+                self.__encoded.clear()
+            encoded = self.__encoded[string] = string.encode(self.__encoding)
+        pos = self.__pos
+        end = pos + len(encoded)
+        if end <= self.__size and self.__data.find(encoded, pos, end) == pos:
+            self.__pos = end
+            return True
+        return False
+
+    def match_regex(self, regex):
+        pos = self.__pos
+        size = _REGEX_WINDOW
+        while True:
+            end = min(pos + size, self.__size)
+            if self.__utf8:
+                while end < self.__size and self.__data[end] & 0xc0 == 0x80:
+                    end += 1
+            window = self.__data[pos:end].decode(self.__encoding)
+            match = regex.match(window)
+            if match is None or match.end() < len(window) or end >= self.__size:
+                break
+            size *= 2
+        if match is None:
+            return None
+        value = match.group()
+        self.__pos = pos + len(value.encode(self.__encoding))
+        return value
+
+    def tell(self):
+        return self.__pos
+
+    def seek(self, pos):
+        self.__pos = pos
+
+
+class BufferedStreamInput(Input):
+    """Input buffering a non-seekable stream such as a pipe, socket or sys.stdin.
+
+    Data is kept in chunks from the earliest position that may still be sought.  ParserState releases everything
+    before the start of its outermost open transaction, so repeatedly parsing records from one state keeps memory
+    bounded on endless streams.
+
+    Args:
+        stream: Readable text stream.
+        chunk_size: Number of characters read at a time.  When None the stream is read a line at a time, which
+            suits interactive sources such as log tails.
+    """
+
+    def __init__(self, stream, chunk_size=8192):
+        self.__stream = stream
+        self.__chunk_size = chunk_size
+        self.__chunks = []
+        self.__starts = []
+        self.__end = 0
+        self.__eof = False
+        self.__chunk = ''
+        self.__chunk_start = 0
+        self.__pos = 0
+
+    @property
+    def stream(self):
+        return self.__stream
+
+    @property
+    def buffered(self):
+        """Number of characters currently held in the buffer."""
+        return self.__end - self.__starts[0] if self.__starts else 0
+
+    def __fill(self):
+        if self.__eof:
+            return False
+        if self.__chunk_size is None:
+            data = self.__stream.readline()
+        else:
+            data = self.__stream.read(self.__chunk_size)
+        if not data:
+            self.__eof = True
+            return False
+        self.__chunks.append(data)
+        self.__starts.append(self.__end)
+        self.__end += len(data)
+        return True
+
+    def __locate(self, pos):
+        while pos >= self.__end:
+            if not self.__fill():
+                return False
+        if not self.__starts or pos < self.__starts[0]:
+            raise ValueError('Position {} has been released'.format(pos))
+        index = bisect.bisect_right(self.__starts, pos) - 1
+        self.__chunk = self.__chunks[index]
+        self.__chunk_start = self.__starts[index]
+        return True
+
+    def __peek(self, size):
+        pieces = []
+        pos = self.__pos
+        while size > 0 and self.__locate(pos):
+            offset = pos - self.__chunk_start
+            piece = self.__chunk[offset:offset + size]
+            pieces.append(piece)
+            pos += len(piece)
+            size -= len(piece)
+        return ''.join(pieces)
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            while self.__fill():
+                pass
+            size = self.__end - self.__pos
+        value = self.__peek(size)
+        self.__pos += len(value)
+        return value
+
+    def read_char(self):
+        pos = self.__pos
+        offset = pos - self.__chunk_start
+        chunk = self.__chunk
+        if not 0 <= offset < len(chunk):
+            if not self.__locate(pos):
+                return ''
+            offset = pos - self.__chunk_start
+            chunk = self.__chunk
+        self.__pos = pos + 1
+        return chunk[offset]
+
+    def match(self, string):
+        offset = self.__pos - self.__chunk_start
+        if 0 <= offset and offset + len(string) <= len(self.__chunk):
+            matched = self.__chunk.startswith(string, offset)
+        else:
+            matched = self.__peek(len(string)) == string
+        if matched:
+            self.__pos += len(string)
+        return matched
+
+    def match_regex(self, regex):
+        pos = self.__pos
+        self.__locate(pos)
+        while True:
+            window = self.__peek(self.__end - pos)
+            match = regex.match(window)
+            if self.__eof:
+                break
+            if match is None:
+                # A failure within a whole line is final in line mode, so interactive sources are not waited on.
+                if len(window) >= _REGEX_WINDOW or (self.__chunk_size is None and window.endswith('\n')):
+                    break
+            elif match.end() < len(window):
+                break
+            target = self.__end + max(len(window), 1)
+            while self.__end < target and self.__fill() and self.__chunk_size is not None:
+                pass
+        if match is None:
+            return None
+        value = match.group()
+        self.__pos = pos + len(value)
+        return value
+
+    def tell(self):
+        return self.__pos
+
+    def seek(self, pos):
+        if self.__starts and pos < self.__starts[0]:
+            raise ValueError('Position {} has been released'.format(pos))
+        self.__pos = pos
+
+    def release(self, pos):
+        count = bisect.bisect_right(self.__starts, pos) - 1
+        if count > 0:
+            del self.__chunks[:count]
+            del self.__starts[:count]
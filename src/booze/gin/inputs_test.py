@@ -0,0 +1,349 @@
+# Copyright 2015 Rafe Kaplan
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+import os
+import re
+import tempfile
+import unittest
+
+from booze.gin import inputs
+from booze.gin import parser
+from booze.gin import regex
+
+
+class InputTestCase(unittest.TestCase):
+
+    def test_abstract(self):
+        i = inputs.Input()
+        with self.assertRaises(NotImplementedError):
+            i.read()
+        with self.assertRaises(NotImplementedError):
+            i.tell()
+        with self.assertRaises(NotImplementedError):
+            i.seek(0)
+
+
+class StringInputTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.input = inputs.StringInput('abcdef')
+
+    def test_getvalue(self):
+        self.assertEqual('abcdef', self.input.getvalue())
+
+    def test_read(self):
+        self.assertEqual('ab', self.input.read(2))
+        self.assertEqual(2, self.input.tell())
+        self.assertEqual('cdef', self.input.read())
+        self.assertEqual(6, self.input.tell())
+        self.assertEqual('', self.input.read(1))
+        self.assertEqual(6, self.input.tell())
+
+    def test_read_char(self):
+        self.assertEqual('a', self.input.read_char())
+        self.assertEqual('b', self.input.read_char())
+        self.input.seek(6)
+        self.assertEqual('', self.input.read_char())
+        self.assertEqual(6, self.input.tell())
+
+    def test_match(self):
+        self.assertTrue(self.input.match('abc'))
+        self.assertEqual(3, self.input.tell())
+        self.assertFalse(self.input.match('xyz'))
+        self.assertEqual(3, self.input.tell())
+        self.assertFalse(self.input.match('defg'))
+        self.assertEqual(3, self.input.tell())
+
+    def test_match_regex(self):
+        self.assertEqual('abc', self.input.match_regex(re.compile('[a-c]+')))
+        self.assertEqual(3, self.input.tell())
+        self.assertIsNone(self.input.match_regex(re.compile('x')))
+        self.assertEqual(3, self.input.tell())
+        self.assertEqual('', self.input.match_regex(re.compile('x*')))
+        self.assertEqual(3, self.input.tell())
+
+    def test_initial_pos(self):
+        i = inputs.StringInput('abcdef', 4)
+        self.assertEqual('ef', i.read())
+
+
+class RecordingStringIO(io.StringIO):
+    """StringIO recording the size of every read."""
+
+    def __init__(self, content):
+        super(RecordingStringIO, self).__init__(content)
+        self.sizes = []
+
+    def read(self, size=-1):
+        self.sizes.append(size)
+        return super(RecordingStringIO, self).read(size)
+
+
+class StreamInputTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.stream = io.StringIO('abcdef')
+        self.input = inputs.StreamInput(self.stream)
+
+    def test_stream(self):
+        self.assertIs(self.stream, self.input.stream)
+
+    def test_read(self):
+        self.assertEqual('ab', self.input.read(2))
+        self.assertEqual(2, self.stream.tell())
+        self.assertEqual('c', self.input.read_char())
+        self.assertEqual(3, self.input.tell())
+
+    def test_match(self):
+        self.assertTrue(self.input.match('abc'))
+        self.assertEqual(3, self.stream.tell())
+        self.assertFalse(self.input.match('xyz'))
+        self.assertEqual(3, self.stream.tell())
+
+    def test_seek(self):
+        self.input.seek(4)
+        self.assertEqual('ef', self.stream.read())
+
+    def test_match_regex(self):
+        self.input.seek(1)
+        self.assertEqual('bcd', self.input.match_regex(re.compile('[b-d]+')))
+        self.assertEqual(4, self.stream.tell())
+        self.assertIsNone(self.input.match_regex(re.compile('x')))
+        self.assertEqual(4, self.stream.tell())
+
+    def test_match_regex_past_window(self):
+        i = inputs.StreamInput(io.StringIO('a' * 10000 + 'b'))
+        self.assertEqual('a' * 10000, i.match_regex(re.compile('a+')))
+        self.assertEqual('b', i.match_regex(re.compile('.*')))
+
+    def test_regex_parser(self):
+        words = ['word{} '.format(n) for n in range(2000)]
+        stream = RecordingStringIO(''.join(words))
+        result, value = (+regex.Regex(r'\w+ ')).parse(parser.ParserState(inputs.StreamInput(stream)))
+        self.assertTrue(result)
+        self.assertEqual(tuple(words), value)
+        self.assertTrue(all(0 <= size <= 4096 for size in stream.sizes))
+
+
+class MmapInputTestCase(unittest.TestCase):
+
+    def make_file(self, content):
+        fd, path = tempfile.mkstemp()
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_read(self):
+        with inputs.MmapInput(self.make_file('aé€😀b'.encode('utf-8'))) as i:
+            self.assertEqual('aé', i.read(2))
+            self.assertEqual(3, i.tell())
+            self.assertEqual('€😀b', i.read())
+            self.assertEqual(11, i.tell())
+            self.assertEqual('', i.read(1))
+
+    def test_read_char(self):
+        with inputs.MmapInput(self.make_file('aé€😀'.encode('utf-8'))) as i:
+            self.assertEqual(['a', 'é', '€', '😀', ''], [i.read_char() for _ in range(5)])
+            self.assertEqual(10, i.tell())
+
+    def test_match(self):
+        with inputs.MmapInput(self.make_file('abc€def'.encode('utf-8'))) as i:
+            self.assertTrue(i.match('abc€'))
+            self.assertEqual(6, i.tell())
+            self.assertFalse(i.match('deff'))
+            self.assertEqual(6, i.tell())
+            self.assertTrue(i.match('def'))
+
+    def test_seek(self):
+        with inputs.MmapInput(self.make_file(b'abcdef')) as i:
+            i.seek(4)
+            self.assertEqual('ef', i.read())
+
+    def test_start_end(self):
+        with inputs.MmapInput(self.make_file('ab€def'.encode('utf-8')), start=2, end=6) as i:
+            self.assertEqual(2, i.start)
+            self.assertEqual(6, i.end)
+            self.assertEqual(2, i.tell())
+            self.assertEqual('€', i.read_char())
+            self.assertFalse(i.match('de'))
+            self.assertTrue(i.match('d'))
+            self.assertEqual('', i.read_char())
+            i.seek(2)
+            self.assertEqual('€d', i.read())
+
+    def test_single_byte_encoding(self):
+        with inputs.MmapInput(self.make_file('aé'.encode('latin-1')), 'latin-1') as i:
+            self.assertEqual('iso8859-1', i.encoding)
+            self.assertEqual('a', i.read_char())
+            self.assertEqual('é', i.read_char())
+            self.assertEqual(2, i.tell())
+
+    def test_empty_file(self):
+        with inputs.MmapInput(self.make_file(b'')) as i:
+            self.assertEqual('', i.read_char())
+            self.assertEqual('', i.read())
+
+    def test_match_regex(self):
+        with inputs.MmapInput(self.make_file('ab€def'.encode('utf-8'))) as i:
+            self.assertEqual('ab€', i.match_regex(re.compile('[^d]+')))
+            self.assertEqual(5, i.tell())
+            self.assertIsNone(i.match_regex(re.compile('x')))
+            self.assertEqual(5, i.tell())
+            self.assertEqual('def', i.match_regex(re.compile('.*')))
+            self.assertEqual('', i.match_regex(re.compile('.*')))
+
+    def test_match_regex_past_window(self):
+        # Multi-byte characters straddle the end of the first window.
+        with inputs.MmapInput(self.make_file(('é' * 5000 + 'x').encode('utf-8'))) as i:
+            self.assertEqual('é' * 5000, i.match_regex(re.compile('é+')))
+            self.assertEqual(10000, i.tell())
+            self.assertEqual('x', i.match_regex(re.compile('x')))
+
+    def test_regex_parser(self):
+        words = ['word{} '.format(n) for n in range(2000)]
+        with inputs.MmapInput(self.make_file(''.join(words).encode('utf-8'))) as i:
+            result, value = (+regex.Regex(r'\w+ ')).parse(parser.ParserState(i))
+            self.assertTrue(result)
+            self.assertEqual(tuple(words), value)
+
+    def test_unsupported_encoding(self):
+        with self.assertRaises(ValueError):
+            inputs.MmapInput(self.make_file(b''), 'utf-16')
+
+
+class Pipe:
+    """Non-seekable stream."""
+
+    def __init__(self, content):
+        self.__stream = io.StringIO(content)
+        self.reads = 0
+
+    def seekable(self):
+        return False
+
+    def read(self, size=-1):
+        self.reads += 1
+        return self.__stream.read(size)
+
+    def readline(self):
+        self.reads += 1
+        return self.__stream.readline()
+
+
+class EndlessStream:
+    """Non-seekable stream repeating text forever."""
+
+    def __init__(self, text):
+        self.__text = text
+        self.consumed = 0
+
+    def seekable(self):
+        return False
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            raise AssertionError('Read to end of endless stream')
+        self.consumed += size
+        return (self.__text * (size // len(self.__text) + 1))[:size]
+
+    def readline(self):
+        self.consumed += len(self.__text)
+        return self.__text
+
+
+class BufferedStreamInputTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.pipe = Pipe('abcdefghij')
+        self.input = inputs.BufferedStreamInput(self.pipe, 3)
+
+    def test_stream(self):
+        self.assertIs(self.pipe, self.input.stream)
+
+    def test_read(self):
+        self.assertEqual('abcde', self.input.read(5))
+        self.assertEqual(5, self.input.tell())
+        self.assertEqual('fghij', self.input.read())
+        self.assertEqual('', self.input.read(1))
+        self.assertEqual(10, self.input.tell())
+
+    def test_read_char(self):
+        self.assertEqual('abcdefghij', ''.join(self.input.read_char() for _ in range(10)))
+        self.assertEqual('', self.input.read_char())
+        self.assertEqual(10, self.input.tell())
+
+    def test_seek_back(self):
+        self.input.read(7)
+        self.input.seek(1)
+        self.assertEqual('bcd', self.input.read(3))
+
+    def test_match(self):
+        self.assertTrue(self.input.match('ab'))
+        self.assertTrue(self.input.match('cdef'))
+        self.assertFalse(self.input.match('gx'))
+        self.assertEqual(6, self.input.tell())
+        self.assertFalse(self.input.match('ghijk'))
+        self.assertTrue(self.input.match('ghij'))
+
+    def test_reads_lazily(self):
+        self.input.read_char()
+        self.assertEqual(1, self.pipe.reads)
+        self.assertEqual(3, self.input.buffered)
+
+    def test_release(self):
+        self.input.read(7)
+        self.input.release(7)
+        self.assertEqual(3, self.input.buffered)
+        self.assertEqual('hij', self.input.read())
+        self.input.seek(6)
+        with self.assertRaises(ValueError):
+            self.input.seek(5)
+
+    def test_match_regex(self):
+        self.assertEqual('abcd', self.input.match_regex(re.compile('[a-d]+')))
+        self.assertEqual(4, self.input.tell())
+        self.assertIsNone(self.input.match_regex(re.compile('ex')))
+        self.assertEqual(4, self.input.tell())
+        self.assertEqual('efghij', self.input.match_regex(re.compile('.*')))
+        self.assertEqual('', self.input.match_regex(re.compile('.*')))
+
+    def test_match_regex_endless(self):
+        stream = EndlessStream('token ')
+        i = inputs.BufferedStreamInput(stream)
+        self.assertEqual('token', i.match_regex(re.compile('[a-z]+')))
+        self.assertIsNone(i.match_regex(re.compile('x')))
+        self.assertEqual(5, i.tell())
+        self.assertEqual(8192, stream.consumed)
+
+    def test_regex_parser_endless(self):
+        stream = EndlessStream('token\n')
+        state = parser.ParserState(inputs.BufferedStreamInput(stream, None))
+        token = regex.Regex('[a-z]+\n')
+        for _ in range(3):
+            self.assertEqual((True, 'token\n'), token.parse(state))
+        self.assertEqual((False, None), regex.Regex('x').parse(state))
+        self.assertEqual(24, stream.consumed)
+
+    def test_line_mode(self):
+        pipe = Pipe('line 1\nline 2\n')
+        i = inputs.BufferedStreamInput(pipe, None)
+        self.assertTrue(i.match('line 1\n'))
+        self.assertEqual(1, pipe.reads)
+        self.assertEqual('line 2\n', i.read())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,394 @@
+# Copyright 2015 Rafe Kaplan
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import bisect
+import collections
+import contextlib
+import time
+
+from . import parser
+
+
+def rule_name(rule):
+    """Name of rule in reports: its name, its identity when it has none, or <top> outside of any rule."""
+    if rule is None:
+        return '<top>'
+    name = getattr(rule, 'name', None)
+    return name if name is not None else '<rule {:#x}>'.format(id(rule))
+
+
+def _distance(start, end):
+    """Number of characters between two positions, or 0 for positions that are not offsets."""
+    try:
+        return max(end - start, 0)
+    except TypeError:
+        return 0
+
+
+class _Counters:
+
+    __slots__ = ('invocations', 'successes', 'failures', 'consumed', 'rewound', 'cumulative_time', 'self_time',
+                 'depth')
+
+    def __init__(self):
+        self.invocations = 0
+        self.successes = 0
+        self.failures = 0
+        self.consumed = 0
+        self.rewound = 0
+        self.cumulative_time = 0.0
+        self.self_time = 0.0
+        self.depth = 0
+
+
+class RuleProfile:
+    """Counters of a single rule.
+
+    Args:
+        rule: Rule profiled.
+        invocations: Number of times the rule ran its parser.  Results found in the memo table are not counted.
+        successes: Number of invocations that succeeded.
+        failures: Number of invocations that failed or raised an exception.
+        consumed: Characters consumed by successful invocations.
+        rewound: Characters rewound by transactions failing while the rule was the innermost running rule.
+        cumulative_time: Seconds spent in the rule, including rules it invoked.  Recursive invocations are only
+            counted once.
+        self_time: Seconds spent in the rule, excluding rules it invoked.
+    """
+
+    def __init__(self, rule, invocations, successes, failures, consumed, rewound, cumulative_time, self_time):
+        self.__rule = rule
+        self.__invocations = invocations
+        self.__successes = successes
+        self.__failures = failures
+        self.__consumed = consumed
+        self.__rewound = rewound
+        self.__cumulative_time = cumulative_time
+        self.__self_time = self_time
+
+    @property
+    def rule(self):
+        return self.__rule
+
+    @property
+    def name(self):
+        return rule_name(self.__rule)
+
+    @property
+    def invocations(self):
+        return self.__invocations
+
+    @property
+    def successes(self):
+        return self.__successes
+
+    @property
+    def failures(self):
+        return self.__failures
+
+    @property
+    def consumed(self):
+        return self.__consumed
+
+    @property
+    def rewound(self):
+        return self.__rewound
+
+    @property
+    def cumulative_time(self):
+        return self.__cumulative_time
+
+    @property
+    def self_time(self):
+        return self.__self_time
+
+    def __repr__(self):
+        return '<RuleProfile {} invocations={} self_time={:.6f}>'.format(self.name, self.__invocations,
+                                                                       self.__self_time)
+
+
+class ProfileReport:
+    """Profiles of every rule run during a parse, most self time first.
+
+    Args:
+        profiles: Iterable of RuleProfile.
+    """
+
+    def __init__(self, profiles):
+        self.__profiles = tuple(sorted(profiles, key=lambda p: p.self_time, reverse=True))
+
+    @property
+    def profiles(self):
+        return self.__profiles
+
+    def __iter__(self):
+        return iter(self.__profiles)
+
+    def __len__(self):
+        return len(self.__profiles)
+
+    def __getitem__(self, key):
+        """Profile of a rule, by rule or by name.
+
+        Raises:
+            KeyError: No rule of that name, or the rule did not run.
+        """
+        for profile in self.__profiles:
+            if profile.rule is key or profile.name == key:
+                return profile
+        raise KeyError(key)
+
+    def format(self, limit=None):
+        """Table of profiles, one rule per line.
+
+        Args:
+            limit: Maximum number of rules listed.
+        """
+        lines = ['{:<24} {:>9} {:>9} {:>9} {:>10} {:>10} {:>10} {:>10}'.format(
+            'rule', 'calls', 'ok', 'failed', 'consumed', 'rewound', 'cumtime', 'selftime')]
+        for profile in self.__profiles[:limit]:
+            lines.append('{:<24} {:>9} {:>9} {:>9} {:>10} {:>10} {:>10.6f} {:>10.6f}'.format(
+                profile.name, profile.invocations, profile.successes, profile.failures, profile.consumed,
+                profile.rewound, profile.cumulative_time, profile.self_time))
+        return '\n'.join(lines)
+
+
+class ProfilingState(parser.ParserState):
+    """Parser state recording what every rule costs.
+
+    Parse with it in place of a ParserState, then call report().  Plain ParserState instances do not profile, so
+    parsing without profiling costs nothing.  Only the interpreter reports to the state: compiled parsers and
+    lowered programs run rules themselves.
+
+    Example:
+
+        state = ProfilingState(text, skipper)
+        document.parse(state)
+        print(state.report().format(limit=20))
+
+    Args:
+        state_input: Input, as for ParserState.
+        skipper: Skipper, as for ParserState.
+        memo_size: Memo table size, as for ParserState.
+        timer: Function returning the current time in seconds.
+    """
+
+    __slots__ = ('__counters', '__running', '__timer')
+
+    def __init__(self, state_input, skipper=None, memo_size=None, timer=time.perf_counter):
+        super(ProfilingState, self).__init__(state_input, skipper, memo_size)
+        self.__counters = {}
+        # [counters, start time, time spent in invoked rules] of each running rule, innermost last.
+        self.__running = []
+        self.__timer = timer
+
+    @contextlib.contextmanager
+    def open_rule(self, rule, args, kwargs):
+        counters = self.__counters.get(rule)
+        if counters is None:
+            counters = self.__counters[rule] = _Counters()
+        counters.invocations += 1
+        counters.depth += 1
+        start = self.tell()
+        frame = [counters, self.__timer(), 0.0]
+        self.__running.append(frame)
+        successful = False
+        try:
+            with super(ProfilingState, self).open_rule(rule, args, kwargs) as scope:
+                yield scope
+            successful = self.successful
+        finally:
+            elapsed = self.__timer() - frame[1]
+            self.__running.pop()
+            if self.__running:
+                self.__running[-1][2] += elapsed
+            counters.depth -= 1
+            if counters.depth == 0:
+                counters.cumulative_time += elapsed
+            counters.self_time += elapsed - frame[2]
+            if successful:
+                counters.successes += 1
+                if self.committed:
+                    counters.consumed += _distance(start, self.tell())
+            else:
+                counters.failures += 1
+
+    def end(self):
+        if not self.__running:
+            return super(ProfilingState, self).end()
+        pos = self.tell()
+        try:
+            super(ProfilingState, self).end()
+        finally:
+            self.__running[-1][0].rewound += _distance(self.tell(), pos)
+
+    def report(self):
+        """ProfileReport of the rules run so far."""
+        return ProfileReport(RuleProfile(rule, c.invocations, c.successes, c.failures, c.consumed, c.rewound,
+                                         c.cumulative_time, c.self_time)
+                             for rule, c in self.__counters.items())
+
+
+class BacktrackReport:
+    """Input rewound by failing transactions, by offset and by rule.
+
+    Every character between the position a transaction reached and the position it rewound to is read again by
+    whatever is tried next, so offsets rewound most often are where the grammar backtracks most.
+
+    Args:
+        ranges: Mapping of (start, end, rule) to the number of times input from start to end was rewound while rule
+            was the innermost running rule.
+    """
+
+    def __init__(self, ranges):
+        self.__ranges = dict(ranges)
+
+    @property
+    def ranges(self):
+        return dict(self.__ranges)
+
+    @property
+    def total(self):
+        """Number of characters rewound altogether."""
+        return sum((end - start) * count for (start, end, _), count in self.__ranges.items())
+
+    def offsets(self):
+        """List of the number of times each offset was rewound, up to the furthest offset rewound."""
+        size = max((end for _, end, _ in self.__ranges), default=0)
+        deltas = [0] * (size + 1)
+        for (start, end, _), count in self.__ranges.items():
+            deltas[start] += count
+            deltas[end] -= count
+        counts = []
+        current = 0
+        for delta in deltas[:size]:
+            current += delta
+            counts.append(current)
+        return counts
+
+    def histogram(self, bucket_size=1):
+        """List of (offset, count) for buckets of offsets rewound at least once, count summing over the bucket."""
+        buckets = collections.Counter()
+        for offset, count in enumerate(self.offsets()):
+            if count:
+                buckets[offset - offset % bucket_size] += count
+        return sorted(buckets.items())
+
+    def rules(self):
+        """List of (name, characters rewound) of every rule, most rewound first."""
+        totals = collections.Counter()
+        for (start, end, rule), count in self.__ranges.items():
+            totals[rule_name(rule)] += (end - start) * count
+        return totals.most_common()
+
+    def annotate(self, text):
+        """Input annotated line by line.
+
+        Each line of text is prefixed with the number of characters rewound on it and the rule rewinding most of
+        them.
+
+        Args:
+            text: Input parsed.
+        """
+        lines = text.splitlines(True)
+        starts = []
+        offset = 0
+        for line in lines:
+            starts.append(offset)
+            offset += len(line)
+        line_counts = [collections.Counter() for _ in lines]
+        for (start, end, rule), count in self.__ranges.items():
+            index = max(bisect.bisect_right(starts, start) - 1, 0)
+            while index < len(lines) and starts[index] < end:
+                overlap = min(end, starts[index] + len(lines[index])) - max(start, starts[index])
+                if overlap > 0:
+                    line_counts[index][rule_name(rule)] += overlap * count
+                index += 1
+        annotated = []
+        for line, counts in zip(lines, line_counts):
+            if counts:
+                name, _ = counts.most_common(1)[0]
+                prefix = '{:>8} {:<20}'.format(sum(counts.values()), name)
+            else:
+                prefix = ' ' * 29
+            annotated.append('{} | {}'.format(prefix, line.rstrip('\r\n')))
+        return '\n'.join(annotated)
+
+
+class BacktrackingState(parser.ParserState):
+    """Parser state recording the input rewound by failing transactions.
+
+    Parse with it in place of a ParserState, then call report().  Positions must be offsets, as they are for strings.
+    Only the interpreter reports to the state.
+
+    Example:
+
+        state = BacktrackingState(text, skipper)
+        document.parse(state)
+        print(state.report().annotate(text))
+
+    Args:
+        state_input: Input, as for ParserState.
+        skipper: Skipper, as for ParserState.
+        memo_size: Memo table size, as for ParserState.
+    """
+
+    __slots__ = ('__running', '__ranges')
+
+    def __init__(self, state_input, skipper=None, memo_size=None):
+        super(BacktrackingState, self).__init__(state_input, skipper, memo_size)
+        self.__running = []
+        self.__ranges = collections.Counter()
+
+    @contextlib.contextmanager
+    def open_rule(self, rule, args, kwargs):
+        self.__running.append(rule)
+        try:
+            with super(BacktrackingState, self).open_rule(rule, args, kwargs) as scope:
+                yield scope
+        finally:
+            self.__running.pop()
+
+    def end(self):
+        pos = self.tell()
+        try:
+            super(BacktrackingState, self).end()
+        finally:
+            start = self.tell()
+            if _distance(start, pos):
+                self.__ranges[start, pos, self.__running[-1] if self.__running else None] += 1
+
+    def report(self):
+        """BacktrackReport of the input rewound so far."""
+        return BacktrackReport(self.__ranges)
+
+
+def profile(root, parser_input, skipper=None):
+    """Parse input with a ProfilingState.
+
+    Returns:
+        Tuple (result, report) of what root.parse() returned and the ProfileReport of the parse.
+    """
+    state = ProfilingState(parser_input, skipper)
+    return root.parse(state), state.report()
+
+
+def backtracking(root, parser_input, skipper=None):
+    """Parse input with a BacktrackingState.
+
+    Returns:
+        Tuple (result, report) of what root.parse() returned and the BacktrackReport of the parse.
+    """
+    state = BacktrackingState(parser_input, skipper)
+    return root.parse(state), state.report()
@@ -0,0 +1,192 @@
+# Copyright 2015 Rafe Kaplan
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import itertools
+import unittest
+
+from booze.gin import aux
+from booze.gin import instrument
+from booze.gin import parser
+from booze.gin import rule
+
+
+def grammar():
+    digits = rule.Rule(name='digits')
+    word = rule.Rule(name='word')
+    item = rule.Rule(name='item')
+    items = rule.Rule()
+    digits %= +parser.Char('0123456789')
+    word %= +parser.Char('abc')
+    item %= (digits << ';') | (word << ';')
+    items %= +item << aux.eoi
+    return items
+
+
+class ProfilingStateTestCase(unittest.TestCase):
+
+    def test_counts(self):
+        (result, _), report = instrument.profile(grammar(), '12;ab;3;')
+        self.assertTrue(result)
+        self.assertEqual(4, len(report))
+
+        item = report['item']
+        self.assertEqual(4, item.invocations)
+        self.assertEqual(3, item.successes)
+        self.assertEqual(1, item.failures)
+        self.assertEqual(8, item.consumed)
+
+        # Dispatch tables rule out alternatives by next character, so each rule only runs where it may match.
+        digits = report['digits']
+        self.assertEqual(2, digits.invocations)
+        self.assertEqual(2, digits.successes)
+        self.assertEqual(0, digits.failures)
+        self.assertEqual(3, digits.consumed)
+
+        word = report['word']
+        self.assertEqual(1, word.invocations)
+        self.assertEqual(1, word.successes)
+        self.assertEqual(2, word.consumed)
+
+    def test_rewound(self):
+        r = rule.Rule(name='r')
+        r %= parser.String('abc') | parser.String('abd') | (parser.Char('a') << parser.Char('b') << parser.Char('x'))
+        (result, _), report = instrument.profile(r, 'abx')
+        self.assertTrue(result)
+        self.assertEqual(0, report['r'].rewound)
+
+        long_alternatives = (parser.Char('a') << parser.Char('b') << parser.Char('c')) | parser.String('abd')
+        r %= long_alternatives
+        (result, _), report = instrument.profile(r, 'abd')
+        self.assertTrue(result)
+        # Reading d for Char('c'), then a and b for the whole sequence.
+        self.assertEqual(3, report['r'].rewound)
+
+    def test_times(self):
+        outer = rule.Rule(name='outer')
+        inner = rule.Rule(name='inner')
+        inner %= parser.Char('a')
+        outer %= inner << inner
+        # Every call of the timer advances one second.
+        state = instrument.ProfilingState('aa', timer=itertools.count().__next__)
+        self.assertEqual((True, ('a', 'a')), outer.parse(state))
+        report = state.report()
+        self.assertEqual(2.0, report['inner'].self_time)
+        self.assertEqual(2.0, report['inner'].cumulative_time)
+        self.assertEqual(5.0, report['outer'].cumulative_time)
+        self.assertEqual(3.0, report['outer'].self_time)
+        self.assertEqual(['outer', 'inner'], [p.name for p in report])
+
+    def test_recursive_cumulative_time(self):
+        r = rule.Rule(parser.AttrType.OBJECT, name='r')
+        r %= (parser.Char('(') << r << parser.Char(')')) | parser.Char('x')
+        state = instrument.ProfilingState('((x))', timer=itertools.count().__next__)
+        r.parse(state)
+        profile = state.report()['r']
+        self.assertEqual(3, profile.invocations)
+        # Outermost invocation started at 0 and ended at 5.
+        self.assertEqual(5.0, profile.cumulative_time)
+        self.assertEqual(5.0, profile.self_time)
+
+    def test_memoized(self):
+        r = rule.Rule(memoize=True, name='r')
+        r %= parser.Char('a')
+        p = (r << parser.Char('b')) | (r << parser.Char('c'))
+        (result, _), report = instrument.profile(p, 'ac')
+        self.assertTrue(result)
+        self.assertEqual(1, report['r'].invocations)
+
+    def test_exception(self):
+        r = rule.Rule(name='r')
+        r %= parser.Char('a') << aux.cut << parser.Char('b')
+        state = instrument.ProfilingState('ac')
+        with self.assertRaises(parser.ExpectationFailure):
+            r.parse(state)
+        self.assertEqual(1, state.report()['r'].failures)
+        self.assertIsNone(state.scope)
+
+    def test_unnamed(self):
+        r = rule.Rule()
+        r %= parser.Char('a')
+        _, report = instrument.profile(r, 'a')
+        self.assertIs(r, report[r].rule)
+        self.assertEqual('<rule {:#x}>'.format(id(r)), report[r].name)
+        with self.assertRaises(KeyError):
+            report['missing']
+
+    def test_format(self):
+        _, report = instrument.profile(grammar(), '12;ab;3;')
+        lines = report.format().splitlines()
+        self.assertEqual(5, len(lines))
+        self.assertTrue(lines[0].startswith('rule'))
+        self.assertEqual(2, len(report.format(limit=1).splitlines()))
+
+
+def statements():
+    keyword = rule.Rule(name='keyword')
+    identifier = rule.Rule(name='identifier')
+    statement = rule.Rule(name='statement')
+    keyword %= parser.String('let') << parser.Char(' ') << parser.String('x') << parser.Char(';')
+    identifier %= +parser.Char('abcdefghijklmnopqrstuvwxyz ') << parser.Char(';')
+    statement %= +(parser.Char('\n') | keyword | identifier)
+    return statement
+
+
+class BacktrackingStateTestCase(unittest.TestCase):
+
+    def test_no_backtracking(self):
+        (result, _), report = instrument.backtracking(statements(), 'let x;\n')
+        self.assertTrue(result)
+        self.assertEqual(0, report.total)
+        self.assertEqual([], report.histogram())
+
+    def test_offsets(self):
+        r = rule.Rule(name='r')
+        r %= (parser.Char('a') << parser.Char('b') << parser.Char('c')) | parser.String('abd')
+        (result, _), report = instrument.backtracking(r, 'abd')
+        self.assertTrue(result)
+        # Reading d for Char('c'), then a and b for the whole sequence.
+        self.assertEqual({(2, 3, r): 1, (0, 2, r): 1}, report.ranges)
+        self.assertEqual(3, report.total)
+        self.assertEqual([1, 1, 1], report.offsets())
+        self.assertEqual([('r', 3)], report.rules())
+
+    def test_rules(self):
+        text = 'let x;\nlet yy;\nabc;\n'
+        (result, _), report = instrument.backtracking(statements(), text)
+        self.assertTrue(result)
+        # keyword reads 'let ' before failing on y, rewound by the alternative in statement.  The repeat in identifier
+        # reads one character past each identifier before ending.
+        self.assertEqual([('statement', 4), ('identifier', 2)], report.rules())
+        self.assertEqual(6, report.total)
+        self.assertEqual([(4, 1), (8, 3), (12, 1), (16, 1)], report.histogram(4))
+        self.assertEqual(report.total, sum(count for _, count in report.histogram(4)))
+
+    def test_annotate(self):
+        text = 'let x;\nlet yy;\nabc;\n'
+        _, report = instrument.backtracking(statements(), text)
+        lines = report.annotate(text).splitlines()
+        self.assertEqual(3, len(lines))
+        self.assertTrue(lines[0].endswith('| let x;'))
+        self.assertEqual('', lines[0].split('|')[0].strip())
+        self.assertEqual(['5', 'statement'], lines[1].split('|')[0].split())
+        self.assertEqual(['1', 'identifier'], lines[2].split('|')[0].split())
+
+    def test_outside_rules(self):
+        p = (parser.Char('a') << parser.Char('b')) | parser.String('ac')
+        _, report = instrument.backtracking(p, 'ac')
+        self.assertEqual([('<top>', 2)], report.rules())
+
+
+if __name__ == '__main__':
+    unittest.main()
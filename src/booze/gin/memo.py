@@ -0,0 +1,82 @@
+# Copyright 2015 Rafe Kaplan
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import collections
+
+
+class MemoEntry:
+    """Result of parsing a memoized rule at a single input position."""
+
+    def __init__(self, successful, committed, value, end):
+        self.__successful = successful
+        self.__committed = committed
+        self.__value = value
+        self.__end = end
+
+    @property
+    def successful(self):
+        return self.__successful
+
+    @property
+    def committed(self):
+        return self.__committed
+
+    @property
+    def value(self):
+        return self.__value
+
+    @property
+    def end(self):
+        return self.__end
+
+
+class MemoTable:
+    """Packrat memo table with optional least-recently-used eviction.
+
+    Args:
+        maxsize: Maximum number of entries retained.  When None the table grows without bound.
+    """
+
+    def __init__(self, maxsize=None):
+        if maxsize is not None and maxsize < 1:
+            raise ValueError('Memo table size must be positive')
+        self.__maxsize = maxsize
+        self.__entries = collections.OrderedDict()
+
+    @property
+    def maxsize(self):
+        return self.__maxsize
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def __contains__(self, key):
+        return key in self.__entries
+
+    def get(self, key):
+        entry = self.__entries.get(key)
+        if entry is not None and self.__maxsize is not None:
+            self.__entries.move_to_end(key)
+        return entry
+
+    def put(self, key, entry):
+        entries = self.__entries
+        entries[key] = entry
+        if self.__maxsize is not None:
+            entries.move_to_end(key)
+            while len(entries) > self.__maxsize:
+                entries.popitem(last=False)
+
+    def clear(self):
+        self.__entries.clear()
@@ -0,0 +1,71 @@
+# Copyright 2015 Rafe Kaplan
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+from booze.gin import memo
+
+
+class MemoEntryTestCase(unittest.TestCase):
+
+    def test_properties(self):
+        entry = memo.MemoEntry(True, False, 'value', 10)
+        self.assertTrue(entry.successful)
+        self.assertFalse(entry.committed)
+        self.assertEqual('value', entry.value)
+        self.assertEqual(10, entry.end)
+
+
+class MemoTableTestCase(unittest.TestCase):
+
+    def test_get_put(self):
+        table = memo.MemoTable()
+        entry = memo.MemoEntry(True, True, 'a', 1)
+        self.assertIsNone(table.get('key'))
+        table.put('key', entry)
+        self.assertIs(entry, table.get('key'))
+        self.assertIn('key', table)
+        self.assertEqual(1, len(table))
+
+    def test_unbounded(self):
+        table = memo.MemoTable()
+        for i in range(1000):
+            table.put(i, memo.MemoEntry(False, False, None, i))
+        self.assertIsNone(table.maxsize)
+        self.assertEqual(1000, len(table))
+
+    def test_eviction(self):
+        table = memo.MemoTable(2)
+        table.put(1, memo.MemoEntry(False, False, None, 1))
+        table.put(2, memo.MemoEntry(False, False, None, 2))
+        table.get(1)
+        table.put(3, memo.MemoEntry(False, False, None, 3))
+        self.assertEqual(2, len(table))
+        self.assertIn(1, table)
+        self.assertNotIn(2, table)
+        self.assertIn(3, table)
+
+    def test_clear(self):
+        table = memo.MemoTable()
+        table.put(1, memo.MemoEntry(False, False, None, 1))
+        table.clear()
+        self.assertEqual(0, len(table))
+
+    def test_bad_size(self):
+        with self.assertRaises(ValueError):
+            memo.MemoTable(0)
+
+
+if __name__ == '__main__':
+    unittest.main()
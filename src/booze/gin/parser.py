@@ -14,10 +14,12 @@
 
 import contextlib
 import enum
+import functools
 import inspect
-import io
 
+from . import inputs
 from . import local_vars
+from . import memo
 from .. import util
 from .. import whiskey
 
@@ -33,6 +35,17 @@ class UNUSED:
         return False
 
 
+class ExpectationFailure(Exception):
+    """Raised when parsing fails after a cut and can not backtrack."""
+
+    def __init__(self, pos):
+        super(ExpectationFailure, self).__init__('Expectation failed at position {}'.format(pos))
+        self.pos = pos
+
+    def __reduce__(self):
+        return ExpectationFailure, (self.pos,)
+
+
 def as_parser(value):
     if isinstance(value, str):
         return lit(value)
@@ -45,29 +58,52 @@ def as_parser(value):
 
 
 class ParserState:
+    """Input position, transactions, cuts, scope and memo table of a parse.
+
+    Transactions are kept on a stack of records that are reused as transactions open and close, so opening one does
+    not allocate once the stack has grown to the depth of the grammar.
+    """
 
     class __Tx:
 
-        commit = False
-        success = False
-        value = UNUSED
+        __slots__ = ('pos', 'depth', 'commit', 'success', 'value')
 
-        def __init__(self, pos):
-            self.pos = pos
+        def __init__(self, depth):
+            self.depth = depth
 
-    def __init__(self, state_input, skipper=None):
+    __slots__ = ('__input', '__source', '__tell', '__seek', '__skipper', '__tx', '__depth', '__stack', '__cut_depth',
+                 '__cuts', '__skipped', '__scope', '__memo', '__weakref__')
+
+    def __init__(self, state_input, skipper=None, memo_size=None):
         if isinstance(state_input, str):
-            self.__input = io.StringIO(state_input)
+            state_input = inputs.StringInput(state_input)
+        self.__input = state_input
+        if isinstance(state_input, inputs.Input):
+            self.__source = state_input
+        elif hasattr(state_input, 'seekable') and not state_input.seekable():
+            self.__source = inputs.BufferedStreamInput(state_input)
         else:
-            self.__input = state_input
+            self.__source = inputs.StreamInput(state_input)
+        self.__tell = self.__source.tell
+        self.__seek = self.__source.seek
         self.skipper = skipper
         self.__tx = None
+        self.__depth = 0
+        self.__stack = []
+        self.__cut_depth = 0
+        self.__cuts = 0
+        self.__skipped = None
         self.__scope = None
+        self.__memo = memo.MemoTable(memo_size)
 
     @property
     def input(self):
         return self.__input
 
+    @property
+    def memo(self):
+        return self.__memo
+
     @property
     def skipper(self):
         return self.__skipper
@@ -101,13 +137,33 @@ class ParserState:
     def scope(self):
         return self.__scope
 
+    @property
+    def cuts(self):
+        """Number of cuts made so far."""
+        return self.__cuts
+
     @value.setter
     def value(self, value):
         self._tx.value = value
         self._tx.success = True
 
     def read(self, *args, **kwargs):
-        return self.__input.read(*args, **kwargs)
+        return self.__source.read(*args, **kwargs)
+
+    def read_char(self):
+        return self.__source.read_char()
+
+    def match(self, string):
+        return self.__source.match(string)
+
+    def match_regex(self, regex):
+        return self.__source.match_regex(regex)
+
+    def tell(self):
+        return self.__source.tell()
+
+    def seek(self, pos):
+        self.__source.seek(pos)
 
     def commit(self, value=UNUSED):
         self.value = value
@@ -120,11 +176,72 @@ class ParserState:
     def rollback(self):
         self._tx.commit = False
         self._tx.success = False
-        del self._tx.value
+        self._tx.value = UNUSED
 
     def uncommit(self):
         self._tx.commit = False
 
+    def cut(self):
+        """Commit to everything parsed so far.
+
+        Transactions open at the time of the cut may no longer rewind.  If one of them fails it raises
+        ExpectationFailure instead, so enclosing alternatives are not tried.  Input before the current position and
+        all memoized results are discarded.
+        """
+        self.__cuts += 1
+        if self.__depth:
+            self.__cut_depth = self.__depth
+        self.__source.release(self.__source.tell())
+        self.__memo.clear()
+
+    def skip(self):
+        """Advance past everything matched by the skipper.
+
+        Regular skippers run as a single regular expression on string inputs and constant Char skippers as a table
+        lookup per character.  The last skip is remembered so that skipping again from either end of it does not
+        rescan the input.
+        """
+        skipper = self.__skipper
+        if skipper is None:
+            return
+        source = self.__source
+        start = source.tell()
+        skipped = self.__skipped
+        if skipped is not None and skipped[2] is skipper:
+            if start == skipped[1]:
+                return
+            elif start == skipped[0]:
+                source.seek(skipped[1])
+                return
+
+        skip_regex = skipper.skip_regex
+        if skip_regex is not None and isinstance(source, inputs.StringInput):
+            source.match_regex(skip_regex)
+        elif type(skipper) is Char and isinstance(skipper.chars, frozenset):
+            skip_chars = skipper.chars
+            while True:
+                pos = source.tell()
+                if source.read_char() not in skip_chars:
+                    source.seek(pos)
+                    break
+        else:
+            status = True
+            self.skipper = None
+            try:
+                while status:
+                    self.begin()
+                    try:
+                        status, _ = skipper.parse(self)
+                        if status:
+                            self.commit()
+                    except BaseException:
+                        self.abort()
+                        raise
+                    self.end()
+            finally:
+                self.skipper = skipper
+        self.__skipped = (start, source.tell(), skipper)
+
     @contextlib.contextmanager
     def open_scope(self, *args, **kwargs):
         previous_scope = self.__scope
@@ -134,23 +251,92 @@ class ParserState:
         finally:
             self.__scope = previous_scope
 
+    @contextlib.contextmanager
+    def open_rule(self, rule, args, kwargs):
+        """Open the scope of a rule while its parser runs.
+
+        Equivalent to open_scope(), and as cheap.  Subclasses override it to observe rules.
+
+        Args:
+            rule: Rule about to run its parser.
+            args: Positional arguments of the rule.
+            kwargs: Keyword arguments of the rule.
+        """
+        previous_scope = self.__scope
+        self.__scope = local_vars.LocalScope(*args, **kwargs)
+        try:
+            yield self.__scope
+        finally:
+            self.__scope = previous_scope
+
     @contextlib.contextmanager
     def open_transaction(self):
-        tx = self._tx
-        self.__tx = ParserState.__Tx(self.__input.tell())
+        self.begin()
         try:
             yield self
-        finally:
-            if not self.committed:
-                self.__input.seek(self._tx.pos)
-            self.__tx = tx
+        except BaseException:
+            self.abort()
+            raise
+        self.end()
+
+    def begin(self):
+        """Open a transaction at the current position.
+
+        Every begin() must be matched by end(), or by abort() when an exception escapes the transaction.
+        """
+        depth = self.__depth
+        stack = self.__stack
+        if depth == len(stack):
+            stack.append(ParserState.__Tx(depth + 1))
+        tx = stack[depth]
+        tx.pos = self.__tell()
+        tx.commit = False
+        tx.success = False
+        tx.value = UNUSED
+        self.__depth = depth + 1
+        self.__tx = tx
+
+    def end(self):
+        """Close the innermost transaction, rewinding to where it began unless it committed.
+
+        Raises:
+            ExpectationFailure: The transaction did not commit and may not rewind because of a cut.
+        """
+        if self.__close_transaction():
+            raise ExpectationFailure(self.__tell())
+
+    def abort(self):
+        """Close the innermost transaction while an exception propagates out of it."""
+        self.__close_transaction()
+
+    def __close_transaction(self):
+        tx = self.__tx
+        depth = self.__depth
+        expectation_failed = False
+        if not tx.commit:
+            if depth <= self.__cut_depth:
+                expectation_failed = True
+            else:
+                self.__seek(tx.pos)
+        if self.__cut_depth >= depth:
+            self.__cut_depth = depth - 1
+        depth -= 1
+        self.__depth = depth
+        if depth:
+            self.__tx = self.__stack[depth - 1]
+        else:
+            self.__tx = None
+            self.__source.release(self.__tell())
+        return expectation_failed
 
     def invoke(self, value):
+        if not isinstance(value, whiskey.Action):
+            return value
         scope = self.__scope
         args = scope.args if scope else ()
         kwargs = scope.kwargs if scope else {}
         vars = scope.vars if scope else local_vars.Vars()
-        return whiskey.invoke(value, *args, vars=vars, **kwargs)
+        return value.compile()(*args, vars=vars, **kwargs)
 
 
 class AttrType(enum.Enum):
@@ -193,26 +379,88 @@ class Parser:
     def attr_type(self):
         raise NotImplementedError
 
+    @property
+    def children(self):
+        """Parsers directly invoked by this parser."""
+        return ()
+
+    @util.calculated_property
+    def skip_regex(self):
+        """Compiled regular expression matching everything skipped when this parser is the skipper, or None."""
+        from . import regex
+        return regex.skip_regex(self)
+
     def parse(self, parser_input, skipper=None):
         if skipper is not None and isinstance(parser_input, ParserState):
             raise TypeError('May not provide ParserState and new skipper')
         if not isinstance(parser_input, ParserState):
             parser_input = ParserState(parser_input, skipper)
-        with parser_input.open_transaction() as state:
-            if state.skipper:
-                status = True
-                skipper = state.skipper
-                state.skipper = None
-                try:
-                    while status:
-                        with state.open_transaction():
-                            status, _ = skipper.parse(state)
-                            if status:
-                                state.commit()
-                finally:
-                    state.skipper = skipper
+        state = parser_input
+        state.begin()
+        try:
+            state.skip()
             self._parse(state)
-            return state.successful, state.value if state.successful else None
+            result = (True, state.value) if state.successful else (False, None)
+        except BaseException:
+            state.abort()
+            raise
+        state.end()
+        return result
+
+    def parse_file(self, path, skipper=None, encoding='utf-8'):
+        with inputs.MmapInput(path, encoding) as file_input:
+            return self.parse(file_input, skipper)
+
+    def parse_many(self, documents, workers=None, skipper=None, ordered=True, timeout=None, max_tasks_per_child=None,
+                   return_exceptions=False):
+        """Parse documents in a pool of worker processes.
+
+        See pool.parse_many() for arguments.
+
+        Yields:
+            (index, result) for each document, result being what parse() returned for it.
+        """
+        from . import pool
+        return pool.parse_many(self, documents, workers, skipper, ordered, timeout, max_tasks_per_child,
+                               return_exceptions)
+
+    def parse_records(self, path, separator='\n', workers=None, skipper=None, encoding='utf-8', chunk_size=16 << 20):
+        """Parse a file of records, each matched by this parser, in a pool of worker processes.
+
+        See pool.parse_records() for arguments.
+
+        Yields:
+            Value of each record, in the order of the file.
+        """
+        from . import pool
+        return pool.parse_records(self, path, separator, workers, skipper, encoding, chunk_size)
+
+    def compile(self):
+        """Compile parser graph into generated Python functions.
+
+        Returns:
+            compiler.CompiledParser producing the same results as this parser.
+        """
+        from . import compiler
+        return compiler.CompiledParser(self)
+
+    def analyze(self):
+        """Find constructs in the parser graph that make parsing hang, fail or take exponential time.
+
+        Returns:
+            List of analysis.Hazard, see analysis.analyze().
+        """
+        from . import analysis
+        return analysis.analyze(self)
+
+    def lower(self):
+        """Lower parser graph to instructions for a parsing machine with explicit stacks.
+
+        Returns:
+            vm.Program producing the same results as this parser without recursing on nested input.
+        """
+        from . import vm
+        return vm.Program(self)
 
     def _parse(self, state):
         pass
@@ -249,6 +497,16 @@ class Parser:
 
 
 class Char(Parser):
+    """Character parser.
+
+    Constant character sets are frozen at construction.  Sets produced by an action are converted once for each
+    distinct value the action returns.
+
+    Args:
+        chars: Characters to match, an action returning them or None to match any character.
+    """
+
+    __MAX_TABLES = 1024
 
     def __init__(self, chars=None):
         if chars is None:
@@ -256,7 +514,8 @@ class Char(Parser):
         elif isinstance(chars, whiskey.Action):
             self.__chars = chars
         else:
-            self.__chars = set(chars)
+            self.__chars = frozenset(chars)
+        self.__tables = {}
 
     @property
     def attr_type(self):
@@ -266,13 +525,27 @@ class Char(Parser):
     def chars(self):
         return self.__chars
 
+    def _table(self, chars):
+        """Lookup table for characters returned by action."""
+        if chars is None or isinstance(chars, (set, frozenset)):
+            return chars
+        try:
+            return self.__tables[chars]
+        except KeyError:
+            if len(self.__tables) >= self.__MAX_TABLES:
+                self.__tables.clear()
+            table = self.__tables[chars] = frozenset(chars)
+            return table
+        except TypeError:
+            return frozenset(chars)
+
     def _parse(self, state):
-        c = state.read(1)
+        c = state.read_char()
         if c != '':
-            local_chars = state.invoke(self.__chars)
-            if local_chars is not None and not isinstance(local_chars, set):
-                local_chars = set(local_chars)
-            if local_chars is None or c in local_chars:
+            chars = self.__chars
+            if isinstance(chars, whiskey.Action):
+                chars = self._table(state.invoke(chars))
+            if chars is None or c in chars:
                 state.commit(c)
 
 
@@ -291,9 +564,17 @@ class String(Parser):
 
     def _parse(self, state):
         value = state.invoke(self.__string)
-        string = state.read(len(value))
-        if string == value:
-            state.commit(string)
+        if state.match(value):
+            state.commit(value)
+
+
+# Incremented whenever a rule is assigned a parser, invalidating analysis cached on the parsers of every grammar.
+_grammar_version = 0
+
+
+def _grammar_changed():
+    global _grammar_version
+    _grammar_version += 1
 
 
 class AggregateParser(Parser):
@@ -305,6 +586,10 @@ class AggregateParser(Parser):
     def parsers(self):
         return self.__parsers
 
+    @property
+    def children(self):
+        return self.__parsers
+
 
 class Seq(AggregateParser):
 
@@ -361,8 +646,43 @@ class Alt(AggregateParser):
             found_type = all_types[0]
             return found_type if all(t == found_type for t in all_types[1:]) else AttrType.OBJECT
 
+    @property
+    def dispatch_table(self):
+        """Branches to try by next character, or None if no character rules out a branch.
+
+        Computed on first use from the FIRST sets of the branches, together with the tables of every Alt reachable
+        from this one.  Tables are computed again after any rule is assigned a new parser, as that may change which
+        branches can match.
+        """
+        try:
+            version, table = self.__dispatch_table
+        except AttributeError:
+            pass
+        else:
+            if version == _grammar_version:
+                return table
+        from . import analysis
+        version = _grammar_version
+        for alt, table in analysis.dispatch_tables(self).items():
+            alt.__dispatch_table = (version, table)
+        return self.__dispatch_table[1]
+
+    def __setstate__(self, state):
+        # Tables pickled with the grammar match it, whatever the grammar version of the process unpickling it.
+        table = state.get('_Alt__dispatch_table')
+        if table is not None:
+            state['_Alt__dispatch_table'] = (_grammar_version, table[1])
+        self.__dict__.update(state)
+
     def _parse(self, state):
-        for parser in self.parsers:
+        parsers = self.parsers
+        table = self.dispatch_table
+        if table is not None:
+            pos = state.tell()
+            c = state.read_char()
+            state.seek(pos)
+            parsers = table.get(c, state.skipper)
+        for parser in parsers:
             # TODO: Each value can be an action.
             result, value = parser.parse(state)
             if result:
@@ -389,16 +709,30 @@ class Unary(Parser):
     def parser(self):
         return self.__parser
 
+    @property
+    def children(self):
+        return (self.__parser,)
+
     def _parse(self, state):
         self.parser._parse(state)
 
 
 class SemanticAction(Unary):
+    """Parser applying a function to the value of its sub-parser.
+
+    The function receives the sub-parser's value, or each item of it when it is a tuple, and also vars when called
+    within a rule scope and it accepts them.  How it is called is resolved once per number of arguments rather than by
+    binding its signature on every match, and whiskey actions are compiled on first use.
+    """
 
     def __init__(self, parser, func, attr_type=AttrType.OBJECT):
         super(SemanticAction, self).__init__(parser)
         self.__func = func
         self.__attr_type = attr_type
+        self.__call = None
+        self.__signature = UNUSED
+        self.__accepts_vars = {}
+        self.__unused_params = None
 
     @property
     def attr_type(self):
@@ -411,29 +745,54 @@ class SemanticAction(Unary):
     def _parse(self, state):
         super(SemanticAction, self)._parse(state)
         if state.successful:
-            if self.parser.attr_type == AttrType.UNUSED:
-                params = ()
-            else:
-                params = state.value if isinstance(state.value, tuple) else (state.value,)
-
-
-            if isinstance(self.__func, whiskey.Action):
-                func = self.__func.invoke
-            else:
-                func = self.__func
-
-            sig = inspect.signature(func)
-            binding = None
-            if state.scope:
-                try:
-                    binding = sig.bind(*params, vars=state.scope.vars)
-                except TypeError:
-                    pass
-
-            if not binding:
-                binding = sig.bind(*params)
+            state.value = self._apply(state, state.value)
+
+    def __getstate__(self):
+        # Bindings are resolved again after unpickling, as compiled actions can not be pickled.
+        state = dict(self.__dict__)
+        state.update({
+            '_SemanticAction__call': None,
+            '_SemanticAction__signature': UNUSED,
+            '_SemanticAction__accepts_vars': {},
+            '_SemanticAction__unused_params': None,
+        })
+        return state
+
+    def __bind_vars(self, count):
+        """Whether the function accepts vars alongside count positional arguments."""
+        if self.__signature is UNUSED:
+            try:
+                self.__signature = inspect.signature(self.__call)
+            except (TypeError, ValueError):
+                self.__signature = None
+        accepts_vars = False
+        if self.__signature is not None:
+            try:
+                self.__signature.bind(*((None,) * count), vars=None)
+                accepts_vars = True
+            except TypeError:
+                pass
+        self.__accepts_vars[count] = accepts_vars
+        return accepts_vars
+
+    def _apply(self, state, value):
+        call = self.__call
+        if call is None:
+            call = self.__call = self.__func.compile() if isinstance(self.__func, whiskey.Action) else self.__func
+            self.__unused_params = self.parser.attr_type == AttrType.UNUSED
+        if self.__unused_params:
+            params = ()
+        else:
+            params = value if isinstance(value, tuple) else (value,)
 
-            state.value = func(*binding.args, **binding.kwargs)
+        scope = state.scope
+        if scope:
+            accepts_vars = self.__accepts_vars.get(len(params))
+            if accepts_vars is None:
+                accepts_vars = self.__bind_vars(len(params))
+            if accepts_vars:
+                return call(*params, vars=scope.vars)
+        return call(*params)
 
 
 class Symbols(Parser):
@@ -458,20 +817,52 @@ class Symbols(Parser):
                     break
             self.__attr_type = attr_type
 
-        self.__symbols = []
-        for symbol, value in sorted(symbols.items()):
-            self.__symbols.append((String(symbol), value))
+        self.__symbols = tuple(sorted(symbols.items()))
+        self.__trie = {}
+        for symbol, value in self.__symbols:
+            node = self.__trie
+            for c in symbol:
+                node = node.setdefault(c, {})
+            node[None] = value
 
     @property
     def attr_type(self):
         return self.__attr_type
 
+    @property
+    def symbols(self):
+        """Tuple of (string, value) pairs sorted by string."""
+        return self.__symbols
+
+    def _longest(self, text, pos):
+        """Find longest symbol in string at pos.
+
+        Returns:
+            Tuple (end, value) for the longest symbol starting at pos, or None if there is none.
+        """
+        node = self.__trie
+        result = (pos, node[None]) if None in node else None
+        for i in range(pos, len(text)):
+            node = node.get(text[i])
+            if node is None:
+                break
+            if None in node:
+                result = (i + 1, node[None])
+        return result
+
     def _parse(self, state):
-        for parser, value in self.__symbols:
-            status, _ = parser.parse(state)
-            if status:
-                state.commit(value)
+        state.skip()
+        node = self.__trie
+        match = (state.tell(), node[None]) if None in node else None
+        while True:
+            node = node.get(state.read_char())
+            if node is None:
                 break
+            if None in node:
+                match = (state.tell(), node[None])
+        if match is not None:
+            state.seek(match[0])
+            state.commit(match[1])
 
 
 def directive_class(unary_parser):
@@ -486,6 +877,12 @@ def directive_class(unary_parser):
 
         def __getitem__(self, parser):
             return unary_parser(parser, *self.__args, **self.__kwargs)
+
+    # The module level name refers to the directive, so parsers pickle their class through it.
+    Directive.__name__ = unary_parser.__name__
+    Directive.__qualname__ = unary_parser.__qualname__
+    Directive.__module__ = unary_parser.__module__
+    unary_parser.__qualname__ = '{}.__parser_type__'.format(unary_parser.__qualname__)
     return Directive
 
 
@@ -517,12 +914,35 @@ class FuncDirectiveParser(DirectiveParser):
     def _direct(self, state):
         return self.func(state)
 
+    def __getstate__(self):
+        # Directive functions are pickled through the module level directive they belong to.
+        state = dict(self.__dict__)
+        directive = getattr(self.__func, '__func_directive__', None)
+        if directive is not None:
+            state['_FuncDirectiveParser__func'] = directive
+        return state
+
+    def __setstate__(self, state):
+        func = state['_FuncDirectiveParser__func']
+        if isinstance(func, FuncDirective):
+            state['_FuncDirectiveParser__func'] = func.func
+        self.__dict__.update(state)
+
 
 class FuncDirective:
 
     def __init__(self, func, attr_type=None):
         self.__func = func
         self.__attr_type = attr_type
+        self.__name = getattr(func, '__name__', None)
+        self.__module__ = getattr(func, '__module__', None)
+        try:
+            func.__func_directive__ = self
+        except AttributeError:
+            pass
+
+    def __reduce__(self):
+        return self.__name
 
     @property
     def attr_type(self):
@@ -546,6 +966,7 @@ def post_directive(attr_type=None):
     def post_directive_decorator(post_func):
         @func_directive(attr_type)
         @contextlib.contextmanager
+        @functools.wraps(post_func)
         def directive(state):
             yield
             if state.successful:
@@ -584,13 +1005,21 @@ class Repeat(Unary):
     def _parse(self, state):
         count = 0
         values = []
-        while self.__maximum is None or count < self.__maximum:
-            with state.open_transaction() as next_state:
-                super(Repeat.__parser_type__, self)._parse(next_state)
-                if next_state.successful:
-                    values.append(next_state.value)
-                else:
-                    break
+        parser = self.parser
+        maximum = self.__maximum
+        while maximum is None or count < maximum:
+            state.begin()
+            try:
+                parser._parse(state)
+                successful = state.successful
+                value = state.value
+            except BaseException:
+                state.abort()
+                raise
+            state.end()
+            if not successful:
+                break
+            values.append(value)
             count += 1
         if self.is_optional:
             state.commit(values[0] if values else UNUSED)
@@ -641,7 +1070,9 @@ def object_lexeme(state):
 class lexeme:
 
     def __getitem__(self, parser):
-        return as_string[object_lexeme[parser]]
+        from . import regex
+        lexeme_parser = as_string[object_lexeme[parser]]
+        return regex.fuse(lexeme_parser) or lexeme_parser
 
 
 @post_directive(AttrType.UNUSED)
@@ -14,9 +14,13 @@
 
 import contextlib
 import io
+import os
+import tempfile
 import unittest
 
 from booze import whiskey
+from booze.gin import aux
+from booze.gin import inputs
 from booze.gin import local_vars
 from booze.gin import parser
 
@@ -73,8 +77,10 @@ class ParserStateTestCase(unittest.TestCase):
         s = parser.ParserState(i)
         self.assertIs(i, s.input)
         s = parser.ParserState('astring')
-        self.assertIsInstance(s.input, io.StringIO)
+        self.assertIsInstance(s.input, inputs.StringInput)
         self.assertEqual('astring', s.input.getvalue())
+        string_input = inputs.StringInput('astring')
+        self.assertIs(string_input, parser.ParserState(string_input).input)
 
     def test_initial_state(self):
         with self.assertRaises(AttributeError):
@@ -149,10 +155,97 @@ class ParserStateTestCase(unittest.TestCase):
             self.assertFalse(self.state.successful)
             self.assertEqual(parser.UNUSED, self.state.value)
 
+    def test_begin_end(self):
+        self.state.begin()
+        self.state.read(1)
+        self.state.begin()
+        self.state.read(1)
+        self.state.commit('inner')
+        self.state.end()
+        self.assertEqual(2, self.input.tell())
+        self.assertFalse(self.state.successful)
+        self.state.end()
+        self.assertEqual(0, self.input.tell())
+
+    def test_reused_transaction(self):
+        with self.state.open_transaction():
+            self.state.commit('a value')
+        with self.state.open_transaction():
+            self.assertFalse(self.state.committed)
+            self.assertFalse(self.state.successful)
+            self.assertIs(parser.UNUSED, self.state.value)
+
+    def test_abort(self):
+        self.state.begin()
+        self.state.read(2)
+        self.state.cut()
+        self.state.abort()
+        self.assertEqual(2, self.input.tell())
+        with self.assertRaises(AttributeError):
+            self.state.value
+
+    def test_slots(self):
+        with self.assertRaises(AttributeError):
+            self.state.unknown = 1
+
+    def test_read_char(self):
+        self.assertEqual('a', self.state.read_char())
+        self.assertEqual(1, self.input.tell())
+
+    def test_match(self):
+        self.assertFalse(self.state.match('b'))
+        self.assertEqual(0, self.input.tell())
+        self.assertTrue(self.state.match('ab'))
+        self.assertEqual(2, self.input.tell())
+
+    def test_tell_and_seek(self):
+        self.assertEqual(0, self.state.tell())
+        self.state.seek(2)
+        self.assertEqual(2, self.state.tell())
+        self.assertEqual('c', self.state.read(1))
+
+    def test_memo(self):
+        self.assertEqual(0, len(self.state.memo))
+        self.assertIsNone(self.state.memo.maxsize)
+        self.assertEqual(10, parser.ParserState('abc', memo_size=10).memo.maxsize)
+
     def test_bad_skipper(self):
         with self.assertRaises(TypeError):
             parser.ParserState(' ', object())
 
+    def test_skip(self):
+        for state_input in ('  \n a', io.StringIO('  \n a')):
+            s = parser.ParserState(state_input, ' \n')
+            s.skip()
+            self.assertEqual(4, s.tell())
+            s.skip()
+            self.assertEqual(4, s.tell())
+
+    def test_skip_parser(self):
+        calls = []
+        skipper = parser.Char(' ')[lambda c: calls.append(c)]
+        self.assertIsNone(skipper.skip_regex)
+        s = parser.ParserState('  a', skipper)
+        s.skip()
+        self.assertEqual(2, s.tell())
+        self.assertEqual([' ', ' '], calls)
+
+        s.skip()
+        s.seek(0)
+        s.skip()
+        self.assertEqual(2, s.tell())
+        self.assertEqual([' ', ' '], calls)
+
+        s.seek(1)
+        s.skip()
+        self.assertEqual(2, s.tell())
+        self.assertEqual([' ', ' ', ' '], calls)
+
+    def test_skip_no_skipper(self):
+        s = parser.ParserState('  a')
+        s.skip()
+        self.assertEqual(0, s.tell())
+
     def test_invoke_without_scope(self):
         self.assertEqual(10, self.state.invoke(10))
         l = lambda *args, **kwargs: (args, kwargs)
@@ -180,6 +273,13 @@ class ParserStateTestCase(unittest.TestCase):
             self.assertDictEqual({'a': 'a', 'b': 'b', 'c': 'c'}, scope.kwargs)
         self.assertIsNone(self.state.scope)
 
+    def test_rule_scope(self):
+        with self.state.open_rule(None, (1, 2), {'a': 'a'}) as scope:
+            self.assertIs(scope, self.state.scope)
+            self.assertSequenceEqual((1, 2), scope.args)
+            self.assertDictEqual({'a': 'a'}, scope.kwargs)
+        self.assertIsNone(self.state.scope)
+
 
 class AttrTypeTestCase(unittest.TestCase):
 
@@ -311,6 +411,56 @@ class ParserTestCase(unittest.TestCase):
         p = parser.String('abc') << parser.String('def')
         self.assertEqual((True, ('abc', 'def')), p.parse('()()abc()()def()()', skipper))
 
+    def test_parse_non_seekable(self):
+        class Pipe:
+            def __init__(self, content):
+                self.stream = io.StringIO(content)
+
+            def seekable(self):
+                return False
+
+            def read(self, size=-1):
+                return self.stream.read(size)
+
+        p = parser.String('ab') | parser.String('ac')
+        s = parser.ParserState(Pipe('acab'))
+        self.assertEqual((True, 'ac'), p.parse(s))
+        self.assertEqual((True, 'ab'), p.parse(s))
+
+    def test_parse_stream_bounded(self):
+        stream = io.StringIO('ab\nx\n' * 1000 + 'cab\n')
+        line = parser.lexeme[+parser.Char('abc')] << '\n'
+        s = parser.ParserState(inputs.BufferedStreamInput(stream, 4))
+        for _ in range(1000):
+            self.assertEqual((True, 'ab'), line.parse(s))
+            self.assertEqual((False, None), line.parse(s))
+            self.assertTrue(parser.lit('x\n').parse(s)[0])
+            self.assertLessEqual(s.input.buffered, 8)
+        self.assertEqual((True, 'cab'), line.parse(s))
+
+    def test_cut_bounds_stream(self):
+        sizes = []
+
+        def record(value):
+            sizes.append(s.input.buffered)
+            return value
+
+        stream = io.StringIO('ab\n' * 1000)
+        line = (parser.lexeme[+parser.Char('ab')] << '\n' << aux.cut)[record]
+        s = parser.ParserState(inputs.BufferedStreamInput(stream, 4))
+        success, value = (+line).parse(s)
+        self.assertTrue(success)
+        self.assertEqual(1000, len(value))
+        self.assertLessEqual(max(sizes), 8)
+
+    def test_parse_file(self):
+        fd, path = tempfile.mkstemp()
+        with os.fdopen(fd, 'wb') as f:
+            f.write('  abc  déf  '.encode('utf-8'))
+        self.addCleanup(os.remove, path)
+        p = parser.String('abc') << parser.String('déf')
+        self.assertEqual((True, ('abc', 'déf')), p.parse_file(path, ' '))
+
     def test_skipper_and_parser_state(self):
         p = parser.Parser()
         s = parser.ParserState('state')
@@ -353,8 +503,23 @@ class CharTestCase(unittest.TestCase):
             self.assertEqual((False, None), p.parse(s))
             self.assertEqual(3, s.input.tell())
 
+    def test_parse_action_values(self):
+        p = parser.Char(whiskey.p[0])
+        for chars in ('abc', ['a', 'b'], {'a'}, frozenset('ab'), None):
+            s = parser.ParserState('a')
+            with s.open_scope(chars):
+                self.assertEqual((True, 'a'), p.parse(s))
+
+    def test_table(self):
+        p = parser.Char(whiskey.p[0])
+        self.assertIs(p._table('abc'), p._table('abc'))
+        self.assertEqual(frozenset('ab'), p._table(['a', 'b']))
+        chars = {'a'}
+        self.assertIs(chars, p._table(chars))
+
     def test_chars(self):
         self.assertEqual({'a', 'b', 'c'}, parser.Char('abc').chars)
+        self.assertIsInstance(parser.Char('abc').chars, frozenset)
         self.assertEqual(None, parser.Char().chars)
         a = TestAction()
         self.assertEqual(a, parser.Char(a).chars)
@@ -597,6 +762,34 @@ class SemanticActionTestCase(unittest.TestCase):
         self.assertEqual(('b', 'e'), a.args)
         self.assertEqual({}, a.kwargs)
 
+    def test_parse_builtin(self):
+        s = parser.ParserState('7')
+        with s.open_scope():
+            self.assertEqual((True, 7), parser.SemanticAction(parser.Char('0123456789'), int).parse(s))
+
+    def test_parse_optional_vars(self):
+        p = +parser.Char('ab')[lambda *v, vars=None: (len(v), vars is None)]
+        s = parser.ParserState('ab')
+        with s.open_scope():
+            self.assertEqual((True, ((1, False), (1, False))), p.parse(s))
+        self.assertEqual((True, ((1, True),)), p.parse('a'))
+
+    def test_parse_vars_by_arity(self):
+        p = parser.SemanticAction(+parser.Char('ab'), lambda a, b=None, vars=None: (a, b, vars))
+        s = parser.ParserState('ab')
+        with s.open_scope():
+            self.assertEqual((True, ('a', 'b', s.scope.vars)), p.parse(s))
+        s = parser.ParserState('abb')
+        with s.open_scope():
+            self.assertEqual((True, ('a', 'b', 'b')), p.parse(s))
+
+    def test_parse_wrong_arity(self):
+        p = parser.SemanticAction(parser.Char('a'), lambda: None)
+        s = parser.ParserState('a')
+        with s.open_scope():
+            with self.assertRaises(TypeError):
+                p.parse(s)
+
     def test_parse_fail(self):
         p = parser.SemanticAction(parser.Char('abc'), lambda v: v + v)
         s = io.StringIO('x')
@@ -636,6 +829,25 @@ class SymbolsTestCase(unittest.TestCase):
         self.assertEqual((False, None), symbols.parse(s))
         self.assertEqual(0, s.tell())
 
+    def test_longest_match(self):
+        symbols = parser.Symbols({'a': 1, 'ab': 2, 'abcd': 3})
+        for text, value, end in (('a', 1, 1), ('abx', 2, 2), ('abc', 2, 2), ('abcde', 3, 4)):
+            s = io.StringIO(text)
+            self.assertEqual((True, value), symbols.parse(s))
+            self.assertEqual(end, s.tell())
+
+    def test_empty_string(self):
+        symbols = parser.Symbols({'': 1, 'a': 2})
+        self.assertEqual((True, 1), symbols.parse('b'))
+        self.assertEqual((True, 2), symbols.parse('a'))
+
+    def test_skipper(self):
+        symbols = +parser.Symbols({'a': 1, 'b': 2})
+        self.assertEqual((True, (1, 2, 1)), symbols.parse(' a b  a', ' '))
+
+    def test_symbols(self):
+        self.assertEqual((('a', 1), ('b', 2)), parser.Symbols({'b': 2, 'a': 1}).symbols)
+
     def test_empty_symbols(self):
         with self.assertRaises(ValueError):
             parser.Symbols({})
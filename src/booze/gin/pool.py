@@ -0,0 +1,243 @@
+# Copyright 2015 Rafe Kaplan
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import collections
+import concurrent.futures
+import heapq
+import itertools
+import mmap
+import multiprocessing
+import os
+import pickle
+import signal
+import sys
+
+from . import inputs
+
+# ProcessPoolExecutor replaces workers after a number of tasks since Python 3.11.
+_RECYCLING_SUPPORTED = sys.version_info >= (3, 11)
+
+# Parser and skipper of the current worker process, installed once per worker by _initialize().
+_grammar = None
+
+
+def _initialize(grammar):
+    global _grammar
+    _grammar = pickle.loads(grammar) if isinstance(grammar, bytes) else grammar
+
+
+def _alarm(signum, frame):
+    raise TimeoutError('Parse did not finish in time')
+
+
+def _parse(document, timeout):
+    parser, skipper = _grammar
+    if timeout is None:
+        return parser.parse(document, skipper)
+    previous = signal.signal(signal.SIGALRM, _alarm)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return parser.parse(document, skipper)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def _parse_records(path, encoding, start, end):
+    from . import parser
+    record, skipper = _grammar
+    values = []
+    with inputs.MmapInput(path, encoding, start, end) as record_input:
+        state = parser.ParserState(record_input, skipper)
+        while True:
+            state.skip()
+            pos = state.tell()
+            if pos >= end:
+                return values
+            result, value = record.parse(state)
+            if not result or state.tell() == pos:
+                raise ValueError('Record at byte {} of {} did not parse'.format(pos, path))
+            values.append(value)
+            # Records are independent, so nothing before the next one is looked up again.
+            state.memo.clear()
+
+
+def _bounds(path, separator, chunk_size):
+    """Byte offsets splitting a file into chunks of about chunk_size bytes, each just after a separator."""
+    bounds = [0]
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return bounds
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            while bounds[-1] < size:
+                pos = bounds[-1] + chunk_size
+                if pos >= size:
+                    bounds.append(size)
+                else:
+                    found = data.find(separator, max(bounds[-1], pos - len(separator) + 1))
+                    bounds.append(size if found < 0 else found + len(separator))
+    return bounds
+
+
+def _size(document):
+    try:
+        return len(document)
+    except TypeError:
+        return 0
+
+
+def parse_many(parser, documents, workers=None, skipper=None, ordered=True, timeout=None, max_tasks_per_child=None,
+               return_exceptions=False):
+    """Parse documents in a pool of worker processes.
+
+    The parser is sent to each worker once when the worker starts rather than with every document.  Workers started
+    by forking inherit it, otherwise it is pickled once up front, so recycled workers require a picklable grammar:
+    functions used by semantic actions and predicates must be defined at module level.
+
+    Documents are read lazily, at most four per worker ahead of the results yielded, so large or endless iterables are
+    streamed.  Of the documents read, the largest are handed to workers first.
+
+    Args:
+        parser: Parser to parse documents with.
+        documents: Iterable of documents, each anything Parser.parse() accepts that may be pickled.
+        workers: Number of worker processes.  Defaults to the number of processors.
+        skipper: Skipper used for every document.
+        ordered: Yield results in the order of documents when True, else as soon as each completes.
+        timeout: Seconds after which parsing a single document is abandoned with TimeoutError.
+        max_tasks_per_child: Number of documents a worker parses before it is replaced by a new process.
+        return_exceptions: Yield exceptions raised parsing a document instead of raising them.
+
+    Yields:
+        (index, result) for each document, where index is its position in documents and result is what
+        Parser.parse() returned for it.
+
+    Raises:
+        ValueError: timeout was given on a platform without interval timers.
+        ValueError: max_tasks_per_child was given before Python 3.11.
+    """
+    if timeout is not None and not hasattr(signal, 'setitimer'):
+        raise ValueError('Timeouts require signal.setitimer')
+    if max_tasks_per_child is not None and not _RECYCLING_SUPPORTED:
+        raise ValueError('Recycling workers requires Python 3.11')
+    documents = enumerate(documents)
+    workers = workers or os.cpu_count() or 1
+
+    options = {}
+    if max_tasks_per_child is None:
+        context = multiprocessing.get_context()
+    else:
+        context = multiprocessing.get_context('spawn')
+        options['max_tasks_per_child'] = max_tasks_per_child
+    grammar = (parser, skipper)
+    if context.get_start_method() != 'fork':
+        grammar = pickle.dumps(grammar)
+
+    executor = concurrent.futures.ProcessPoolExecutor(
+        workers, mp_context=context, initializer=_initialize, initargs=(grammar,), **options)
+    try:
+        # Documents read but not yet submitted, largest first.
+        waiting = []
+        running = {}
+        # Completed futures by index, held until their turn when ordered.
+        completed = {}
+        read = yielded = 0
+        exhausted = False
+        while True:
+            while not exhausted and read - yielded < 4 * workers:
+                item = next(documents, None)
+                if item is None:
+                    exhausted = True
+                else:
+                    index, document = item
+                    heapq.heappush(waiting, (-_size(document), index, document))
+                    read += 1
+            while waiting and len(running) < 2 * workers:
+                _, index, document = heapq.heappop(waiting)
+                running[executor.submit(_parse, document, timeout)] = index
+            if not running:
+                return
+            finished, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in finished:
+                completed[running.pop(future)] = future
+            if ordered:
+                ready = []
+                while yielded + len(ready) in completed:
+                    ready.append(yielded + len(ready))
+            else:
+                ready = sorted(completed)
+            for index in ready:
+                future = completed.pop(index)
+                yielded += 1
+                try:
+                    result = future.result()
+                except Exception as e:
+                    if not return_exceptions:
+                        raise
+                    result = e
+                yield index, result
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def parse_records(parser, path, separator='\n', workers=None, skipper=None, encoding='utf-8', chunk_size=16 << 20):
+    """Parse a file of independent records in a pool of worker processes.
+
+    The file is split into chunks of about chunk_size bytes, each ending just after a separator, and every worker
+    parses records one after another from a memory map of its chunk.  Only the path and offsets of a chunk are sent to
+    workers, and only the values of its records are sent back.  At most two chunks per worker are parsed ahead of the
+    values yielded, so memory stays bounded however large the file.
+
+    Example:
+
+        number = lexeme[+Char('0123456789')][int] << '\n'
+        total = sum(number.parse_records('numbers.txt'))
+
+    Args:
+        parser: Parser of a single record, including its separator unless skipped by skipper.
+        path: Path of the file.
+        separator: String every record ends with.  A separator must not occur within a record.
+        workers: Number of worker processes.  Defaults to the number of processors.
+        skipper: Skipper used between and within records.
+        encoding: Encoding of the file, as for inputs.MmapInput.
+        chunk_size: Approximate number of bytes parsed by a worker at a time.
+
+    Yields:
+        Value of each record, in the order of the file.
+
+    Raises:
+        ValueError: A record did not parse.
+    """
+    bounds = _bounds(path, separator.encode(encoding), chunk_size)
+    chunks = iter(zip(bounds, bounds[1:]))
+    workers = workers or os.cpu_count() or 1
+
+    context = multiprocessing.get_context()
+    grammar = (parser, skipper)
+    if context.get_start_method() != 'fork':
+        grammar = pickle.dumps(grammar)
+
+    executor = concurrent.futures.ProcessPoolExecutor(
+        workers, mp_context=context, initializer=_initialize, initargs=(grammar,))
+    try:
+        pending = collections.deque(executor.submit(_parse_records, path, encoding, start, end)
+                                    for start, end in itertools.islice(chunks, 2 * workers))
+        while pending:
+            values = pending.popleft().result()
+            chunk = next(chunks, None)
+            if chunk is not None:
+                pending.append(executor.submit(_parse_records, path, encoding, *chunk))
+            yield from values
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
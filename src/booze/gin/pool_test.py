@@ -0,0 +1,182 @@
+# Copyright 2015 Rafe Kaplan
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import itertools
+import operator
+import os
+import pickle
+import signal
+import tempfile
+import unittest
+
+from booze import whiskey
+from booze.gin import aux
+from booze.gin import parser
+from booze.gin import pool
+from booze.gin import rule
+
+
+def calculator():
+    arith_op = parser.Symbols({'+': operator.add, '-': operator.sub})
+    mult_op = parser.Symbols({'*': operator.mul, '/': operator.floordiv})
+    dec = parser.lexeme[+parser.Char('0123456789')][int]
+    arith = rule.Rule(memoize=True)
+    mult = rule.Rule(memoize=True)
+    value = rule.Rule(memoize=True)
+    exp = rule.Rule(parser.AttrType.OBJECT)
+    p = whiskey.p
+    mult %= (value << mult_op << mult)[p[1](p[0], p[2])] | value
+    arith %= (mult << arith_op << arith)[p[1](p[0], p[2])] | mult
+    value %= dec | '(' << exp << ')'
+    exp %= arith
+    return exp << aux.eoi
+
+
+class PickleTestCase(unittest.TestCase):
+
+    def test_recursive_grammar(self):
+        calc = calculator()
+        self.assertEqual((True, 14), calc.parse('2 * (3 + 4)', ' '))
+        copy = pickle.loads(pickle.dumps(calc))
+        self.assertEqual((True, 14), copy.parse('2 * (3 + 4)', ' '))
+        self.assertEqual((True, 7), copy.parse('1 + 2 * 3', ' '))
+
+    def test_singletons(self):
+        for singleton in (parser.UNUSED, parser.lexeme, aux.eps, aux.eoi, aux.cut, whiskey.p):
+            self.assertIs(singleton, pickle.loads(pickle.dumps(singleton)))
+
+    def test_directives(self):
+        for directive in (parser.omit, parser.as_string, parser.object_lexeme, parser.predicate, parser.not_):
+            self.assertIs(directive, pickle.loads(pickle.dumps(directive)))
+            p = pickle.loads(pickle.dumps(directive[parser.Char('a')]))
+            self.assertIs(directive.func, p.func)
+        p = pickle.loads(pickle.dumps(parser.Repeat(1, 2)[parser.Char('a')]))
+        self.assertEqual((True, ('a', 'a')), p.parse('aaa'))
+
+    def test_expectation_failure(self):
+        e = pickle.loads(pickle.dumps(parser.ExpectationFailure(3)))
+        self.assertEqual(3, e.pos)
+
+
+class ParseManyTestCase(unittest.TestCase):
+
+    documents = ['1 + 2', '2 * (3 + 4)', '1 +', '10 / 3 - 1 * 2']
+
+    def setUp(self):
+        self.calc = calculator()
+        self.expected = [(i, self.calc.parse(d, ' ')) for i, d in enumerate(self.documents)]
+
+    def test_ordered(self):
+        self.assertEqual(self.expected, list(self.calc.parse_many(self.documents, workers=2, skipper=' ')))
+
+    def test_unordered(self):
+        results = list(self.calc.parse_many(iter(self.documents), workers=2, skipper=' ', ordered=False))
+        self.assertEqual(self.expected, sorted(results))
+
+    def test_empty(self):
+        self.assertEqual([], list(self.calc.parse_many([], workers=1)))
+
+    def test_streamed(self):
+        read = []
+
+        def documents():
+            for index in itertools.count():
+                read.append(index)
+                yield '{} + 1'.format(index)
+
+        results = self.calc.parse_many(documents(), workers=2, skipper=' ')
+        self.assertEqual([(i, (True, i + 1)) for i in range(20)], list(itertools.islice(results, 20)))
+        results.close()
+        self.assertLessEqual(len(read), 20 + 4 * 2)
+
+    @unittest.skipUnless(pool._RECYCLING_SUPPORTED, 'Recycling workers requires Python 3.11')
+    def test_recycled_workers(self):
+        results = list(self.calc.parse_many(self.documents, workers=2, skipper=' ', max_tasks_per_child=2))
+        self.assertEqual(self.expected, results)
+
+    def test_recycling_unsupported(self):
+        supported = pool._RECYCLING_SUPPORTED
+        pool._RECYCLING_SUPPORTED = False
+        try:
+            with self.assertRaisesRegex(ValueError, 'Python 3.11'):
+                list(self.calc.parse_many(self.documents, workers=1, max_tasks_per_child=2))
+            self.assertEqual(self.expected, list(self.calc.parse_many(self.documents, workers=1, skipper=' ')))
+        finally:
+            pool._RECYCLING_SUPPORTED = supported
+
+    def test_exceptions(self):
+        p = parser.Char('a') << aux.cut << parser.Char('b')
+        with self.assertRaises(parser.ExpectationFailure):
+            list(p.parse_many(['ab', 'ax'], workers=1))
+        results = list(p.parse_many(['ab', 'ax'], workers=1, return_exceptions=True))
+        self.assertEqual((0, (True, ('a', 'b'))), results[0])
+        self.assertIsInstance(results[1][1], parser.ExpectationFailure)
+        self.assertEqual(1, results[1][1].pos)
+
+    @unittest.skipUnless(hasattr(signal, 'setitimer'), 'Timeouts require interval timers')
+    def test_timeout(self):
+        p = +(parser.Char('a') | parser.Char('b'))
+        results = list(p.parse_many(['ab' * 1000000, 'ab'], workers=1, timeout=0.05, return_exceptions=True))
+        self.assertIsInstance(results[0][1], TimeoutError)
+        self.assertEqual((1, (True, ('a', 'b'))), results[1])
+
+
+class ParseRecordsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.number = parser.lexeme[+parser.Char('0123456789')][int] << '\n'
+
+    def make_file(self, content):
+        fd, path = tempfile.mkstemp()
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content.encode('utf-8'))
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_bounds(self):
+        path = self.make_file('1\n22\n333\n4444\n')
+        self.assertEqual([0, 5, 9, 14], pool._bounds(path, b'\n', 3))
+        self.assertEqual([0, 14], pool._bounds(path, b'\n', 100))
+        self.assertEqual([0, 2, 5, 9, 14], pool._bounds(path, b'\n', 1))
+        self.assertEqual([0, 9, 14], pool._bounds(path, b'3\n', 4))
+        self.assertEqual([0], pool._bounds(self.make_file(''), b'\n', 3))
+
+    def test_records(self):
+        path = self.make_file(''.join('{}\n'.format(i) for i in range(1000)))
+        self.assertEqual(list(range(1000)), list(self.number.parse_records(path, workers=2, chunk_size=100)))
+
+    def test_single_chunk(self):
+        path = self.make_file('1\n2\n3\n')
+        self.assertEqual([1, 2, 3], list(self.number.parse_records(path, workers=1)))
+
+    def test_empty(self):
+        self.assertEqual([], list(self.number.parse_records(self.make_file(''), workers=1)))
+
+    def test_skipper(self):
+        path = self.make_file(' 1 \n  22\n3 \n  ')
+        self.assertEqual([1, 22, 3], list(self.number.parse_records(path, workers=2, skipper=' ', chunk_size=1)))
+
+    def test_separator(self):
+        path = self.make_file('1€2€3€')
+        number = parser.lexeme[+parser.Char('0123456789')][int] << '€'
+        self.assertEqual([1, 2, 3], list(number.parse_records(path, '€', workers=2, chunk_size=2)))
+
+    def test_invalid_record(self):
+        path = self.make_file('1\n2\nx\n4\n')
+        with self.assertRaisesRegex(ValueError, r'Record at byte 4 of .* did not parse'):
+            list(self.number.parse_records(path, workers=2, chunk_size=2))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,179 @@
+# Copyright 2015 Rafe Kaplan
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import re
+import sys
+
+from . import chars
+from . import inputs
+from . import parser
+from .. import whiskey
+
+
+class Regex(parser.Parser):
+    """Parser matching a regular expression at the current position.
+
+    The value is the matched string.  Unlike a regular expression embedded in a larger pattern, the match is never
+    revisited once made.
+
+    Args:
+        pattern: Regular expression string or compiled pattern.
+        flags: Flags used when compiling pattern.
+    """
+
+    def __init__(self, pattern, flags=0):
+        self.__regex = re.compile(pattern, flags)
+
+    @property
+    def attr_type(self):
+        return parser.AttrType.STRING
+
+    @property
+    def regex(self):
+        return self.__regex
+
+    @property
+    def pattern(self):
+        return self.__regex.pattern
+
+    def _parse(self, state):
+        value = state.match_regex(self.__regex)
+        if value is not None:
+            state.commit(value)
+
+
+class RegularLexeme(Regex):
+    """Lexeme over a regular parser, matched as a single regular expression.
+
+    Created by fuse().  Inputs other than in-memory strings are parsed by the original lexeme parser.
+
+    Args:
+        parser: Original lexeme parser.
+        pattern: Regular expression equivalent to parser.
+    """
+
+    def __init__(self, parser, pattern):
+        super(RegularLexeme, self).__init__(pattern)
+        self.__parser = parser
+
+    @property
+    def parser(self):
+        return self.__parser
+
+    @property
+    def children(self):
+        return (self.__parser,)
+
+    def _parse(self, state):
+        if isinstance(state.input, inputs.StringInput):
+            super(RegularLexeme, self)._parse(state)
+        else:
+            self.__parser._parse(state)
+
+
+# Only predicates whose regular expression class matches exactly the same characters.
+_PREDICATE_PATTERNS = {
+    str.isalnum: r'[^\W_]',
+    str.isspace: r'\s',
+}
+
+_DEFAULT_FLAGS = re.compile('').flags
+
+# Atomic groups and possessive quantifiers, which give regular expressions PEG semantics, arrived in Python 3.11.
+_FUSION_SUPPORTED = sys.version_info >= (3, 11)
+
+
+def _char_pattern(char_set):
+    if char_set is None:
+        return '(?s:.)'
+    elif not char_set:
+        return '(?!)'
+    elif len(char_set) == 1:
+        return re.escape(next(iter(char_set)))
+    else:
+        return '[{}]'.format(''.join(re.escape(c) for c in sorted(char_set)))
+
+
+def _pattern(node):
+    """Regular expression equivalent to a lexeme's parser.
+
+    Returns:
+        Pattern consuming exactly what node consumes when parsed without a skipper, or None if node is not regular.
+    """
+    node_type = type(node)
+    if node_type is parser.Char:
+        return None if isinstance(node.chars, whiskey.Action) else _char_pattern(node.chars)
+    elif node_type is parser.String:
+        return None if isinstance(node.string, whiskey.Action) else re.escape(node.string)
+    elif node_type is chars.PredicateChar:
+        try:
+            return _PREDICATE_PATTERNS.get(node.predicate)
+        except TypeError:
+            return None
+    elif node_type in (Regex, RegularLexeme):
+        return '(?>{})'.format(node.pattern) if node.regex.flags == _DEFAULT_FLAGS else None
+    elif node_type is parser.Seq:
+        patterns = [_pattern(p) for p in node.parsers]
+        return None if None in patterns else ''.join(patterns)
+    elif node_type is parser.Alt:
+        patterns = [_pattern(p) for p in node.parsers]
+        return None if None in patterns else '(?>{})'.format('|'.join(patterns))
+    elif node_type is parser.Repeat.__parser_type__:
+        pattern = _pattern(node.parser)
+        if pattern is None:
+            return None
+        if node.maximum is None:
+            quantifier = {0: '*', 1: '+'}.get(node.minimum, '{{{},}}'.format(node.minimum))
+        elif node.is_optional:
+            quantifier = '?'
+        else:
+            quantifier = '{{{},{}}}'.format(node.minimum, node.maximum)
+        return '(?:{}){}+'.format(pattern, quantifier)
+    elif node_type is parser.FuncDirectiveParser and node.func in (parser.as_string.func,
+                                                                   parser.object_lexeme.func):
+        return _pattern(node.parser)
+    else:
+        return None
+
+
+def fuse(lexeme_parser):
+    """Fuse a lexeme into a single regular expression.
+
+    Args:
+        lexeme_parser: Parser built by lexeme[], as_string[object_lexeme[...]].
+
+    Returns:
+        RegularLexeme equivalent to lexeme_parser, or None if it contains parsers that are not regular, such as
+        semantic actions, rules, symbols or predicate characters without an exact character class.
+    """
+    if not _FUSION_SUPPORTED:
+        return None
+    pattern = _pattern(lexeme_parser)
+    if pattern is None:
+        return None
+    return RegularLexeme(lexeme_parser, pattern)
+
+
+def skip_regex(skipper):
+    """Regular expression skipping everything matched by repeatedly parsing skipper.
+
+    Returns:
+        Compiled regular expression, or None if skipper is not regular.
+    """
+    if not _FUSION_SUPPORTED:
+        return None
+    pattern = _pattern(skipper)
+    if pattern is None:
+        return None
+    return re.compile('(?:{})*+'.format(pattern))
@@ -0,0 +1,116 @@
+# Copyright 2015 Rafe Kaplan
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+import re
+import sys
+import unittest
+
+from booze.gin import chars
+from booze.gin import parser
+from booze.gin import regex
+
+
+class RegexTest(unittest.TestCase):
+
+    def test_parse(self):
+        s = parser.ParserState('abc123')
+        self.assertEqual((True, 'abc'), regex.Regex('[a-z]+').parse(s))
+        self.assertEqual(3, s.tell())
+        self.assertEqual((False, None), regex.Regex('[a-z]+').parse(s))
+        self.assertEqual(3, s.tell())
+
+    def test_stream(self):
+        s = io.StringIO('abc123')
+        self.assertEqual((True, 'abc1'), regex.Regex('[a-z]+1').parse(s))
+        self.assertEqual(4, s.tell())
+
+    def test_flags(self):
+        p = regex.Regex('abc', re.IGNORECASE)
+        self.assertEqual((True, 'ABC'), p.parse('ABC'))
+        self.assertEqual('abc', p.pattern)
+
+    def test_skipper(self):
+        self.assertEqual((True, 'abc'), regex.Regex('[a-z]+').parse('  abc', ' '))
+
+    def test_attr_type(self):
+        self.assertIs(parser.AttrType.STRING, regex.Regex('a').attr_type)
+
+
+@unittest.skipIf(sys.version_info < (3, 11), 'Fusion requires atomic groups')
+class FuseTest(unittest.TestCase):
+
+    def assertSameParse(self, fused, unfused, text):
+        s = io.StringIO(text)
+        expected = (unfused.parse(s, ' '), s.tell())
+        state = parser.ParserState(text, ' ')
+        self.assertEqual(expected, (fused.parse(state), state.tell()), text)
+        s = io.StringIO(text)
+        self.assertEqual(expected, (fused.parse(s, ' '), s.tell()), text)
+
+    def assertFused(self, p, *texts):
+        fused = parser.lexeme[p]
+        self.assertIsInstance(fused, regex.RegularLexeme)
+        unfused = fused.parser
+        for text in texts:
+            self.assertSameParse(fused, unfused, text)
+
+    def test_char(self):
+        self.assertFused(+parser.Char('0123456789'), '123', ' 123 ', 'a', '')
+        self.assertFused(+parser.Char('-]^\\'), '-]^\\x', 'x')
+        self.assertFused(parser.Char() << parser.Char(), 'a\nb', 'a')
+
+    def test_string(self):
+        self.assertFused(parser.String('a.b') << parser.String('*'), 'a.b*', 'axb*')
+
+    def test_predicate_char(self):
+        self.assertFused(+chars.alnum, 'ab1_', 'é²x', '_')
+        self.assertFused(chars.alnum << +chars.space, 'a \t\n', 'a')
+        self.assertIsNot(regex.RegularLexeme, type(parser.lexeme[+chars.alpha]))
+
+    def test_alt_is_ordered(self):
+        self.assertFused(parser.String('a') | parser.String('ab'), 'ab', 'b')
+        self.assertFused((parser.String('a') | parser.String('ab')) << parser.Char('b'), 'ab', 'abb')
+
+    def test_repeat_is_greedy(self):
+        self.assertFused(+parser.Char('a') << parser.Char('a'), 'aaa')
+        self.assertFused(-parser.Char('a') << parser.Char('a'), 'a', 'aa')
+        self.assertFused(parser.Repeat(2, 3)[parser.Char('a')], 'a', 'aa', 'aaaa')
+        self.assertFused(parser.Repeat(2)[parser.Char('a')], 'a', 'aa', 'aaaa')
+
+    def test_nested(self):
+        inner = parser.lexeme[+parser.Char('ab')]
+        self.assertIsInstance(inner, regex.RegularLexeme)
+        self.assertFused(inner << parser.Char('c') << regex.Regex('d|de'), 'abcde', 'abc')
+
+    def test_not_regular(self):
+        for p in (+parser.Char('a')[lambda c: c],
+                  parser.omit[parser.Char('a')],
+                  parser.Symbols({'a': 1}),
+                  regex.Regex('a', re.IGNORECASE)):
+            self.assertNotIsInstance(parser.lexeme[p], regex.RegularLexeme)
+
+    def test_skip_regex(self):
+        skipper = parser.Char(' \n') | (parser.String('#') << -+parser.Char('abc '))
+        self.assertEqual(6, skipper.skip_regex.match(' #ab \nx').end())
+        self.assertIsNone(parser.Char(' ')[lambda c: c].skip_regex)
+        self.assertEqual((True, ('x', 'y')), (parser.Char('x') << parser.Char('y')).parse('x #a y', skipper))
+
+    def test_compiled(self):
+        p = parser.lexeme[+parser.Char('ab')] << parser.lexeme[+chars.alnum]
+        self.assertEqual((True, ('ab', 'c1')), p.compile().parse(' ab c1', ' '))
+
+
+if __name__ == '__main__':
+    unittest.main()
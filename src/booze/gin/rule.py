@@ -11,13 +11,16 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+from . import memo
 from . import parser
 
 
 class Rule(parser.Parser):
 
-    def __init__(self, expected_attr_type=None):
+    def __init__(self, expected_attr_type=None, memoize=False, name=None):
         self.__expected_attr_type = expected_attr_type
+        self.__memoize = memoize
+        self.__name = name
 
     @property
     def attr_type(self):
@@ -31,6 +34,15 @@ class Rule(parser.Parser):
             else:
                 return inner_parser.attr_type
 
+    @property
+    def memoize(self):
+        return self.__memoize
+
+    @property
+    def name(self):
+        """Name of the rule used by diagnostics, or None."""
+        return self.__name
+
     @property
     def parser(self):
         return self.__parser
@@ -40,10 +52,44 @@ class Rule(parser.Parser):
         if self.__expected_attr_type and self.__expected_attr_type != value.attr_type:
             raise ValueError('Unexpected attribute type')
         self.__parser = parser.as_parser(value)
+        parser._grammar_changed()
+
+    @property
+    def children(self):
+        try:
+            return (self.__parser,)
+        except AttributeError:
+            return ()
 
     def _parse(self, state, *args, **kwargs):
-        with state.open_scope(*args, **kwargs):
-            self.__parser._parse(state)
+        if self.__memoize:
+            self.__parse_memoized(state, args, kwargs)
+        else:
+            with state.open_rule(self, args, kwargs):
+                self.__parser._parse(state)
+
+    def __parse_memoized(self, state, args, kwargs):
+        key = (self, state.tell(), args, tuple(sorted(kwargs.items())), state.skipper)
+        try:
+            entry = state.memo.get(key)
+        except TypeError:
+            # Unhashable rule arguments can not be memoized.
+            with state.open_rule(self, args, kwargs):
+                self.__parser._parse(state)
+            return
+
+        if entry is None:
+            with state.open_rule(self, args, kwargs):
+                self.__parser._parse(state)
+            successful = state.successful
+            entry = memo.MemoEntry(successful, state.committed, state.value if successful else None, state.tell())
+            state.memo.put(key, entry)
+        else:
+            state.seek(entry.end)
+            if entry.committed:
+                state.commit(entry.value)
+            elif entry.successful:
+                state.succeed(entry.value)
 
     def __imod__(self, other):
         self.parser = other
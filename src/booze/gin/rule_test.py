@@ -32,6 +32,10 @@ class RuleTestCase(unittest.TestCase):
         r %= 'hello'
         self.assertEqual((True, parser.UNUSED), r.parse('hello'))
 
+    def test_name(self):
+        self.assertIsNone(rule.Rule().name)
+        self.assertEqual('greeting', rule.Rule(name='greeting').name)
+
     def test_set_parser(self):
         p = parser.Parser()
         r = rule.Rule()
@@ -69,6 +73,59 @@ class RuleTestCase(unittest.TestCase):
         with self.assertRaises(ValueError):
             r %= p
 
+    def test_memoize(self):
+        self.assertFalse(rule.Rule().memoize)
+        self.assertTrue(rule.Rule(memoize=True).memoize)
+
+    def test_memoized_parse(self):
+        calls = []
+        r = rule.Rule(memoize=True)
+        r %= parser.Char('a')[lambda c: calls.append(c) or c.upper()]
+        p = (r << 'b') | (r << 'c')
+        s = parser.ParserState('ac')
+        self.assertEqual((True, 'A'), p.parse(s))
+        self.assertEqual(['a'], calls)
+        self.assertEqual(2, s.tell())
+        self.assertEqual(1, len(s.memo))
+
+    def test_memoized_failure(self):
+        calls = []
+        r = rule.Rule(memoize=True)
+        r %= booze.gin.PredicateChar(lambda c: calls.append(c) or c == 'a')
+        p = (r << 'b') | (r << 'c') | parser.String('\u00e9')
+        self.assertEqual((True, '\u00e9'), p.parse('\u00e9'))
+        self.assertEqual(['\u00e9'], calls[0x80:])
+
+    def test_memoized_uncommitted(self):
+        r = rule.Rule(memoize=True)
+        r %= parser.predicate[parser.Char('a')]
+        p = (r << 'b') | (r << 'a')
+        s = parser.ParserState('a')
+        self.assertEqual((True, parser.UNUSED), p.parse(s))
+        self.assertEqual(1, s.tell())
+
+    def test_memoized_rule_call(self):
+        r = rule.Rule(memoize=True)
+        r %= parser.String(whiskey.p[0])
+        p = (r('a') << 'x') | r('ab')
+        s = parser.ParserState('ab')
+        self.assertEqual((True, 'ab'), p.parse(s))
+        self.assertEqual(2, len(s.memo))
+
+    def test_memoized_unhashable_args(self):
+        r = rule.Rule(memoize=True)
+        r %= parser.Char(whiskey.p[0])
+        s = parser.ParserState('b')
+        self.assertEqual((True, 'b'), r(['a', 'b']).parse(s))
+        self.assertEqual(0, len(s.memo))
+
+    def test_memo_size(self):
+        r = rule.Rule(memoize=True)
+        r %= parser.Char('a')
+        s = parser.ParserState('aaaa', memo_size=2)
+        self.assertEqual((True, tuple('aaaa')), (+r).parse(s))
+        self.assertEqual(2, len(s.memo))
+
     def test_call(self):
         rule_call = rule.Rule()(1, 2, 3, a='a', b='b', c='c')
         self.assertIsInstance(rule_call, rule.RuleCall)
@@ -0,0 +1,586 @@
+# Copyright 2015 Rafe Kaplan
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import sys
+
+from . import aux
+from . import chars
+from . import compiler
+from . import memo
+from . import parser
+from . import regex
+from . import rule
+from .. import whiskey
+
+# Operation codes.  Instructions are (op, a, b) tuples, the meaning of a and b depending on op.  Unless noted,
+# instructions act on the current transaction, which is the innermost one opened by BEGIN.
+
+# Open a transaction at the current position.
+BEGIN = 0
+# Close the current transaction, rewinding unless committed, and leave its outcome in the result registers.
+END = 1
+# Advance past everything matched by the skipper.
+SKIP = 2
+# Parse a in a transaction of its own: skip, then match Char a.chars, String a or compiled regular expression a.
+PARSE_CHAR = 3
+PARSE_STRING = 4
+PARSE_REGEX = 5
+# Jump to b if the last result failed or succeeded.
+JUMP_IF_FAILED = 6
+JUMP_IF_OK = 7
+JUMP = 8
+# Push a new value list, append the last result value to it, or drop it.
+LIST = 9
+APPEND = 10
+DROP = 11
+# Commit the values of the list a Seq collected, or the last result value.
+COMMIT_SEQ = 12
+COMMIT_RESULT = 13
+# Commit the values of the list Repeat a collected, or jump to b when the list already holds a values.
+COMMIT_REPEAT = 14
+JUMP_IF_COUNT = 15
+# Push the branches of an Alt viable for the next character using dispatch table a.  Jump to b if branch a is not
+# among them.
+DISPATCH = 16
+JUMP_IF_NOT_VIABLE = 17
+# Primitive matches.
+CHAR = 18
+CHAR_ACTION = 19
+STRING = 20
+STRING_ACTION = 21
+PREDICATE_CHAR = 22
+REGEX = 23
+SYMBOLS = 24
+EOI = 25
+EPS = 26
+CUT = 27
+ATTR = 28
+# Apply SemanticAction a, or the post processing of a directive, to the value of a successful transaction.
+ACTION = 29
+OMIT = 30
+AS_STRING = 31
+PREDICATE = 32
+NOT_PREDICATE = 33
+# Disable the skipper, or restore it.
+NO_SKIPPER = 34
+RESTORE_SKIPPER = 35
+# Evaluate the arguments of RuleCall a for the next rule entered.
+RULE_ARGS = 36
+# Enter rule a, or jump to b with the result of an earlier match found in the memo table.
+ENTER_RULE = 37
+EXIT_RULE = 38
+# Call subroutine at a, and return from it.
+CALL = 39
+RETURN = 40
+# Run the _parse() method of parser a with the interpreter.
+FALLBACK = 41
+HALT = 42
+
+_NAMES = {value: name for name, value in globals().items() if isinstance(value, int) and name.isupper()}
+
+
+class _Label:
+
+    def __init__(self):
+        self.pc = None
+
+
+class _Assembler:
+    """Lowers a parser graph to instructions.
+
+    The _parse() method of every parser is lowered in place where it is used, except for rules, which become
+    subroutines so that recursive grammars lower to finite programs.  Parsers the assembler does not recognize are
+    run by the interpreter.
+    """
+
+    __DIRECTIVES = {
+        parser.omit.func: OMIT,
+        parser.as_string.func: AS_STRING,
+        parser.predicate.func: PREDICATE,
+        parser.not_predicate.func: NOT_PREDICATE,
+    }
+
+    def __init__(self, root):
+        self.__code = []
+        self.__subroutines = {}
+        self.__pending = []
+        self.__parse(root)
+        self.__emit(HALT)
+        while self.__pending:
+            node, label = self.__pending.pop()
+            self.__place(label)
+            self.__lower(node.parser)
+            self.__emit(RETURN)
+        self.code = tuple((op, a.pc if isinstance(a, _Label) else a, b.pc if isinstance(b, _Label) else b)
+                          for op, a, b in self.__code)
+
+    def __emit(self, op, a=None, b=None):
+        self.__code.append((op, a, b))
+
+    def __place(self, label):
+        label.pc = len(self.__code)
+
+    @staticmethod
+    def __attr_type(node):
+        try:
+            return node.attr_type
+        except NotImplementedError:
+            return None
+
+    def __parse(self, node):
+        """Lower Parser.parse() of node: a transaction of its own, skipping before node matches."""
+        node_type = type(node)
+        if node_type is parser.Char and not isinstance(node.chars, whiskey.Action):
+            self.__emit(PARSE_CHAR, node.chars)
+        elif node_type is parser.String and not isinstance(node.string, whiskey.Action):
+            self.__emit(PARSE_STRING, node.string)
+        elif node_type in (regex.Regex, regex.RegularLexeme):
+            self.__emit(PARSE_REGEX, node.regex.match)
+        else:
+            self.__emit(BEGIN)
+            self.__emit(SKIP)
+            self.__lower(node)
+            self.__emit(END)
+
+    def __lower(self, node):
+        """Lower node._parse()."""
+        node_type = type(node)
+        if node is aux.eps:
+            self.__emit(EPS)
+        elif node is aux.eoi:
+            self.__emit(EOI)
+        elif node is aux.cut:
+            self.__emit(CUT)
+        elif node_type is parser.Char:
+            if isinstance(node.chars, whiskey.Action):
+                self.__emit(CHAR_ACTION, node)
+            else:
+                self.__emit(CHAR, node.chars)
+        elif node_type is parser.String:
+            self.__emit(STRING_ACTION if isinstance(node.string, whiskey.Action) else STRING, node.string)
+        elif node_type is chars.PredicateChar:
+            self.__emit(PREDICATE_CHAR, node)
+        elif node_type is aux.Attr:
+            self.__emit(ATTR, node.value)
+        elif node_type in (regex.Regex, regex.RegularLexeme):
+            self.__emit(REGEX, node.regex.match)
+        elif node_type is parser.Symbols:
+            self.__emit(SYMBOLS, node)
+        elif node_type is parser.Seq and all(self.__attr_type(p) is not None for p in node.parsers):
+            self.__lower_seq(node)
+        elif node_type is parser.Alt:
+            self.__lower_alt(node)
+        elif node_type is parser.Repeat.__parser_type__ and self.__attr_type(node) is not None:
+            self.__lower_repeat(node)
+        elif node_type is parser.SemanticAction:
+            self.__lower(node.parser)
+            self.__emit(ACTION, node)
+        elif node_type is parser.Unary:
+            self.__lower(node.parser)
+        elif node_type is parser.FuncDirectiveParser and node.func in self.__DIRECTIVES:
+            self.__lower(node.parser)
+            self.__emit(self.__DIRECTIVES[node.func])
+        elif node_type is parser.FuncDirectiveParser and node.func is parser.object_lexeme.func:
+            self.__emit(NO_SKIPPER)
+            self.__lower(node.parser)
+            self.__emit(RESTORE_SKIPPER)
+        elif node_type is rule.Rule and node.children:
+            self.__lower_rule(node)
+        elif node_type is rule.RuleCall and node.parser.children:
+            self.__emit(RULE_ARGS, node)
+            self.__lower_rule(node.parser)
+        else:
+            self.__emit(FALLBACK, node)
+
+    def __lower_seq(self, node):
+        failed = _Label()
+        self.__emit(LIST)
+        for child in node.parsers:
+            self.__parse(child)
+            self.__emit(JUMP_IF_FAILED, None, failed)
+            if child.attr_type is not parser.AttrType.UNUSED:
+                self.__emit(APPEND)
+        self.__emit(COMMIT_SEQ)
+        done = _Label()
+        self.__emit(JUMP, None, done)
+        self.__place(failed)
+        self.__emit(DROP)
+        self.__place(done)
+
+    def __lower_alt(self, node):
+        table = node.dispatch_table
+        matched = _Label()
+        done = _Label()
+        if table is not None:
+            self.__emit(DISPATCH, table)
+        for child in node.parsers:
+            after = _Label()
+            if table is not None:
+                self.__emit(JUMP_IF_NOT_VIABLE, child, after)
+            self.__parse(child)
+            self.__emit(JUMP_IF_OK, None, matched)
+            self.__place(after)
+        if table is not None:
+            self.__emit(DROP)
+        self.__emit(JUMP, None, done)
+        self.__place(matched)
+        if table is not None:
+            self.__emit(DROP)
+        self.__emit(COMMIT_RESULT)
+        self.__place(done)
+
+    def __lower_repeat(self, node):
+        loop = _Label()
+        done = _Label()
+        self.__emit(LIST)
+        self.__place(loop)
+        if node.maximum is not None:
+            self.__emit(JUMP_IF_COUNT, node.maximum, done)
+        self.__emit(BEGIN)
+        self.__lower(node.parser)
+        self.__emit(END)
+        self.__emit(JUMP_IF_FAILED, None, done)
+        self.__emit(APPEND)
+        self.__emit(JUMP, None, loop)
+        self.__place(done)
+        self.__emit(COMMIT_REPEAT, node)
+
+    def __lower_rule(self, node):
+        try:
+            label = self.__subroutines[node]
+        except KeyError:
+            label = self.__subroutines[node] = _Label()
+            self.__pending.append((node, label))
+        done = _Label()
+        self.__emit(ENTER_RULE, node, done)
+        self.__emit(CALL, label)
+        self.__emit(EXIT_RULE)
+        self.__place(done)
+
+
+class Program:
+    """Parser graph lowered to instructions for a parsing machine with explicit stacks.
+
+    The interpreter and compiled parsers call one Python function per level of nesting in the input, so deeply nested
+    input raises RecursionError.  The machine instead keeps transactions, return addresses and partial values on
+    stacks of its own, so nesting is limited only by memory.  Results are the same as those of the interpreter.
+    Parsers the machine does not recognize are run by the interpreter, and inputs that are not held in memory as a
+    string are parsed by the original parser.
+
+    Args:
+        parser: Parser to lower.
+    """
+
+    def __init__(self, parser):
+        self.__parser = parser
+        self.__code = _Assembler(parser).code
+        self.__scanners = {}
+
+    @property
+    def parser(self):
+        return self.__parser
+
+    @property
+    def code(self):
+        """Tuple of (op, a, b) instructions."""
+        return self.__code
+
+    def listing(self):
+        """Human readable listing of the instructions."""
+        lines = []
+        for pc, (op, a, b) in enumerate(self.__code):
+            operands = ' '.join(repr(operand) for operand in (a, b) if operand is not None)
+            lines.append('{:5d} {:<18} {}'.format(pc, _NAMES[op], operands).rstrip())
+        return '\n'.join(lines)
+
+    def __scanner(self, skipper):
+        if skipper is None:
+            return None
+        try:
+            return self.__scanners[skipper]
+        except KeyError:
+            scanner = self.__scanners[skipper] = compiler._scanner(skipper)
+            return scanner
+
+    def parse(self, parser_input, skipper=None):
+        if skipper is not None and isinstance(parser_input, parser.ParserState):
+            raise TypeError('May not provide ParserState and new skipper')
+        if not isinstance(parser_input, parser.ParserState):
+            parser_input = parser.ParserState(parser_input, skipper)
+        getvalue = getattr(parser_input.input, 'getvalue', None)
+        text = getvalue() if getvalue else None
+        if not isinstance(text, str):
+            return self.__parser.parse(parser_input)
+        return self.__run(parser_input, text)
+
+    def __run(self, state, text):
+        code = self.__code
+        n = len(text)
+        UNUSED = parser.UNUSED
+        skipper = state.skipper
+        scan = self.__scanner(skipper)
+        skippers = []
+        pos = state.tell()
+        # Current transaction [start, committed, successful, value, cuts], and those enclosing it.
+        tx = None
+        txs = []
+        # Outcome of the last closed transaction.
+        ok = False
+        value = None
+        lists = []
+        calls = []
+        # Entered rules as (scope, memo key, start), and arguments for the next one.
+        frames = []
+        rule_args = ((), {})
+        pc = 0
+        try:
+            while True:
+                op, a, b = code[pc]
+                pc += 1
+                if op is BEGIN:
+                    txs.append(tx)
+                    tx = [pos, False, False, UNUSED, state.cuts]
+                elif op is END:
+                    if not tx[1]:
+                        if state.cuts != tx[4]:
+                            raise parser.ExpectationFailure(pos)
+                        pos = tx[0]
+                    ok = tx[2]
+                    value = tx[3]
+                    tx = txs.pop()
+                elif op is PARSE_CHAR:
+                    q = pos if scan is None else scan(state, text, pos)
+                    if q < n and (a is None or text[q] in a):
+                        value = text[q]
+                        pos = q + 1
+                        ok = True
+                    else:
+                        ok = False
+                elif op is JUMP_IF_FAILED:
+                    if not ok:
+                        pc = b
+                elif op is SKIP:
+                    if scan is not None:
+                        pos = scan(state, text, pos)
+                elif op is APPEND:
+                    lists[-1].append(value)
+                elif op is PARSE_STRING:
+                    q = pos if scan is None else scan(state, text, pos)
+                    if text.startswith(a, q):
+                        value = a
+                        pos = q + len(a)
+                        ok = True
+                    else:
+                        ok = False
+                elif op is JUMP_IF_OK:
+                    if ok:
+                        pc = b
+                elif op is JUMP:
+                    pc = b
+                elif op is LIST:
+                    lists.append([])
+                elif op is COMMIT_SEQ:
+                    values = lists.pop()
+                    if not values:
+                        tx[3] = UNUSED
+                    elif len(values) == 1:
+                        tx[3] = values[0]
+                    else:
+                        tx[3] = tuple(values)
+                    tx[1] = tx[2] = True
+                elif op is COMMIT_RESULT:
+                    tx[1] = tx[2] = True
+                    tx[3] = value
+                elif op is CALL:
+                    calls.append(pc)
+                    pc = a
+                elif op is RETURN:
+                    pc = calls.pop()
+                elif op is DISPATCH:
+                    lists.append(a.get(text[pos] if pos < n else '', skipper))
+                elif op is JUMP_IF_NOT_VIABLE:
+                    if a not in lists[-1]:
+                        pc = b
+                elif op is DROP:
+                    lists.pop()
+                elif op is PARSE_REGEX:
+                    q = pos if scan is None else scan(state, text, pos)
+                    m = a(text, q)
+                    if m is not None:
+                        value = m.group()
+                        pos = m.end()
+                        ok = True
+                    else:
+                        ok = False
+                elif op is ACTION:
+                    if tx[2]:
+                        tx[3] = a._apply(state, tx[3])
+                elif op is ENTER_RULE:
+                    args, kwargs = rule_args
+                    rule_args = ((), {})
+                    key = None
+                    if a.memoize:
+                        key = (a, pos, args, tuple(sorted(kwargs.items())), skipper)
+                        try:
+                            entry = state.memo.get(key)
+                        except TypeError:
+                            # Unhashable rule arguments can not be memoized.
+                            key = None
+                        else:
+                            if entry is not None:
+                                pos = entry.end
+                                if entry.committed:
+                                    tx[1] = tx[2] = True
+                                    tx[3] = entry.value
+                                elif entry.successful:
+                                    tx[1] = False
+                                    tx[2] = True
+                                    tx[3] = entry.value
+                                pc = b
+                                continue
+                    scope = state.open_scope(*args, **kwargs)
+                    scope.__enter__()
+                    frames.append((scope, key))
+                elif op is EXIT_RULE:
+                    scope, key = frames.pop()
+                    scope.__exit__(None, None, None)
+                    if key is not None:
+                        state.memo.put(key, memo.MemoEntry(tx[2], tx[1], tx[3] if tx[2] else None, pos))
+                elif op is RULE_ARGS:
+                    rule_args = ([state.invoke(arg) for arg in a.args],
+                                 {k: state.invoke(v) for k, v in a.kwargs.items()})
+                elif op is JUMP_IF_COUNT:
+                    if len(lists[-1]) >= a:
+                        pc = b
+                elif op is COMMIT_REPEAT:
+                    values = lists.pop()
+                    if a.is_optional:
+                        tx[3] = values[0] if values else UNUSED
+                    elif len(values) >= a.minimum:
+                        tx[3] = UNUSED if a.attr_type == parser.AttrType.UNUSED else tuple(values)
+                    else:
+                        continue
+                    tx[1] = tx[2] = True
+                elif op is CHAR:
+                    if pos < n:
+                        c = text[pos]
+                        pos += 1
+                        if a is None or c in a:
+                            tx[1] = tx[2] = True
+                            tx[3] = c
+                elif op is STRING:
+                    if text.startswith(a, pos):
+                        pos += len(a)
+                        tx[1] = tx[2] = True
+                        tx[3] = a
+                elif op is SYMBOLS:
+                    if scan is not None:
+                        pos = scan(state, text, pos)
+                    match = a._longest(text, pos)
+                    if match is not None:
+                        pos = match[0]
+                        tx[1] = tx[2] = True
+                        tx[3] = match[1]
+                elif op is REGEX:
+                    m = a(text, pos)
+                    if m is not None:
+                        pos = m.end()
+                        tx[1] = tx[2] = True
+                        tx[3] = m.group()
+                elif op is PREDICATE_CHAR:
+                    if pos < n:
+                        c = text[pos]
+                        pos += 1
+                        if c in a.ascii_chars or (c > '\x7f' and a.predicate(c)):
+                            tx[1] = tx[2] = True
+                            tx[3] = c
+                elif op is EPS:
+                    tx[1] = False
+                    tx[2] = True
+                    tx[3] = UNUSED
+                elif op is EOI:
+                    if pos >= n:
+                        tx[1] = tx[2] = True
+                        tx[3] = UNUSED
+                elif op is ATTR:
+                    tx[1] = tx[2] = True
+                    tx[3] = a
+                elif op is OMIT:
+                    if tx[2]:
+                        tx[3] = UNUSED
+                elif op is AS_STRING:
+                    if tx[2]:
+                        tx[3] = parser._as_string(tx[3])
+                elif op is PREDICATE:
+                    if tx[2]:
+                        tx[1] = False
+                        tx[3] = UNUSED
+                elif op is NOT_PREDICATE:
+                    tx[1] = False
+                    tx[2] = not tx[2]
+                    tx[3] = UNUSED
+                elif op is NO_SKIPPER:
+                    skippers.append(skipper)
+                    skipper = None
+                    scan = None
+                elif op is RESTORE_SKIPPER:
+                    skipper = skippers.pop()
+                    scan = self.__scanner(skipper)
+                elif op is CHAR_ACTION:
+                    if pos < n:
+                        c = text[pos]
+                        pos += 1
+                        local_chars = a._table(state.invoke(a.chars))
+                        if local_chars is None or c in local_chars:
+                            tx[1] = tx[2] = True
+                            tx[3] = c
+                elif op is STRING_ACTION:
+                    string = state.invoke(a)
+                    if text.startswith(string, pos):
+                        pos += len(string)
+                        tx[1] = tx[2] = True
+                        tx[3] = string
+                elif op is CUT:
+                    state.seek(pos)
+                    state.cut()
+                    tx[1] = tx[2] = True
+                    tx[3] = UNUSED
+                elif op is FALLBACK:
+                    state.seek(pos)
+                    state.skipper = skipper
+                    state.begin()
+                    try:
+                        a._parse(state)
+                        successful = state.successful
+                        fallback_value = state.value
+                        committed = state.committed
+                    except BaseException:
+                        state.abort()
+                        raise
+                    state.end()
+                    pos = state.tell()
+                    if successful:
+                        tx[1] = committed
+                        tx[2] = True
+                        tx[3] = fallback_value
+                elif op is HALT:
+                    break
+        except BaseException:
+            for scope, _ in reversed(frames):
+                scope.__exit__(*sys.exc_info())
+            raise
+        finally:
+            state.skipper = skippers[0] if skippers else skipper
+            state.seek(pos)
+        return (True, value) if ok else (False, None)
@@ -0,0 +1,205 @@
+# Copyright 2015 Rafe Kaplan
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import contextlib
+import io
+import sys
+import unittest
+
+from booze import whiskey
+from booze.bench import grammars
+from booze.gin import aux
+from booze.gin import chars
+from booze.gin import local_vars
+from booze.gin import parser
+from booze.gin import rule
+from booze.gin import vm
+
+
+def nested():
+    """Parenthesized list of x, nested any number of levels deep."""
+    item = rule.Rule(parser.AttrType.OBJECT)
+    item %= parser.String('x') | (parser.lit('(') << -+item << parser.lit(')'))[lambda *v: v]
+    return item << aux.eoi
+
+
+class ProgramTest(unittest.TestCase):
+
+    def assertSameParse(self, p, text, skipper=None):
+        expected_stream = io.StringIO(text)
+        expected = p.parse(expected_stream, skipper)
+        actual_stream = io.StringIO(text)
+        actual = p.lower().parse(actual_stream, skipper)
+        self.assertEqual(expected, actual, text)
+        self.assertEqual(expected_stream.tell(), actual_stream.tell(), text)
+
+    def test_lower(self):
+        p = parser.Char('a') << parser.Char('b')
+        program = p.lower()
+        self.assertIsInstance(program, vm.Program)
+        self.assertIs(p, program.parser)
+        self.assertEqual(vm.HALT, program.code[-1][0])
+        self.assertIn('PARSE_CHAR', program.listing())
+
+    def test_primitives(self):
+        for p in (parser.Char('ab'), parser.Char(), parser.String('ab'), chars.alpha, aux.eps, aux.eoi,
+                  aux.Attr(10), parser.lit('ab'), parser.Symbols({'a': 1, 'ab': 2}), parser.Symbols({'': 1, 'b': 2}),
+                  parser.lexeme[+chars.alpha]):
+            for text in ('', 'a', 'ab', 'abc', 'ba', '1'):
+                self.assertSameParse(p, text)
+                self.assertSameParse(parser.Unary(p), text, ' ')
+
+    def test_actions(self):
+        p = parser.Char(whiskey.func(lambda: 'ab')()) << parser.String(whiskey.func(lambda: 'cd')())
+        for text in ('acd', 'bcd', 'ccd', 'ac'):
+            self.assertSameParse(p, text)
+
+    def test_seq_alt_repeat(self):
+        p = ((parser.Char('a') << parser.lit('-') << parser.Char('b'))
+             | +parser.Char('c')
+             | -parser.String('d'))
+        for text in ('a-b', 'a-c', 'ccc', 'dd', 'x', ''):
+            self.assertSameParse(p, text)
+            self.assertSameParse(p, text, ' ')
+            self.assertSameParse(p, ' ' + text.replace('-', ' - '), ' ')
+
+    def test_dispatch(self):
+        r = rule.Rule(parser.AttrType.OBJECT)
+        r %= (parser.Char('a') << r) | (parser.lit('(') << r << parser.lit(')')) | parser.String('x') | aux.eps
+        self.assertIn('DISPATCH', r.lower().listing())
+        for text in ('ax', 'a(ax)', '(', 'b', '', ' a ( x ) '):
+            self.assertSameParse(r, text)
+            self.assertSameParse(r, text, ' ')
+
+    def test_bounded_repeat(self):
+        p = parser.Repeat(2, 3)[parser.Char('a')]
+        for text in ('a', 'aa', 'aaa', 'aaaa'):
+            self.assertSameParse(p, text)
+
+    def test_predicates(self):
+        p = parser.Char('a') << parser.predicate[parser.Char('b')]
+        q = parser.Char('a') << parser.not_[parser.Char('b')]
+        for text in ('a', 'ab', 'ac', 'a b'):
+            self.assertSameParse(p, text)
+            self.assertSameParse(p, text, ' ')
+            self.assertSameParse(q, text)
+            self.assertSameParse(q, text, ' ')
+
+    def test_calculator(self):
+        calc = grammars.calculator()
+        for text in ('1\n', '1 + 1\n', ' 2 * 5 + 20 \n', '2 * (5 + 20)\n1 - 2\n', '2 * 3 * 4 + 10 * 20 * 30\n', '2 +\n',
+                     'x\n'):
+            self.assertSameParse(calc, text, ' ')
+
+    def test_rule_call(self):
+        start_tag = rule.Rule(parser.AttrType.STRING)
+        end_tag = rule.Rule(parser.AttrType.UNUSED)
+        xml = rule.Rule()
+        start_tag %= '<' << parser.lexeme[+chars.alpha] << '>'
+        end_tag %= parser.omit['</' << parser.String(whiskey.p[0]) << '>']
+        xml %= (start_tag[local_vars.l.name[whiskey.p[0]]] << -+xml << end_tag(local_vars.l.name))[lambda *v: v]
+        for text in ('<a></a>', '<a><b></b></a>', ' <a> <b> </b> </a>', '<a></b>'):
+            self.assertSameParse(xml, text, ' ')
+
+    def test_memoized_state(self):
+        r = rule.Rule(memoize=True)
+        r %= parser.Char('a')
+        s = parser.ParserState('a')
+        self.assertEqual((True, 'a'), r.lower().parse(s))
+        self.assertEqual(1, len(s.memo))
+        s.seek(0)
+        self.assertEqual((True, 'a'), r.parse(s))
+
+    def test_cut(self):
+        p = (parser.Char('a') << aux.cut << parser.Char('b')) | parser.String('ac')
+        program = p.lower()
+        self.assertEqual((True, ('a', 'b')), program.parse('ab'))
+        with self.assertRaises(parser.ExpectationFailure) as context:
+            program.parse('ac')
+        self.assertEqual(1, context.exception.pos)
+
+    def test_cut_repeat(self):
+        p = +(parser.Char('a') << aux.cut << parser.Char('b'))
+        self.assertSameParse(p, 'ababx')
+        with self.assertRaises(parser.ExpectationFailure):
+            p.lower().parse('abax')
+
+    def test_fallback(self):
+        calls = []
+
+        @parser.func_directive()
+        @contextlib.contextmanager
+        def record(state):
+            calls.append(state.tell())
+            yield
+
+        p = parser.Char('a') << record[parser.Char('b')]
+        self.assertIn('FALLBACK', p.lower().listing())
+        self.assertSameParse(p, 'ab')
+        self.assertSameParse(p, 'a b', ' ')
+        self.assertEqual([1, 1, 2, 2], calls)
+
+    def test_skipper_parser(self):
+        comment = parser.lit('#') << -+parser.Char('abc ')
+        p = +parser.Char('x')
+        for text in ('xx', 'x #ab x', '#a x#bx'):
+            self.assertSameParse(p, text, comment | ' ')
+
+    def test_state_position(self):
+        s = parser.ParserState('aab')
+        program = (+parser.Char('a')).lower()
+        self.assertEqual((True, ('a', 'a')), program.parse(s))
+        self.assertEqual(2, s.tell())
+        self.assertEqual((False, None), program.parse(s))
+        self.assertEqual(2, s.tell())
+
+    def test_exception_closes_scopes(self):
+        def fail(value):
+            raise ValueError(value)
+
+        r = rule.Rule()
+        r %= parser.Char('a')[fail]
+        s = parser.ParserState('a')
+        with self.assertRaises(ValueError):
+            r.lower().parse(s)
+        self.assertIsNone(s.scope)
+
+    def test_stream_input(self):
+        class Pipe(io.StringIO):
+            def seekable(self):
+                return False
+
+        self.assertEqual((True, ('a', 'b')), (parser.Char('a') << parser.Char('b')).lower().parse(Pipe('ab')))
+
+    def test_deep_nesting(self):
+        depth = sys.getrecursionlimit() * 2
+        text = '(' * depth + 'x' + ')' * depth
+        with self.assertRaises(RecursionError):
+            nested().parse(text)
+
+        success, value = nested().lower().parse(text)
+        self.assertTrue(success)
+        for _ in range(depth):
+            value, = value
+        self.assertEqual('x', value)
+        self.assertEqual((False, None), nested().lower().parse(text[:-1]))
+
+    def test_nesting(self):
+        for text in ('x', '()', '(x(x)x)', '((x)', ' ( x ( ) ) '):
+            self.assertSameParse(nested(), text)
+            self.assertSameParse(nested(), text, ' ')
+
+
+if __name__ == '__main__':
+    unittest.main()
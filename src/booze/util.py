@@ -18,7 +18,8 @@ import functools
 def singleton(cls):
     """Define a singleton class.
 
-    A singleton class has only one instance.
+    A singleton class has only one instance.  The instance pickles and copies as a reference to the module level name of
+    the same name as the class.
 
     Example:
 
@@ -40,6 +41,8 @@ def singleton(cls):
     Returns:
         Singleton class instance.
     """
+    if '__reduce__' not in cls.__dict__:
+        cls.__reduce__ = lambda self: cls.__name__
     return cls()
 
 
@@ -12,6 +12,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import collections
+import importlib
 import operator
 
 from .. import util
@@ -46,6 +48,73 @@ class Action:
         """
         raise NotImplementedError
 
+    def compile(self):
+        """Compile action into a single Python function.
+
+        The function is generated once per action from its simplified form.  It evaluates the whole action tree
+        without dispatching through invoke() on each node, and evaluates structurally identical calls to operator
+        functions only once.
+
+        Returns:
+            Function accepting the same arguments as invoke() and returning the same value.
+        """
+        return self._compiled
+
+    def invoke_many(self, columns, kwcolumns=None):
+        """Invoke action once per row of argument columns.
+
+        Operator actions over NumPy array columns are evaluated a whole column at a time when NumPy is installed.
+
+        Example:
+
+            from booze.whiskey import *
+
+            assert ((p[0] * 100) / p[1]).invoke_many([[50, 10], [100, 40]]) == [50, 25]
+
+        Args:
+            columns: Sequence of columns, column i holding positional argument i of every row.
+            kwcolumns: Mapping of keyword argument names to columns.
+
+        Returns:
+            List of results, or NumPy array of results when evaluated by column.
+        """
+        from . import batch
+        return batch.invoke_many(self, columns, kwcolumns)
+
+    def structural_key(self):
+        """Hashable key equal for structurally identical action trees.
+
+        Actions can not be compared with == or used as dictionary keys because == builds an eq_ action.  Use this key
+        instead.  See structural_key().
+        """
+        return structural_key(self)
+
+    def structural_hash(self):
+        """Hash of structural_key()."""
+        return hash(structural_key(self))
+
+    def simplify(self):
+        """Equivalent action with constant subtrees folded and chains of calls flattened.
+
+        Returns:
+            Simplified action, or a constant when the whole action is constant.
+        """
+        from . import simplify
+        return simplify.simplify(self)
+
+    def __getstate__(self):
+        # Compiled functions are generated again after unpickling.
+        return {k: v for k, v in self.__dict__.items() if not k.startswith('_cached_')}
+
+    @util.calculated_property
+    def _simplified(self):
+        return self.simplify()
+
+    @util.calculated_property
+    def _compiled(self):
+        from . import compiler
+        return compiler.compile_action(self._simplified)
+
     def __call__(self, *args, **kwargs):
         """Define a function call action."""
         return Call(self, *args, **kwargs)
@@ -423,9 +492,125 @@ class Call(Action):
             Result of invoking func with self.args and self.kwargs.
         """
         real_func = invoke(self.__func, *args, **kwargs)
-        args = [invoke(a, *args, **kwargs) for a in self.args]
-        kwargs = {k: invoke(v, *args, **kwargs) for k, v in self.kwargs.items()}
-        return real_func(*args, **kwargs)
+        real_args = [invoke(a, *args, **kwargs) for a in self.__args]
+        real_kwargs = {k: invoke(v, *args, **kwargs) for k, v in self.__kwargs.items()}
+        return real_func(*real_args, **real_kwargs)
+
+
+class Chain(Action):
+    """Action folding a binary function over operands from left to right.
+
+    Equivalent to nested calls func(func(func(a, b), c), d), evaluated without recursing per operand.  Built by
+    simplify() from long chains such as p[0] + p[1] + p[2] + p[3].
+
+    Examples:
+        from booze.whiskey import *
+        import operator
+
+        total = Chain(operator.add, (p[0], p[1], p[2]))
+
+        assert total.invoke(1, 2, 3) == 6
+    """
+
+    def __init__(self, real_func, operands):
+        """Constructor.
+
+        real_func: Binary callable.
+        operands: At least one operand, each constant or action.
+        """
+        self.__func = real_func
+        self.__operands = tuple(operands)
+
+    @property
+    def func(self):
+        """Function folded over operands."""
+        return self.__func
+
+    @property
+    def operands(self):
+        """Operands in evaluation order."""
+        return self.__operands
+
+    def invoke(self, *args, **kwargs):
+        """Invoke chain action.
+
+        Arguments:
+            args: Positional arguments used to resolve real values for any action operands.
+            kwargs: Keyword arguments used to resolve real values for any action operands.
+
+        Returns:
+            Result of folding func over the resolved operands.
+        """
+        real_func = self.__func
+        operands = iter(self.__operands)
+        result = invoke(next(operands), *args, **kwargs)
+        for operand in operands:
+            result = real_func(result, invoke(operand, *args, **kwargs))
+        return result
+
+
+class _Identity:
+    """Key component comparing equal only to the same object."""
+
+    __slots__ = ('__value',)
+
+    def __init__(self, value):
+        self.__value = value
+
+    def __eq__(self, other):
+        return isinstance(other, _Identity) and other.__value is self.__value
+
+    def __hash__(self):
+        return id(self.__value)
+
+
+def structural_key(value):
+    """Hashable key describing an action tree or constant.
+
+    Two values have equal keys when they are the same constant, or action trees of the same shape with equal
+    constants, argument indexes, names and functions.  Actions other than Arg, KwArg, Call and Chain, and unhashable
+    constants, are compared by identity.  The key is a flat tuple built without recursion, so very deep trees may be
+    keyed and hashed.
+
+    Args:
+        value: Action or constant.
+
+    Returns:
+        Hashable key.
+    """
+    key = []
+    pending = [value]
+    while pending:
+        node = pending.pop()
+        node_type = type(node)
+        if node_type is Arg:
+            key.append(Arg)
+            pending.append(node.index)
+        elif node_type is KwArg:
+            key += (KwArg, node.name)
+        elif isinstance(node, Call):
+            kwargs = node.kwargs
+            names = tuple(sorted(kwargs))
+            key += (Call, len(node.args), names)
+            pending += reversed((node.func,) + node.args + tuple(kwargs[name] for name in names))
+        elif node_type is Chain:
+            key += (Chain, len(node.operands))
+            pending += reversed((node.func,) + node.operands)
+        elif isinstance(node, Action):
+            key.append(_Identity(node))
+        else:
+            try:
+                hash(node)
+            except TypeError:
+                key.append(_Identity(node))
+            else:
+                key += (node_type, node)
+    return tuple(key)
+
+
+def structural_hash(value):
+    """Hash of structural_key(value)."""
+    return hash(structural_key(value))
 
 
 def func(real_func):
@@ -441,9 +626,95 @@ def func(real_func):
 
         def __init__(self, *args, **kwargs):
             super(Func, self).__init__(real_func, *args, **kwargs)
+
+        def __reduce__(self):
+            # Used as a decorator, the module level name of real_func refers to this class instead.
+            name = (getattr(real_func, '__module__', None), getattr(real_func, '__qualname__', None))
+            try:
+                decorated = _global(*name) is Func
+            except (ImportError, AttributeError, TypeError):
+                decorated = False
+            if decorated:
+                return _decorated_call, name + (self.args, self.kwargs)
+            return _call, (real_func, self.args, self.kwargs)
     return Func
 
 
+def _global(module_name, qualname):
+    value = importlib.import_module(module_name)
+    for name in qualname.split('.'):
+        value = getattr(value, name)
+    return value
+
+
+def _call(real_func, args, kwargs):
+    return Call(real_func, *args, **kwargs)
+
+
+def _decorated_call(module_name, qualname, args, kwargs):
+    return _global(module_name, qualname)(*args, **kwargs)
+
+
+class _Memo:
+    """Callable caching the results of a function or action for memo_()."""
+
+    def __init__(self, real_func, maxsize):
+        self.__real_func = real_func
+        self.__maxsize = maxsize
+        self.__cache = collections.OrderedDict()
+
+    def __call__(self, *args, **kwargs):
+        key = (args, tuple(sorted(kwargs.items())))
+        try:
+            value = self.__cache[key]
+        except KeyError:
+            pass
+        except TypeError:
+            return self.__invoke(*args, **kwargs)
+        else:
+            self.__cache.move_to_end(key)
+            return value
+        value = self.__cache[key] = self.__invoke(*args, **kwargs)
+        if self.__maxsize is not None and len(self.__cache) > self.__maxsize:
+            self.__cache.popitem(last=False)
+        return value
+
+    def __invoke(self, *args, **kwargs):
+        real_func = self.__real_func
+        return invoke(real_func, *args, **kwargs) if isinstance(real_func, Action) else real_func(*args, **kwargs)
+
+    def __reduce__(self):
+        # Cached results stay behind, so copies sent to worker processes start empty.
+        return _Memo, (self.__real_func, self.__maxsize)
+
+    def cache_clear(self):
+        self.__cache.clear()
+
+
+def memo_(real_func, maxsize=128):
+    """Define an action class around a pure function or action, caching its results.
+
+    Results are kept in a least-recently-used cache keyed by the resolved arguments of each invocation.  Invocations
+    with unhashable arguments are not cached.  Only wrap functions whose result depends on nothing but their
+    arguments.  The cache is cleared through the cache_clear() function of the returned class's __func__.  Actions
+    pickle without their cached results, so they may be sent to worker processes when real_func pickles.
+
+    Example:
+
+        from booze.whiskey import *
+
+        country = memo_(lookup_country, maxsize=1024)
+        action = country(p[0])
+
+    Args:
+        real_func: Real callable or action.
+        maxsize: Maximum number of cached results.  When None the cache grows without bound.
+    """
+    if maxsize is not None and maxsize < 1:
+        raise ValueError('Cache size must be positive')
+    return func(_Memo(real_func, maxsize))
+
+
 # Unary functions
 pos_ = func(operator.pos)
 neg_ = func(operator.neg)
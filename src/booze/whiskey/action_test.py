@@ -13,6 +13,7 @@
 # limitations under the License.
 
 import operator
+import pickle
 import unittest
 
 from booze.whiskey import action
@@ -28,6 +29,11 @@ class MyFuncAction(action.Action):
         return self.value
 
 
+@action.func
+def decorated_func(*args):
+    return args
+
+
 class MyValueAction(action.Action):
     def __init__(self, value):
         self.value = value
@@ -224,6 +230,10 @@ class CallTestCase(unittest.TestCase):
         call = action.Call(f, 1, a='a')
         self.assertEqual((1, 'a'), call.invoke(10, a='aa'))
 
+    def test_invoke_kwarg_actions(self):
+        call = action.Call(lambda v, w: (v, w), action.p[1], w=action.p[0])
+        self.assertEqual((20, 10), call.invoke(10, 20))
+
     def test_invoke_actions(self):
         def func(*args, **kwargs):
             return tuple(v + v for v in args) + ({k: v + v for k, v in kwargs.items()},)
@@ -235,6 +245,17 @@ class CallTestCase(unittest.TestCase):
         call = action.Call(f, p, a=a)
         self.assertEqual((6, {'a': 'aaaaaa'}), call.invoke(10, a='aa'))
 
+    def test_pickle(self):
+        f = action.func(operator.add)(action.p[0], 1)
+        unpickled = pickle.loads(pickle.dumps(f))
+        self.assertEqual(operator.add, unpickled.func)
+        self.assertEqual(3, unpickled.invoke(2))
+
+    def test_pickle_decorated(self):
+        unpickled = pickle.loads(pickle.dumps(decorated_func(action.p[0], 1)))
+        self.assertIsInstance(unpickled, decorated_func)
+        self.assertEqual((2, 1), unpickled.invoke(2))
+
 
 class FuncTestCase(unittest.TestCase):
 
@@ -262,6 +283,98 @@ class FuncTestCase(unittest.TestCase):
         self.assertEqual((6, {'a': 'aaaaaa'}), call.invoke(10, a='aa'))
 
 
+class StructuralKeyTestCase(unittest.TestCase):
+
+    def test_equal(self):
+        a = (action.p[0] * 100) / action.p[1]
+        b = (action.p[0] * 100) / action.p[1]
+        self.assertEqual(a.structural_key(), b.structural_key())
+        self.assertEqual(a.structural_hash(), b.structural_hash())
+        self.assertEqual(action.structural_key(action.add_(1, 2)),
+                         action.structural_key(action.Call(operator.add, 1, 2)))
+        self.assertEqual(action.structural_key(action.Call(dict, a=1, b=action.p.x)),
+                         action.structural_key(action.Call(dict, b=action.p.x, a=1)))
+
+    def test_not_equal(self):
+        keys = {action.structural_key(a) for a in (
+            action.p[0], action.p[1], action.p.a, action.p[0] + 1, action.p[0] + True, action.p[0] + 1.0,
+            action.p[0] - 1, action.add_(1, action.p[0]), action.Chain(operator.add, (action.p[0], 1)), action.p[0](1),
+            action.Call(action.p[1], 1))}
+        self.assertEqual(11, len(keys))
+
+    def test_identity(self):
+        class Custom(action.Action):
+            pass
+
+        c = Custom()
+        self.assertEqual(action.structural_key(c + 1), action.structural_key(c + 1))
+        self.assertNotEqual(action.structural_key(c + 1), action.structural_key(Custom() + 1))
+        items = []
+        self.assertEqual(action.structural_key(action.p[0] + items), action.structural_key(action.p[0] + items))
+        self.assertNotEqual(action.structural_key(action.p[0] + items), action.structural_key(action.p[0] + []))
+
+    def test_cache_key(self):
+        cache = {(action.p[0] * 2).structural_key(): 'double'}
+        self.assertEqual('double', cache[(action.p[0] * 2).structural_key()])
+
+    def test_deep(self):
+        a = action.p[0]
+        for i in range(100000):
+            a = a + i
+        self.assertIsInstance(a.structural_hash(), int)
+
+
+class MemoTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = []
+
+    def lookup(self, value, scale=1):
+        self.calls.append(value)
+        return value * scale
+
+    def test_cached(self):
+        lookup = action.memo_(self.lookup)
+        self.assertTrue(issubclass(lookup, action.Call))
+        a = lookup(action.p[0], scale=action.p.scale)
+        self.assertEqual([2, 4, 2, 6], [a.invoke(v, scale=s) for v, s in ((1, 2), (2, 2), (1, 2), (2, 3))])
+        self.assertEqual([1, 2, 2], self.calls)
+
+    def test_maxsize(self):
+        a = action.memo_(self.lookup, maxsize=2)(action.p[0])
+        for v in (1, 2, 1, 3, 2, 1):
+            a.invoke(v)
+        self.assertEqual([1, 2, 3, 2, 1], self.calls)
+
+    def test_unhashable(self):
+        a = action.memo_(len)(action.p[0])
+        self.assertEqual(2, a.invoke([1, 2]))
+
+    def test_action(self):
+        a = action.memo_(action.p[0] * 2)(action.p[0] + 1)
+        self.assertEqual(4, a.invoke(1))
+
+    def test_cache_clear(self):
+        lookup = action.memo_(self.lookup)
+        lookup(action.p[0]).invoke(1)
+        lookup.__func__.cache_clear()
+        lookup(action.p[0]).invoke(1)
+        self.assertEqual([1, 1], self.calls)
+
+    def test_bad_maxsize(self):
+        with self.assertRaises(ValueError):
+            action.memo_(len, maxsize=0)
+
+    def test_pickle(self):
+        a = action.memo_(operator.add, maxsize=2)(action.p[0], 1)
+        self.assertEqual(3, a.invoke(2))
+        unpickled = pickle.loads(pickle.dumps(a))
+        self.assertEqual(1, len(vars(a.func)['_Memo__cache']))
+        self.assertEqual(0, len(vars(unpickled.func)['_Memo__cache']))
+        self.assertEqual(3, unpickled.invoke(2))
+        self.assertEqual(1, len(vars(unpickled.func)['_Memo__cache']))
+
+
 class UnaryOperatorsTestCase(unittest.TestCase):
 
     def do_operator_test(self, action_impl, operator_func, value, result):
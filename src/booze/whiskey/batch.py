@@ -0,0 +1,87 @@
+# Copyright 2015 Rafe Kaplan
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from . import action
+from . import simplify
+
+
+def vectorizable(root):
+    """Whether root evaluates element-wise when its arguments are arrays.
+
+    True when every call in root is to a pure operator function, all of which NumPy arrays implement as ufuncs.
+    """
+    pending = [root]
+    while pending:
+        node = pending.pop()
+        if not isinstance(node, action.Action) or type(node) is action.KwArg:
+            continue
+        elif type(node) is action.Arg:
+            if type(node.index) is not int:
+                return False
+        elif isinstance(node, action.Call):
+            if isinstance(node.func, action.Action) or not simplify.is_pure(node.func) or node.kwargs:
+                return False
+            pending.extend(node.args)
+        elif type(node) is action.Chain:
+            if not simplify.is_pure(node.func):
+                return False
+            pending.extend(node.operands)
+        else:
+            return False
+    return True
+
+
+def invoke_many(root, columns, kwcolumns=None):
+    """Invoke an action once per row of argument columns.
+
+    When NumPy is available, every column is a NumPy array and the action is vectorizable, the action is evaluated
+    once over whole columns using NumPy's fixed-width arithmetic.  Otherwise the compiled action is called once per
+    row.
+
+    Args:
+        root: Action to invoke.
+        columns: Sequence of columns, column i holding positional argument i of every row.
+        kwcolumns: Mapping of keyword argument names to columns.
+
+    Returns:
+        NumPy array of results when vectorized, else a list of results.
+
+    Raises:
+        ValueError: No columns were given, or columns differ in length.
+    """
+    columns = list(columns)
+    kwcolumns = dict(kwcolumns or {})
+    all_columns = columns + list(kwcolumns.values())
+    if not all_columns:
+        raise ValueError('Must provide at least one column')
+    rows = len(all_columns[0])
+    if any(len(column) != rows for column in all_columns):
+        raise ValueError('Columns must all have the same length')
+
+    func = root.compile()
+    if (numpy is not None and all(isinstance(column, numpy.ndarray) for column in all_columns) and
+            vectorizable(root._simplified)):
+        result = numpy.asarray(func(*columns, **kwcolumns))
+        return numpy.full(rows, result) if result.ndim == 0 else result
+
+    if kwcolumns:
+        count = len(columns)
+        names = list(kwcolumns)
+        return [func(*row[:count], **dict(zip(names, row[count:]))) for row in zip(*all_columns)]
+    return [func(*row) for row in zip(*columns)]
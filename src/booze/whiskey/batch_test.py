@@ -0,0 +1,73 @@
+# Copyright 2015 Rafe Kaplan
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+from booze.whiskey import action
+from booze.whiskey import batch
+
+percent_of = (action.p[0] * 100) / action.p[1]
+
+
+class InvokeManyTestCase(unittest.TestCase):
+
+    def test_rows(self):
+        self.assertEqual([50, 25], percent_of.invoke_many([[50, 10], [100, 40]]))
+        self.assertEqual([], percent_of.invoke_many([[], []]))
+
+    def test_kwcolumns(self):
+        a = action.p[0] + action.p.x
+        self.assertEqual([11, 22], a.invoke_many([[1, 2]], {'x': [10, 20]}))
+        self.assertEqual(['ab'], (action.p.x + action.p.y).invoke_many([], {'x': ['a'], 'y': ['b']}))
+
+    def test_not_vectorizable(self):
+        a = action.func(str)(action.p[0])
+        self.assertFalse(batch.vectorizable(a))
+        self.assertEqual(['1', '2'], a.invoke_many([[1, 2]]))
+
+    def test_vectorizable(self):
+        self.assertTrue(batch.vectorizable(percent_of))
+        self.assertTrue(batch.vectorizable(-action.p[0] + 1 + action.p.a + 2))
+        self.assertFalse(batch.vectorizable(action.Arg(action.p[0])))
+        self.assertFalse(batch.vectorizable(action.p[0](1)))
+
+    def test_bad_columns(self):
+        with self.assertRaises(ValueError):
+            percent_of.invoke_many([])
+        with self.assertRaises(ValueError):
+            percent_of.invoke_many([[1, 2], [1]])
+
+
+@unittest.skipIf(batch.numpy is None, 'NumPy not installed')
+class VectorizedTestCase(unittest.TestCase):
+
+    def test_arrays(self):
+        numpy = batch.numpy
+        result = percent_of.invoke_many([numpy.array([50, 10]), numpy.array([100, 40])])
+        self.assertIsInstance(result, numpy.ndarray)
+        self.assertEqual([50, 25], result.tolist())
+
+    def test_constant(self):
+        numpy = batch.numpy
+        result = action.add_(1, 2).invoke_many([numpy.array([0, 0, 0])])
+        self.assertEqual([3, 3, 3], result.tolist())
+
+    def test_comparison(self):
+        numpy = batch.numpy
+        result = (action.p[0] < action.p[1]).invoke_many([numpy.array([1, 3]), numpy.array([2, 2])])
+        self.assertEqual([True, False], result.tolist())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,185 @@
+# Copyright 2015 Rafe Kaplan
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import keyword
+import operator
+
+from . import action
+from . import simplify
+
+
+_BINARY_OPERATORS = {
+    operator.lt: '<', operator.le: '<=', operator.eq: '==', operator.ne: '!=', operator.ge: '>=', operator.gt: '>',
+    operator.add: '+', operator.sub: '-', operator.mul: '*', operator.floordiv: '//', operator.mod: '%',
+    operator.pow: '**', operator.truediv: '/',
+    operator.and_: '&', operator.or_: '|', operator.lshift: '<<', operator.rshift: '>>', operator.xor: '^',
+}
+
+_UNARY_OPERATORS = {operator.pos: '+', operator.neg: '-', operator.invert: '~'}
+
+# Constants of these types are shared by value rather than by identity, so equal literals are recognized as the same
+# operand.
+_VALUE_TYPES = (int, str, bool, type(None))
+
+
+def _out_of_range(args, indexes):
+    for index in indexes:
+        try:
+            args[index]
+        except IndexError:
+            raise TypeError('Positional argument {} out of range'.format(index))
+
+
+class _Generator:
+    """Generates the source of a single function evaluating an action tree.
+
+    Every call in the tree is assigned to a local variable in evaluation order, so the generated function has no
+    nesting deeper than a single call.  Arguments and keyword arguments are read into local variables once.  Positional
+    arguments read before the first call are range checked on entry and later ones where they are read, so calls fail
+    or have side effects before a missing argument is reported, as they do in invoke().  Calls to pure operator
+    functions are written as Python operators and reuse the local variable of an earlier identical call.  Actions the
+    generator does not recognize are invoked as-is.
+    """
+
+    def __init__(self, root):
+        self.namespace = {'out_of_range': _out_of_range}
+        self.__constants = {}
+        self.__args = {}
+        self.__checked = []
+        self.__called = False
+        self.__kwargs = {}
+        self.__values = {}
+        self.__body = []
+        result = self.__expression(root)
+
+        lines = ['def action(*args, **kwargs):']
+        if self.__checked:
+            lines += self.__check(self.__checked, '    ')
+        lines += ['    ' + line for line in self.__body]
+        lines += ['    return {}'.format(result), '']
+        self.source = '\n'.join(lines)
+
+    def __constant(self, value):
+        key = (type(value), value) if type(value) in _VALUE_TYPES else id(value)
+        try:
+            return self.__constants[key][0]
+        except KeyError:
+            name = 'c{}'.format(len(self.__constants))
+            self.__constants[key] = (name, value)
+            self.namespace[name] = value
+            return name
+
+    def __local(self, expression, prefix='t'):
+        name = '{}{}'.format(prefix, len(self.__body))
+        self.__body.append('{} = {}'.format(name, expression))
+        return name
+
+    @staticmethod
+    def __check(indexes, indent=''):
+        required = max(i + 1 if i >= 0 else -i for i in indexes)
+        return [
+            '{}if len(args) < {}:'.format(indent, required),
+            '{}    out_of_range(args, {!r})'.format(indent, tuple(indexes)),
+        ]
+
+    def __arg(self, index):
+        try:
+            return self.__args[index]
+        except KeyError:
+            if self.__called:
+                self.__body += self.__check([index])
+            else:
+                self.__checked.append(index)
+            name = self.__args[index] = self.__local('args[{}]'.format(index), 'a')
+            return name
+
+    def __kwarg(self, name):
+        try:
+            return self.__kwargs[name]
+        except KeyError:
+            local = self.__kwargs[name] = self.__local('kwargs[{!r}]'.format(name), 'k')
+            return local
+
+    def __apply(self, func, func_expression, args, kwargs):
+        """Local variable holding the result of a call.
+
+        Args:
+            func: Function or action called.
+            func_expression: Local variable holding the evaluated action, or None when func is not an action.
+            args: Expressions of positional arguments.
+            kwargs: Expressions of keyword arguments by name.
+        """
+        pure = not isinstance(func, action.Action) and simplify.is_pure(func)
+        if pure and not kwargs and len(args) == 2 and func in _BINARY_OPERATORS:
+            expression = '{} {} {}'.format(args[0], _BINARY_OPERATORS[func], args[1])
+        elif pure and not kwargs and len(args) == 1 and func in _UNARY_OPERATORS:
+            expression = '{}{}'.format(_UNARY_OPERATORS[func], args[0])
+        else:
+            params = list(args)
+            extra = {}
+            for name, value in kwargs.items():
+                if name.isidentifier() and not keyword.iskeyword(name):
+                    params.append('{}={}'.format(name, value))
+                else:
+                    extra[name] = value
+            if extra:
+                params.append('**{{{}}}'.format(', '.join('{!r}: {}'.format(k, v) for k, v in extra.items())))
+            if func_expression is None:
+                func_expression = self.__constant(func)
+            expression = '{}({})'.format(func_expression, ', '.join(params))
+        self.__called = True
+        if not pure:
+            return self.__local(expression)
+        try:
+            return self.__values[expression]
+        except KeyError:
+            name = self.__values[expression] = self.__local(expression)
+            return name
+
+    def __expression(self, node):
+        if not isinstance(node, action.Action):
+            return self.__constant(node)
+        elif type(node) is action.Arg and type(node.index) is int:
+            return self.__arg(node.index)
+        elif type(node) is action.KwArg:
+            return self.__kwarg(node.name)
+        elif isinstance(node, action.Call):
+            func = self.__expression(node.func) if isinstance(node.func, action.Action) else None
+            args = [self.__expression(a) for a in node.args]
+            kwargs = {k: self.__expression(v) for k, v in node.kwargs.items()}
+            return self.__apply(node.func, func, args, kwargs)
+        elif type(node) is action.Chain:
+            operands = iter(node.operands)
+            result = self.__expression(next(operands))
+            for operand in operands:
+                result = self.__apply(node.func, None, [result, self.__expression(operand)], {})
+            return result
+        else:
+            self.__called = True
+            return self.__local('{}.invoke(*args, **kwargs)'.format(self.__constant(node)))
+
+
+def compile_action(root):
+    """Compile an action tree into a Python function.
+
+    Args:
+        root: Action to compile.
+
+    Returns:
+        Function accepting the same arguments as root.invoke() and returning the same value.
+    """
+    generator = _Generator(root)
+    namespace = generator.namespace
+    exec(compile(generator.source, '<action {}>'.format(type(root).__name__), 'exec'), namespace)
+    return namespace['action']
@@ -0,0 +1,110 @@
+# Copyright 2015 Rafe Kaplan
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import operator
+import unittest
+
+from booze.whiskey import action
+from booze.whiskey import compiler
+
+
+class CompileActionTestCase(unittest.TestCase):
+
+    def assertSameInvoke(self, compiled_action, *args, **kwargs):
+        self.assertEqual(compiled_action.invoke(*args, **kwargs),
+                         compiler.compile_action(compiled_action)(*args, **kwargs))
+
+    def test_args(self):
+        self.assertSameInvoke(action.p[1], 1, 2)
+        self.assertSameInvoke(action.p[-1], 1, 2)
+        self.assertSameInvoke(action.p.a, 1, a='a')
+        self.assertSameInvoke(action.Arg(action.p[1]), 'x', 0)
+
+    def test_operators(self):
+        self.assertSameInvoke((action.p[0] * 100) / action.p[1], 50, 200)
+        self.assertSameInvoke(-action.p[0] + action.p.a, 1, a=3)
+
+    def test_call(self):
+        self.assertSameInvoke(action.p[1](action.p[0], action.p[2]), 10, operator.sub, 3)
+        self.assertSameInvoke(action.Call(dict, a=action.p[0], b=1), 'a')
+        self.assertSameInvoke(action.Call(dict, **{'not valid': action.p[0], 'if': 2}), 'a')
+
+    def test_unknown_action(self):
+        class Twice(action.Action):
+            def invoke(self, *args, **kwargs):
+                return args * 2
+
+        self.assertSameInvoke(action.Call(len, Twice()), 1, 2)
+
+    def test_out_of_range(self):
+        f = compiler.compile_action(action.p[0] + action.p[2])
+        with self.assertRaisesRegex(TypeError, 'Positional argument 2 out of range'):
+            f(1, 2)
+        with self.assertRaisesRegex(TypeError, 'Positional argument -3 out of range'):
+            compiler.compile_action(action.p[-3])(1, 2)
+
+    def test_out_of_range_after_call(self):
+        calls = []
+
+        def f(value):
+            calls.append(value)
+            return value
+
+        a = action.func(f)(action.p[0]) + action.p[1]
+        with self.assertRaisesRegex(TypeError, 'Positional argument 1 out of range'):
+            a.invoke('x')
+        with self.assertRaisesRegex(TypeError, 'Positional argument 1 out of range'):
+            compiler.compile_action(a)('y')
+        self.assertEqual(['x', 'y'], calls)
+        with self.assertRaises(ZeroDivisionError):
+            compiler.compile_action(action.p[0] / 0 + action.p[1])(1)
+        self.assertEqual(3, compiler.compile_action(a)(1, 2))
+
+    def test_missing_kwarg(self):
+        with self.assertRaises(KeyError):
+            compiler.compile_action(action.p.a)(1)
+
+    def test_deep(self):
+        a = action.p[0]
+        for i in range(200):
+            a = action.p[0] - a
+        self.assertSameInvoke(a, 1)
+
+    def test_common_subexpressions(self):
+        calls = []
+
+        def f(value):
+            calls.append(value)
+            return value
+
+        percent = (action.p[0] * 100) / action.p[1]
+        self.assertSameInvoke(percent + percent, 50, 200)
+        source = compiler._Generator(percent + (action.p[0] * 100) / action.p[1]).source
+        self.assertEqual(1, source.count(' / '))
+        impure = action.func(f)(action.p[0])
+        self.assertEqual(4, compiler.compile_action(impure + impure)(2))
+        self.assertEqual([2, 2], calls)
+
+    def test_chain(self):
+        self.assertSameInvoke(action.Chain(operator.sub, (action.p[0], 1, action.p[1])), 10, 2)
+        self.assertSameInvoke(action.Chain(max, (action.p[0], action.p[1], 3)), 1, 2)
+
+    def test_compile_cached(self):
+        a = action.p[0] + 1
+        self.assertIs(a.compile(), a.compile())
+        self.assertEqual(3, a.compile()(2))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,163 @@
+# Copyright 2015 Rafe Kaplan
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import operator
+
+from . import action
+
+
+# Operator functions without side effects, so calls to them may be evaluated ahead of time on constants and once on
+# identical operands.  In-place operators are left out as they may modify their first operand.
+PURE_FUNCTIONS = frozenset([
+    operator.pos, operator.neg, operator.invert, operator.abs,
+    operator.lt, operator.le, operator.eq, operator.ne, operator.ge, operator.gt,
+    operator.add, operator.sub, operator.mul, operator.floordiv, operator.mod, operator.pow, operator.truediv,
+    operator.and_, operator.or_, operator.lshift, operator.rshift, operator.xor,
+])
+
+# Shortest chain of calls simplify() turns into a Chain.
+_MIN_CHAIN = 3
+
+
+def is_pure(func):
+    """Whether func is known to have no side effects."""
+    try:
+        return func in PURE_FUNCTIONS
+    except TypeError:
+        return False
+
+
+def _binary_call(node, func=None):
+    return (isinstance(node, action.Call) and not isinstance(node.func, action.Action) and
+            (func is None or node.func is func) and len(node.args) == 2 and not node.kwargs)
+
+
+def _spine(node):
+    """Operands of a left-nested chain of binary calls to the same function, or None if too short."""
+    if not _binary_call(node):
+        return None
+    func = node.func
+    operands = []
+    while _binary_call(node, func):
+        operands.append(node.args[1])
+        node = node.args[0]
+    operands.append(node)
+    operands.reverse()
+    return operands if len(operands) >= _MIN_CHAIN else None
+
+
+def _children(node):
+    if isinstance(node, action.Call):
+        spine = _spine(node)
+        if spine is not None:
+            return spine
+        return [node.func] + list(node.args) + list(node.kwargs.values())
+    elif isinstance(node, action.Chain):
+        return list(node.operands)
+    elif isinstance(node, action.Arg):
+        return [node.index]
+    else:
+        return []
+
+
+def _immutable(value):
+    if value is None or isinstance(value, (bool, int, float, complex, str, bytes)):
+        return True
+    if isinstance(value, (tuple, frozenset)):
+        return all(_immutable(item) for item in value)
+    return False
+
+
+def _fold(func, *args, **kwargs):
+    """Value of calling a pure function on constants, or the equivalent Call when it can not be folded.
+
+    Only immutable values are folded, as a folded value is shared by every invocation of the action.
+    """
+    try:
+        value = func(*args, **kwargs)
+    except Exception:
+        return action.Call(func, *args, **kwargs)
+    return value if _immutable(value) else action.Call(func, *args, **kwargs)
+
+
+def _chain(func, operands):
+    if is_pure(func):
+        count = 0
+        while count < len(operands) and not isinstance(operands[count], action.Action):
+            count += 1
+        if count > 1:
+            folded = operands[0]
+            for index in range(1, count):
+                folded = _fold(func, folded, operands[index])
+                if isinstance(folded, action.Action):
+                    break
+            else:
+                operands = [folded] + operands[count:]
+    if len(operands) == 1:
+        return operands[0]
+    return action.Chain(func, operands)
+
+
+def _rebuild(node, children):
+    if isinstance(node, action.Call):
+        if _spine(node) is not None:
+            return _chain(node.func, children)
+        func = children[0]
+        args = children[1:len(node.args) + 1]
+        kwargs = dict(zip(node.kwargs, children[len(node.args) + 1:]))
+        if is_pure(func) and not any(isinstance(c, action.Action) for c in children):
+            return _fold(func, *args, **kwargs)
+        if all(new is old for new, old in zip(children, _children(node))):
+            return node
+        return action.Call(func, *args, **kwargs)
+    elif isinstance(node, action.Chain):
+        return _chain(node.func, children)
+    elif isinstance(node, action.Arg):
+        return node if children[0] is node.index else action.Arg(children[0])
+    else:
+        return node
+
+
+def simplify(root):
+    """Simplify an action tree.
+
+    Calls to pure operator functions whose operands are all constant are evaluated, and left-nested chains of calls to
+    the same binary function become a single Chain.  Subtrees containing arguments or actions this module does not
+    know, such as rule variables, are never folded.  The tree is walked without recursion, so arbitrarily long chains
+    may be simplified.
+
+    Args:
+        root: Action or constant to simplify.
+
+    Returns:
+        Equivalent action or constant.  Unchanged subtrees are shared with root.
+    """
+    if not isinstance(root, action.Action):
+        return root
+    results = {}
+    pending = [root]
+    while pending:
+        node = pending[-1]
+        if id(node) in results:
+            pending.pop()
+            continue
+        children = _children(node)
+        unvisited = [c for c in children if isinstance(c, action.Action) and id(c) not in results]
+        if unvisited:
+            pending.extend(reversed(unvisited))
+            continue
+        pending.pop()
+        results[id(node)] = _rebuild(
+            node, [results[id(c)] if isinstance(c, action.Action) else c for c in children])
+    return results[id(root)]
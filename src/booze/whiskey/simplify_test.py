@@ -0,0 +1,94 @@
+# Copyright 2015 Rafe Kaplan
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import operator
+import unittest
+
+from booze.whiskey import action
+from booze.whiskey import simplify
+
+
+class SimplifyTestCase(unittest.TestCase):
+
+    def test_constant(self):
+        self.assertEqual(6, simplify.simplify(action.Call(operator.mul, 2, 3)))
+        self.assertEqual(7, simplify.simplify(action.add_(1, action.mul_(2, 3))))
+        self.assertEqual('a', simplify.simplify('a'))
+
+    def test_partially_constant(self):
+        a = simplify.simplify(action.p[0] * action.mul_(2, 3))
+        self.assertIsInstance(a, action.Call)
+        self.assertIsInstance(a.args[0], action.Arg)
+        self.assertEqual(6, a.args[1])
+        self.assertEqual(12, a.invoke(2))
+
+    def test_not_folded(self):
+        calls = []
+
+        def f(value):
+            calls.append(value)
+            return value
+
+        a = action.func(f)(1)
+        self.assertIs(a, simplify.simplify(a))
+        self.assertIsInstance(simplify.simplify(action.truediv_(1, 0)), action.Call)
+        self.assertIsInstance(simplify.simplify(action.p[0] + action.func(f)(1)), action.Call)
+        self.assertEqual([], calls)
+
+    def test_mutable_not_folded(self):
+        a = simplify.simplify(action.add_([1], [2]))
+        self.assertIsInstance(a, action.Call)
+        first = a.invoke()
+        first.append(3)
+        self.assertEqual([1, 2], a.invoke())
+        self.assertIsInstance(simplify.simplify(action.or__({1: 2}, {3: 4})), action.Call)
+        self.assertIsInstance(simplify.simplify(action.Call(operator.add, ([1],), (2,))), action.Call)
+        self.assertEqual((1, 2), simplify.simplify(action.Call(operator.add, (1,), (2,))))
+        self.assertEqual(frozenset([1, 2]), simplify.simplify(action.or__(frozenset([1]), frozenset([2]))))
+
+    def test_unchanged(self):
+        a = action.p[0] + action.p[1]
+        self.assertIs(a, simplify.simplify(a))
+
+    def test_chain(self):
+        a = action.p[0] - action.p[1] - action.p[2] - action.p[3]
+        s = simplify.simplify(a)
+        self.assertIsInstance(s, action.Chain)
+        self.assertIs(operator.sub, s.func)
+        self.assertEqual(4, len(s.operands))
+        self.assertEqual(a.invoke(10, 1, 2, 3), s.invoke(10, 1, 2, 3))
+
+    def test_chain_constant_prefix(self):
+        s = simplify.simplify(action.Call(operator.add, action.add_(1, 2), action.p[0]) + action.p[1])
+        self.assertEqual((3,), s.operands[:1])
+        self.assertEqual(6, s.invoke(1, 2))
+
+    def test_long_chain(self):
+        a = action.p[0]
+        for i in range(10000):
+            a = a + i
+        with self.assertRaises(RecursionError):
+            a.invoke(1)
+        s = a.simplify()
+        self.assertEqual(1 + sum(range(10000)), s.invoke(1))
+        self.assertEqual(1 + sum(range(10000)), a.compile()(1))
+
+    def test_is_pure(self):
+        self.assertTrue(simplify.is_pure(operator.add))
+        self.assertFalse(simplify.is_pure(operator.iadd))
+        self.assertFalse(simplify.is_pure(print))
+
+
+if __name__ == '__main__':
+    unittest.main()